@@ -0,0 +1,231 @@
+"""Чтение каталога под WSGI и ASGI: пропускная способность, p99 и память на соединение
+
+    python benchmarks/bench_asgi.py --concurrency 10 50 200 --db-latency 2
+
+Серверы не нужны: приложение вызывается в процессе, как это делает
+сервер. WSGI - поток на соединение (как gunicorn --threads), ASGI - задача
+asyncio на соединение (как uvicorn). Каждый режим запускается в отдельном
+процессе. --db-latency добавляет задержку к каждому SQL-запросу, как у
+базы по сети; у локального SQLite её нет.
+
+Режимы:
+  wsgi        center_project/wsgi.py, синхронные представления
+  asgi-sync   ASGI с синхронными представлениями (ASYNC_READ_VIEWS=0)
+  asgi        center_project/asgi.py, center_app.async_views
+"""
+import argparse
+import asyncio
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from common import ROOT, percentile, setup_django
+
+MODES = ('wsgi', 'asgi-sync', 'asgi')
+
+
+def rss_kb():
+    with open('/proc/self/status') as status:
+        for line in status:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1])
+
+
+class Sampler(threading.Thread):
+    """Пиковые RSS и число потоков во время замера (без самого сэмплера)"""
+
+    def __init__(self):
+        super().__init__(daemon=True)
+        self.running = True
+        self.rss = self.threads = 0
+
+    def run(self):
+        while self.running:
+            self.rss = max(self.rss, rss_kb())
+            self.threads = max(self.threads, threading.active_count() - 1)
+            time.sleep(0.005)
+
+    def stop(self):
+        self.running = False
+        self.join()
+        return self.rss, self.threads
+
+
+def paths(count, seed):
+    import random
+    rnd = random.Random(seed)
+    result = []
+    for _ in range(count):
+        pk = rnd.randrange(1, 1001)
+        result.append(rnd.choice((
+            ('/apartments/', 'page_size=20&Cost__lte=%d' % (pk * 10)),
+            ('/apartment/%d/' % pk, ''),
+            ('/buildings/', 'page_size=5'),
+            ('/contracts/', 'page_size=20&Status=l'),
+            ('/user/%d/' % (pk % 50 + 1), ''),
+        )))
+    return result
+
+
+def populate():
+    import datetime
+    import random
+    from center_app.models import Apartment, Building, Contract, User
+    random.seed(1)
+    User.objects.bulk_create(User(UserID=i, username='u%d' % i, is_staff=i <= 10) for i in range(1, 51))
+    Apartment.objects.bulk_create(
+        Apartment(ApartmentID=i, Number=i, Square=40, Cost=random.randrange(1000, 10000)) for i in range(1, 1001)
+    )
+    Building.objects.bulk_create(
+        Building(BuildingID=i, City='c', Street='s', Number=str(i)) for i in range(1, 101)
+    )
+    Through = Building.Apartments.through
+    Through.objects.bulk_create(Through(building_id=1 + i % 100, apartment_id=i) for i in range(1, 1001))
+    Contract.objects.bulk_create(
+        Contract(ContractID=i, AgentID_id=1 + i % 10, ClientID_id=11 + i % 40, ApartmentID_id=1 + i % 1000,
+                 Status=random.choice('vlf'), startDate=datetime.date(2024, 1, 1)) for i in range(1, 20001)
+    )
+
+
+def install_latency(seconds):
+    from django.db.backends.signals import connection_created
+
+    def delay(execute, sql, params, many, context):
+        time.sleep(seconds)
+        return execute(sql, params, many, context)
+
+    def add_delay(sender, connection, **kwargs):
+        connection.execute_wrappers.append(delay)
+
+    connection_created.connect(add_delay, weak=False)
+
+
+def run_wsgi(concurrency, requests):
+    from center_project.wsgi import application
+    samples, lock = [], threading.Lock()
+
+    def start_response(status, headers, exc_info=None):
+        assert status.startswith('200'), status
+
+    def connection(worker):
+        for path, query in paths(requests, worker):
+            environ = {
+                'REQUEST_METHOD': 'GET', 'PATH_INFO': path, 'QUERY_STRING': query, 'SERVER_NAME': 'localhost',
+                'SERVER_PORT': '80', 'HTTP_HOST': 'localhost', 'SERVER_PROTOCOL': 'HTTP/1.1',
+                'wsgi.url_scheme': 'http', 'wsgi.input': io.BytesIO(), 'wsgi.errors': sys.stderr,
+                'wsgi.version': (1, 0), 'wsgi.multithread': True, 'wsgi.multiprocess': False, 'wsgi.run_once': False,
+            }
+            started = time.perf_counter()
+            result = application(environ, start_response)
+            b''.join(result)
+            result.close()
+            with lock:
+                samples.append(time.perf_counter() - started)
+
+    threads = [threading.Thread(target=connection, args=(worker,)) for worker in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return samples
+
+
+def run_asgi(concurrency, requests):
+    from center_project.asgi import application
+    samples = []
+
+    async def connection(worker):
+        for path, query in paths(requests, worker):
+            scope = {
+                'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET',
+                'scheme': 'http', 'path': path, 'raw_path': path.encode(), 'query_string': query.encode(),
+                'root_path': '', 'headers': [(b'host', b'localhost')],
+                'client': ('127.0.0.1', 40000 + worker), 'server': ('localhost', 80),
+            }
+            sent = []
+
+            async def receive():
+                return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+            async def send(message):
+                sent.append(message)
+
+            started = time.perf_counter()
+            await application(scope, receive, send)
+            samples.append(time.perf_counter() - started)
+            assert sent[0]['status'] == 200, sent[0]
+
+    async def main():
+        await asyncio.gather(*(connection(worker) for worker in range(concurrency)))
+
+    asyncio.run(main())
+    return samples
+
+
+def child(args):
+    os.environ['CENTER_ASYNC_READ_VIEWS'] = '1' if args.mode == 'asgi' else '0'
+    setup_django(test_db=False, database={
+        'ENGINE': 'django.db.backends.sqlite3', 'NAME': args.db_file, 'CONN_MAX_AGE': 60,
+    })
+    if args.db_latency:
+        install_latency(args.db_latency / 1000)
+    runner = run_wsgi if args.mode == 'wsgi' else run_asgi
+    runner(2, 20)  # прогрев: импорт, первые соединения
+    concurrency = args.concurrency[0]
+    baseline = rss_kb()
+    sampler = Sampler()
+    sampler.start()
+    started = time.perf_counter()
+    samples = runner(concurrency, args.requests)
+    elapsed = time.perf_counter() - started
+    peak, threads = sampler.stop()
+    print(json.dumps({
+        'rps': len(samples) / elapsed,
+        'p50': percentile(samples, 50) * 1000,
+        'p99': percentile(samples, 99) * 1000,
+        'kb_per_connection': max(peak - baseline, 0) / concurrency,
+        'threads': threads,
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[10, 50, 200])
+    parser.add_argument('--requests', type=int, default=20, help='запросов на соединение')
+    parser.add_argument('--db-latency', type=float, default=0, help='мс на каждый SQL-запрос')
+    parser.add_argument('--mode', choices=MODES)
+    parser.add_argument('--db-file')
+    args = parser.parse_args()
+    if args.mode:
+        child(args)
+        return
+
+    with tempfile.TemporaryDirectory() as directory:
+        db_file = os.path.join(directory, 'bench.sqlite3')
+        setup_django(test_db=False, database={'ENGINE': 'django.db.backends.sqlite3', 'NAME': db_file})
+        from django.core.management import call_command
+        call_command('migrate', verbosity=0)
+        populate()
+
+        print('%-10s %6s %10s %9s %9s %12s %8s' % ('mode', 'conns', 'req/s', 'p50 ms', 'p99 ms', 'KB/conn', 'threads'))
+        for concurrency in args.concurrency:
+            for mode in MODES:
+                output = subprocess.run(
+                    [sys.executable, __file__, '--mode', mode, '--db-file', db_file,
+                     '--concurrency', str(concurrency), '--requests', str(args.requests),
+                     '--db-latency', str(args.db_latency)],
+                    cwd=ROOT, check=True, capture_output=True, text=True,
+                ).stdout
+                result = json.loads(output.strip().splitlines()[-1])
+                print('%-10s %6d %10.1f %9.2f %9.2f %12.1f %8d' % (
+                    mode, concurrency, result['rps'], result['p50'], result['p99'],
+                    result['kb_per_connection'], result['threads']))
+
+
+if __name__ == '__main__':
+    main()
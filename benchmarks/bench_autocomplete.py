@@ -0,0 +1,74 @@
+"""Латентность /addresses/autocomplete/, время построения и память индекса
+
+    python benchmarks/bench_autocomplete.py --buildings 100000
+"""
+import argparse
+import random
+import time
+import tracemalloc
+
+from common import Timer, report_latencies, setup_django
+
+CITIES = ('Москва', 'Санкт-Петербург', 'Казань', 'Сочи', 'Калининград', 'Екатеринбург', 'Самара')
+STREETS = ('Невский проспект', 'Тверская', 'Арбат', 'Ленина', 'Садовая', 'Морская набережная',
+           'Лесная', 'Советская', 'Мира', 'Гагарина', 'Пушкина', 'Московское шоссе')
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--buildings', type=int, default=100000)
+    parser.add_argument('--requests', type=int, default=2000)
+    args = parser.parse_args()
+    setup_django()
+
+    from rest_framework.test import APIClient
+    from center_app.autocomplete import address_index, normalize
+    from center_app.models import Building
+
+    random.seed(1)
+    with Timer('setup'):
+        Building.objects.bulk_create(
+            (Building(BuildingID=i, City=random.choice(CITIES),
+                      Street='%s %d' % (random.choice(STREETS), i % 97), Number=str(i % 300))
+             for i in range(1, args.buildings + 1)),
+            batch_size=1000,
+        )
+    with Timer('index build'):
+        address_index.ensure()
+    tracemalloc.start()
+    address_index.rebuild()
+    print('%-40s %8.1f MB' % ('index memory', tracemalloc.get_traced_memory()[0] / 2 ** 20))
+    tracemalloc.stop()
+
+    addresses = list(Building.objects.values_list('City', 'Street', 'Number'))
+    prefixes = []
+    for _ in range(args.requests):
+        city, street, number = random.choice(addresses)
+        text = random.choice(('%s %s %s' % (city, street, number), '%s %s' % (street, number)))
+        prefixes.append(text[:random.randrange(2, len(text) + 1)])
+
+    samples = []
+    for prefix in prefixes:
+        started = time.perf_counter()
+        address_index.lookup(prefix)
+        samples.append(time.perf_counter() - started)
+    report_latencies('lookup', samples)
+
+    api = APIClient()
+    samples = []
+    for prefix in prefixes:
+        started = time.perf_counter()
+        assert api.get('/addresses/autocomplete/', {'q': prefix}).status_code == 200
+        samples.append(time.perf_counter() - started)
+    report_latencies('endpoint', samples)
+
+    samples = []
+    for prefix in prefixes[:200]:
+        started = time.perf_counter()
+        list(Building.objects.filter(City__icontains=normalize(prefix).split()[0])[:10])
+        samples.append(time.perf_counter() - started)
+    report_latencies("LIKE '%...%' scan", samples)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,55 @@
+"""Латентность /apartments/available/ на большом числе договоров
+
+    python benchmarks/bench_availability.py --apartments 10000 --contracts 100000
+"""
+import argparse
+import datetime
+import random
+import time
+
+from common import report_latencies, setup_django
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--apartments', type=int, default=10000)
+    parser.add_argument('--contracts', type=int, default=100000)
+    parser.add_argument('--requests', type=int, default=200)
+    args = parser.parse_args()
+    setup_django()
+
+    from rest_framework.test import APIClient
+    from center_app.models import Apartment, Contract, User
+
+    random.seed(1)
+    agent = User.objects.create(username='agent', is_staff=True)
+    client = User.objects.create(username='client')
+    Apartment.objects.bulk_create(
+        (Apartment(ApartmentID=i, Number=i, Square=40, Cost=1000) for i in range(1, args.apartments + 1)),
+        batch_size=1000,
+    )
+    origin = datetime.date(2020, 1, 1)
+    contracts = []
+    for pk in range(1, args.contracts + 1):
+        start = origin + datetime.timedelta(days=random.randrange(2000))
+        contracts.append(Contract(
+            ContractID=pk, AgentID=agent, ClientID=client,
+            ApartmentID_id=random.randrange(1, args.apartments + 1),
+            Status=random.choice('vlf'), startDate=start,
+            endDate=start + datetime.timedelta(days=random.randrange(1, 30)),
+        ))
+    Contract.objects.bulk_create(contracts, batch_size=1000)
+
+    api = APIClient()
+    samples = []
+    for _ in range(args.requests):
+        start = origin + datetime.timedelta(days=random.randrange(2000))
+        url = '/apartments/available/?from=%s&to=%s' % (start, start + datetime.timedelta(days=7))
+        started = time.perf_counter()
+        assert api.get(url).status_code == 200
+        samples.append(time.perf_counter() - started)
+    report_latencies('available (page)', samples)
+
+
+if __name__ == '__main__':
+    main()
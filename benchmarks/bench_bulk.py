@@ -0,0 +1,35 @@
+"""Сравнение поштучного и пакетного создания квартир
+
+    python benchmarks/bench_bulk.py --rows 10000
+"""
+import argparse
+
+from common import Timer, setup_django
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=10000)
+    args = parser.parse_args()
+    setup_django()
+
+    from rest_framework.test import APIClient
+    from center_app.models import Apartment
+
+    api = APIClient()
+    items = [{'ApartmentID': i, 'Number': i, 'Square': 40, 'Cost': 1000} for i in range(1, args.rows + 1)]
+
+    with Timer('POST /apartment/create/ x %d' % args.rows) as single:
+        for item in items:
+            assert api.post('/apartment/create/', item, format='json').status_code == 201
+    Apartment.objects.all().delete()
+
+    with Timer('POST /apartments/bulk/ (%d rows)' % args.rows) as bulk:
+        assert api.post('/apartments/bulk/', items, format='json').status_code == 201
+    assert Apartment.objects.count() == args.rows
+
+    print('speedup: %.1fx' % (single.elapsed / bulk.elapsed))
+
+
+if __name__ == '__main__':
+    main()
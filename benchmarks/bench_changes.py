@@ -0,0 +1,109 @@
+"""Синхронизация клиента: полная загрузка списков против /changes/
+
+    python benchmarks/bench_changes.py --apartments 20000 --changed 200
+"""
+import argparse
+import json
+import random
+import time
+
+from common import Timer, setup_django
+
+LISTS = ('/apartments/', '/buildings/', '/contracts/')
+
+
+def download(api, path, params):
+    """Все страницы ответа: (объектов, байт)"""
+    count = size = 0
+    url, params = path, dict(params)
+    while url:
+        resp = api.get(url, params)
+        assert resp.status_code == 200, resp.content[:200]
+        size += len(resp.content)
+        data = json.loads(resp.content)
+        count += len(data['results'])
+        url, params = data['next'], None
+    return count, size
+
+
+def sync(api, since):
+    """Лента с since до конца: (изменений, байт, новый since)"""
+    count = size = 0
+    while True:
+        resp = api.get('/changes/', {'since': since, 'page_size': 5000})
+        assert resp.status_code == 200
+        size += len(resp.content)
+        data = json.loads(resp.content)
+        count += len(data['changes'])
+        since = data['next']
+        if not data['more']:
+            return count, size, since
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--apartments', type=int, default=20000)
+    parser.add_argument('--changed', type=int, default=200, help='изменённых квартир между синхронизациями')
+    args = parser.parse_args()
+    setup_django()
+
+    from rest_framework.test import APIClient
+    from center_app.changes import record
+    from center_app.models import Apartment, Building, ChangeEvent, Contract, User
+
+    random.seed(1)
+    with Timer('setup'):
+        User.objects.bulk_create(User(UserID=i, username='u%d' % i, is_staff=i <= 10) for i in range(1, 101))
+        Apartment.objects.bulk_create(
+            (Apartment(ApartmentID=i, Number=i, Square=40, Cost=random.randrange(1000, 10000))
+             for i in range(1, args.apartments + 1)), batch_size=1000,
+        )
+        buildings = args.apartments // 10
+        Building.objects.bulk_create(
+            (Building(BuildingID=i, City='c', Street='s', Number=str(i)) for i in range(1, buildings + 1)),
+            batch_size=1000,
+        )
+        Through = Building.Apartments.through
+        Through.objects.bulk_create(
+            (Through(building_id=1 + i % buildings, apartment_id=i) for i in range(1, args.apartments + 1)),
+            batch_size=1000,
+        )
+        Contract.objects.bulk_create(
+            (Contract(ContractID=i, AgentID_id=1 + i % 10, ClientID_id=11 + i % 90, ApartmentID_id=i)
+             for i in range(1, args.apartments + 1)), batch_size=1000,
+        )
+        # как миграция 0013 для уже существующих строк
+        for model in (User, Apartment, Building, Contract):
+            record(model, model.objects.values_list('pk', flat=True), 'create')
+
+    api = APIClient()
+    started = time.perf_counter()
+    full = [download(api, path, {'page_size': 1000}) for path in LISTS]
+    full_time = time.perf_counter() - started
+    print('%-40s %8.3f s %8d objects %10.1f KB' % (
+        'full download (3 lists)', full_time, sum(c for c, s in full), sum(s for c, s in full) / 1024))
+
+    started = time.perf_counter()
+    count, size, since = sync(api, 0)
+    print('%-40s %8.3f s %8d changes %10.1f KB' % ('feed initial sync', time.perf_counter() - started,
+                                                 count, size / 1024))
+
+    changed = random.sample(range(1, args.apartments + 1), args.changed)
+    started = time.perf_counter()
+    for pk in changed:
+        apartment = Apartment.objects.get(pk=pk)
+        apartment.Cost += 1
+        apartment.save()
+    per_save = (time.perf_counter() - started) / len(changed)
+    print('%-40s %8.2f ms' % ('save() with change log', per_save * 1000))
+
+    started = time.perf_counter()
+    count, size, since = sync(api, since)
+    print('%-40s %8.3f s %8d changes %10.1f KB' % ('feed incremental sync', time.perf_counter() - started,
+                                                 count, size / 1024))
+    print('%-40s %8d rows (objects: %d)' % ('change log', ChangeEvent.objects.count(),
+                                           100 + args.apartments * 2 + buildings))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+"""Создание договоров с проверкой пересечений из нескольких потоков
+
+    python benchmarks/bench_contracts.py --contracts 10000 --apartments 1000 --threads 4
+
+Договоры создаются через ContractCreateSerializer, то есть тем же путём,
+что и POST /contract/create/. В конце проверяется, что ни одна квартира
+не оказалась забронирована дважды.
+"""
+import argparse
+import datetime
+import os
+import random
+import tempfile
+import threading
+
+from common import Timer, setup_django
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--contracts', type=int, default=10000)
+    parser.add_argument('--apartments', type=int, default=1000)
+    parser.add_argument('--threads', type=int, default=4)
+    args = parser.parse_args()
+    db_file = os.path.join(tempfile.mkdtemp(), 'bench.sqlite3')
+    setup_django(db_file=db_file)
+
+    from django.db import connection, connections
+    from center_app.models import Apartment, Contract, User
+    from center_app.serializers import ContractCreateSerializer
+
+    agent = User.objects.create(username='agent', is_staff=True)
+    client = User.objects.create(username='client')
+    Apartment.objects.bulk_create(
+        (Apartment(ApartmentID=i, Number=i, Square=40, Cost=1000) for i in range(1, args.apartments + 1)),
+        batch_size=1000,
+    )
+    connection.close()
+
+    origin = datetime.date(2024, 1, 1)
+    created, rejected = [0] * args.threads, [0] * args.threads
+
+    def worker(index):
+        rng = random.Random(index)
+        for pk in range(index + 1, args.contracts + 1, args.threads):
+            start = origin + datetime.timedelta(days=rng.randrange(365))
+            serializer = ContractCreateSerializer(data={
+                'ContractID': pk, 'AgentID': agent.pk, 'ClientID': client.pk,
+                'ApartmentID': rng.randrange(1, args.apartments + 1), 'Status': 'l',
+                'startDate': start, 'endDate': start + datetime.timedelta(days=rng.randrange(1, 14)),
+            })
+            serializer.is_valid(raise_exception=True)
+            try:
+                serializer.save()
+                created[index] += 1
+            except Exception as exc:
+                if 'занята' not in str(exc):
+                    raise
+                rejected[index] += 1
+        connections.close_all()
+
+    with Timer('%d contracts, %d threads' % (args.contracts, args.threads)) as timer:
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(args.threads)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    print('created %d, rejected as overlapping %d, %.0f contracts/s' % (
+        sum(created), sum(rejected), args.contracts / timer.elapsed))
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT COUNT(*) FROM center_app_contract a JOIN center_app_contract b '
+            'ON a."ApartmentID_id" = b."ApartmentID_id" AND a."ContractID" < b."ContractID" '
+            'AND a."startDate" < b."endDate" AND b."startDate" < a."endDate"'
+        )
+        doubles = cursor.fetchone()[0]
+    print('double bookings: %d' % doubles)
+    assert Contract.objects.count() == sum(created)
+    assert doubles == 0
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+"""Латентность запросов с пулом соединений и без него
+
+Каждый режим запускается в отдельном процессе с N потоками, как воркер
+с потоками gunicorn. Запросы идут через WSGIHandler, поэтому соединения
+закрываются в конце запроса так же, как на сервере:
+
+    per-request  CONN_MAX_AGE = 0, соединение на каждый запрос
+    persistent   CONN_MAX_AGE = 60, соединение на поток
+    pooled       center_app.backends.*, CONN_MAX_AGE = 0, пул на процесс
+
+    python benchmarks/bench_pool.py --threads 16 --requests 300
+    DB_NAME=center DB_USER=... python benchmarks/bench_pool.py --engine postgresql
+"""
+import argparse
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+
+from common import report_latencies, setup_django
+
+MODES = ('per-request', 'persistent', 'pooled')
+
+
+def database_settings(engine, db_file):
+    if engine == 'sqlite3':
+        return {'ENGINE': 'django.db.backends.sqlite3', 'NAME': db_file}
+    return {
+        'ENGINE': 'django.db.backends.postgresql',
+        'NAME': os.environ.get('DB_NAME', 'center'),
+        'USER': os.environ.get('DB_USER', ''),
+        'PASSWORD': os.environ.get('DB_PASSWORD', ''),
+        'HOST': os.environ.get('DB_HOST', ''),
+        'PORT': os.environ.get('DB_PORT', ''),
+    }
+
+
+def run_mode(mode, engine, database, args, results):
+    database = dict(database, CONN_MAX_AGE=60 if mode == 'persistent' else 0)
+    if mode == 'pooled':
+        database['ENGINE'] = 'center_app.backends.%s' % engine
+        database['POOL'] = {'MAX_SIZE': args.pool_size, 'TIMEOUT': 10}
+    setup_django(test_db=False, database=database)
+
+    from django.core.handlers.wsgi import WSGIHandler
+    from django.test import RequestFactory
+    from center_app.pool import pool_stats
+
+    handler = WSGIHandler()
+    environ = RequestFactory()._base_environ(PATH_INFO='/apartments/', QUERY_STRING='page_size=20',
+                                            HTTP_HOST='localhost')
+    samples = []
+    lock = threading.Lock()
+
+    def worker():
+        local = []
+        for _ in range(args.requests):
+            started = time.perf_counter()
+            body = handler(dict(environ), lambda status, headers: None)
+            b''.join(body)
+            body.close()
+            local.append(time.perf_counter() - started)
+        with lock:
+            samples.extend(local)
+
+    threads = [threading.Thread(target=worker) for _ in range(args.threads)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    results.put((mode, samples, elapsed, pool_stats().get('default')))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--engine', choices=('sqlite3', 'postgresql'), default='sqlite3')
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--requests', type=int, default=300, help='запросов на поток')
+    parser.add_argument('--pool-size', type=int, default=8)
+    args = parser.parse_args()
+
+    db_file = os.path.join(tempfile.mkdtemp(), 'bench.sqlite3')
+    setup_django(db_file=db_file, database=database_settings(args.engine, db_file))
+
+    from django.db import connection
+    from center_app.models import Apartment
+
+    Apartment.objects.bulk_create(Apartment(ApartmentID=i, Number=i, Square=40, Cost=1000) for i in range(1, 501))
+    database = database_settings(args.engine, db_file)
+    database['NAME'] = connection.settings_dict['NAME']
+    connection.close()
+
+    context = multiprocessing.get_context('spawn')
+    results = context.Queue()
+    for mode in MODES:
+        process = context.Process(target=run_mode, args=(mode, args.engine, database, args, results))
+        process.start()
+        mode, samples, elapsed, stats = results.get()
+        process.join()
+        report_latencies(mode, samples)
+        print('%24s %.0f req/s%s' % ('', len(samples) / elapsed, '  pool %s' % stats if stats else ''))
+
+
+if __name__ == '__main__':
+    main()
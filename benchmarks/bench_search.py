@@ -0,0 +1,63 @@
+"""Латентность /search/ на большом числе документов
+
+    python benchmarks/bench_search.py --apartments 475000 --buildings 25000
+"""
+import argparse
+import random
+import time
+
+from common import Timer, report_latencies, setup_django
+
+WORDS = (
+    'светлая уютная просторная тихая новая квартира студия балкон лоджия вид парк река двор '
+    'ремонт мебель кухня спальня гостиная окна метро рядом центр этаж лифт паркинг камин терраса'
+).split()
+CITIES = ('Москва', 'Санкт-Петербург', 'Казань', 'Сочи', 'Калининград', 'Екатеринбург', 'Самара')
+STREETS = ('Невский', 'Тверская', 'Арбат', 'Ленина', 'Садовая', 'Морская', 'Лесная', 'Советская')
+QUERIES = ('балкон', 'камин терраса', 'невский', 'сочи морская', 'лодж*', 'кварт*', 'просторная квартира метро')
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--apartments', type=int, default=475000)
+    parser.add_argument('--buildings', type=int, default=25000)
+    parser.add_argument('--requests', type=int, default=50)
+    args = parser.parse_args()
+    setup_django()
+
+    from rest_framework.test import APIClient
+    from center_app.models import Apartment, Building
+    from center_app.search import get_backend
+
+    random.seed(1)
+    with Timer('setup'):
+        Apartment.objects.bulk_create(
+            (Apartment(ApartmentID=i, Number=i, Square=40, Cost=1000,
+                       Description=' '.join(random.sample(WORDS, 8)))
+             for i in range(1, args.apartments + 1)),
+            batch_size=1000,
+        )
+        Building.objects.bulk_create(
+            (Building(BuildingID=i, City=random.choice(CITIES), Street=random.choice(STREETS),
+                      Number=str(i % 200), Type='кирпич', Description=' '.join(random.sample(WORDS, 5)))
+             for i in range(1, args.buildings + 1)),
+            batch_size=1000,
+        )
+    # bulk_create не шлёт сигналов, индекс строится заново
+    with Timer('search_index rebuild'):
+        get_backend().rebuild()
+
+    api = APIClient()
+    for query in QUERIES:
+        samples = []
+        for _ in range(args.requests):
+            started = time.perf_counter()
+            status = api.get('/search/', {'q': query, 'page_size': 20}).status_code
+            # 400 - совпадений больше SEARCH_RANK_WINDOW
+            assert status in (200, 400), status
+            samples.append(time.perf_counter() - started)
+        report_latencies(query if status == 200 else query + ' (400)', samples)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,107 @@
+"""Пропускная способность SQLite при нескольких процессах-воркерах
+
+Сравнивает настройки SQLite по умолчанию (журнал DELETE, synchronous FULL)
+с SQLITE_PRAGMAS из settings: каждый процесс, как воркер gunicorn, в цикле
+читает страницу квартир и с заданной долей пишет договор.
+
+    python benchmarks/bench_sqlite.py --workers 8 --seconds 10 --writes 0.2
+"""
+import argparse
+import datetime
+import multiprocessing
+import os
+import random
+import tempfile
+import time
+
+from common import setup_django
+
+BASELINE = {'journal_mode': 'DELETE', 'synchronous': 'FULL'}
+
+
+def worker(index, phase, pragmas, args, results):
+    from django.conf import settings
+    from django.db import OperationalError, connection
+    from center_app.models import Apartment, Contract
+
+    settings.SQLITE_PRAGMAS = pragmas
+    rng = random.Random(index)
+    origin = datetime.date(2024, 1, 1)
+    reads = writes = locked = 0
+    pk = (phase * args.workers + index + 1) * 10 ** 7
+    deadline = time.perf_counter() + args.seconds
+    while time.perf_counter() < deadline:
+        try:
+            if rng.random() < args.writes:
+                pk += 1
+                start = origin + datetime.timedelta(days=rng.randrange(3650))
+                Contract.objects.create(
+                    ContractID=pk, AgentID_id=1, ClientID_id=2, Status='l',
+                    ApartmentID_id=rng.randrange(1, args.apartments + 1),
+                    startDate=start, endDate=start + datetime.timedelta(days=7),
+                )
+                writes += 1
+            else:
+                offset = rng.randrange(args.apartments)
+                list(Apartment.objects.filter(ApartmentID__gt=offset).order_by('ApartmentID')[:50])
+                reads += 1
+        except OperationalError:
+            locked += 1
+    connection.close()
+    results.put((reads, writes, locked))
+
+
+def run(phase, label, pragmas, args):
+    from django.db import connection
+
+    # journal_mode хранится в файле базы, поэтому переключаем его заранее
+    with connection.cursor() as cursor:
+        cursor.execute('PRAGMA journal_mode = %s' % pragmas.get('journal_mode', 'DELETE'))
+    connection.close()
+
+    results = multiprocessing.Queue()
+    processes = [
+        multiprocessing.Process(target=worker, args=(i, phase, pragmas, args, results))
+        for i in range(args.workers)
+    ]
+    for process in processes:
+        process.start()
+    totals = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+    reads, writes, locked = (sum(column) for column in zip(*totals))
+    print('%-10s reads %8.0f/s  writes %7.0f/s  locked errors %d' % (
+        label, reads / args.seconds, writes / args.seconds, locked))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--writes', type=float, default=0.2, help='доля операций записи')
+    parser.add_argument('--apartments', type=int, default=10000)
+    args = parser.parse_args()
+
+    db_file = os.path.join(tempfile.mkdtemp(), 'bench.sqlite3')
+    setup_django(db_file=db_file)
+
+    from django.conf import settings
+    from django.db import connection
+    from center_app.models import Apartment, User
+
+    tuned = dict(settings.SQLITE_PRAGMAS)
+    User.objects.create(UserID=1, username='agent', is_staff=True)
+    User.objects.create(UserID=2, username='client')
+    Apartment.objects.bulk_create(
+        (Apartment(ApartmentID=i, Number=i, Square=40, Cost=1000) for i in range(1, args.apartments + 1)),
+        batch_size=1000,
+    )
+    connection.close()
+
+    multiprocessing.set_start_method('fork')
+    run(0, 'default', BASELINE, args)
+    run(1, 'tuned', tuned, args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+"""Латентность /stats/contracts/ и /dashboard/ по группам на большом числе договоров
+
+    python benchmarks/bench_stats.py --contracts 1000000
+"""
+import argparse
+import datetime
+import random
+import time
+
+from common import Timer, report_latencies, setup_django
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--apartments', type=int, default=10000)
+    parser.add_argument('--buildings', type=int, default=500)
+    parser.add_argument('--agents', type=int, default=200)
+    parser.add_argument('--contracts', type=int, default=1000000)
+    parser.add_argument('--requests', type=int, default=20)
+    args = parser.parse_args()
+    setup_django()
+
+    from rest_framework.test import APIClient
+    from center_app.models import Apartment, Building, Contract, User
+    from center_app.rollups import rebuild
+
+    random.seed(1)
+    with Timer('setup'):
+        User.objects.bulk_create(
+            User(UserID=i, username='agent%d' % i, is_staff=True) for i in range(1, args.agents + 1)
+        )
+        client = User.objects.create(username='client')
+        Apartment.objects.bulk_create(
+            (Apartment(ApartmentID=i, Number=i, Square=40, Cost=random.randrange(1000, 5000))
+             for i in range(1, args.apartments + 1)),
+            batch_size=1000,
+        )
+        Building.objects.bulk_create(
+            Building(BuildingID=i, City='city%d' % (i % 20), Street='s', Number=str(i))
+            for i in range(1, args.buildings + 1)
+        )
+        Through = Building.Apartments.through
+        Through.objects.bulk_create(
+            (Through(building_id=1 + i % args.buildings, apartment_id=i) for i in range(1, args.apartments + 1)),
+            batch_size=1000,
+        )
+        origin = datetime.date(2020, 1, 1)
+        batch = []
+        for pk in range(1, args.contracts + 1):
+            start = origin + datetime.timedelta(days=random.randrange(2000))
+            batch.append(Contract(
+                ContractID=pk, AgentID_id=random.randrange(1, args.agents + 1), ClientID=client,
+                ApartmentID_id=random.randrange(1, args.apartments + 1),
+                Status=random.choice('vlf'), startDate=start,
+                endDate=start + datetime.timedelta(days=random.randrange(1, 30)),
+            ))
+            if len(batch) == 10000:
+                Contract.objects.bulk_create(batch)
+                batch = []
+        Contract.objects.bulk_create(batch)
+
+    # bulk_create не шлет сигналов, сводки строятся заново
+    with Timer('rollups rebuild'):
+        rebuild()
+
+    api = APIClient()
+    api.force_authenticate(User.objects.get(pk=1))
+    for endpoint in ('stats/contracts', 'dashboard'):
+        for group in ('agent', 'building', 'city', 'month'):
+            samples = []
+            for _ in range(args.requests):
+                url = '/%s/?group=%s&from=2022-01-01&to=2023-01-01' % (endpoint, group)
+                started = time.perf_counter()
+                assert api.get(url).status_code == 200
+                samples.append(time.perf_counter() - started)
+            report_latencies('%s %s' % (endpoint, group), samples)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+"""Общая подготовка окружения для замеров
+
+Скрипты запускаются из корня проекта: ``python benchmarks/bench_bulk.py``.
+Замеры идут на тестовой базе, рабочая db.sqlite3 не затрагивается.
+"""
+import os
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def setup_django(test_db=True, db_file=None, database=None):
+    """Настраивает Django и создаёт тестовую базу
+
+    db_file - путь к файлу SQLite вместо базы в памяти; нужен, когда
+    замер идёт из нескольких потоков или процессов. database заменяет
+    настройки базы default целиком.
+    """
+    sys.path.insert(0, ROOT)
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'center_project.settings')
+    import django
+    from django.conf import settings
+    if database:
+        settings.DATABASES['default'] = database
+    if db_file:
+        settings.DATABASES['default']['TEST'] = {'NAME': db_file}
+    django.setup()
+    if test_db:
+        from django.db import connection
+        from django.test.utils import setup_test_environment
+        setup_test_environment()
+        connection.creation.create_test_db(verbosity=0, autoclobber=True)
+
+
+class Timer:
+    def __init__(self, label):
+        self.label = label
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.elapsed = time.perf_counter() - self.started
+        print('%-40s %8.3f s' % (self.label, self.elapsed))
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def report_latencies(label, samples):
+    print('%-24s n=%-6d p50=%7.2f ms  p99=%7.2f ms  mean=%7.2f ms' % (
+        label, len(samples), percentile(samples, 50) * 1000,
+        percentile(samples, 99) * 1000, statistics.mean(samples) * 1000))
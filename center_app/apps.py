@@ -1,6 +1,9 @@
-from django.apps import AppConfig
-
-
-class CenerAppConfig(AppConfig):
-    default_auto_field = 'django.db.models.BigAutoField'
-    name = 'center_app'
+from django.apps import AppConfig
+
+
+class CenerAppConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'center_app'
+
+    def ready(self):
+        from . import authentication, autocomplete, cache, changes, checks, db, images, rollups, search, signals, storage  # noqa: F401 подключает сигналы
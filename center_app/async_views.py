@@ -0,0 +1,50 @@
+from concurrent.futures import ThreadPoolExecutor
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+
+# у каждого потока своё соединение с базой: размер пула - их предел
+executor = ThreadPoolExecutor(
+    max_workers=getattr(settings, 'ASYNC_READ_THREADS', 16), thread_name_prefix='async-read',
+)
+
+
+def async_read_view(view_class, **initkwargs):
+    """Асинхронная версия представления DRF для чтения под ASGI
+
+    В Django 3.2 нет асинхронного ORM, поэтому запрос к базе, пагинация и
+    сериализация выполняются тем же кодом представления, но в пуле из
+    ASYNC_READ_THREADS потоков. Синхронное представление под ASGI
+    Django выполняет в одном потоке для всех запросов, и чтения идут
+    строго по очереди; здесь они выполняются параллельно. Ответ рендерится
+    в том же потоке пула, в цикл событий возвращаются готовые байты.
+    """
+    view = view_class.as_view(**initkwargs)
+
+    def run(request, *args, **kwargs):
+        # соединение потока пула живёт по правилам CONN_MAX_AGE, как у воркера WSGI
+        close_old_connections()
+        try:
+            response = view(request, *args, **kwargs)
+            if hasattr(response, 'render'):
+                response.render()
+            return response
+        finally:
+            close_old_connections()
+
+    run_in_pool = sync_to_async(run, thread_sensitive=False, executor=executor)
+
+    @wraps(view)
+    async def async_view(request, *args, **kwargs):
+        return await run_in_pool(request, *args, **kwargs)
+
+    return async_view
+
+
+def read_view(view_class, **initkwargs):
+    """async_read_view при ASYNC_READ_VIEWS (запуск через ASGI), иначе обычное представление"""
+    if getattr(settings, 'ASYNC_READ_VIEWS', False):
+        return async_read_view(view_class, **initkwargs)
+    return view_class.as_view(**initkwargs)
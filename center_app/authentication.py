@@ -0,0 +1,171 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+from .models import User
+from .routers import stick
+
+
+class TokenCache:
+    """LRU-кэш проверенных токенов с ограниченным временем жизни
+
+    Записи хранятся в памяти процесса; если задан ``CACHE_ALIAS``,
+    они дополнительно кладутся в общий кэш, чтобы воркеры не ходили
+    в базу за одним и тем же токеном. Отзыв токена увеличивает его
+    поколение в общем кэше; запись прежнего поколения не используется,
+    даже если она ещё лежит в памяти другого процесса.
+    """
+    key_prefix = 'auth-token:'
+    generation_prefix = 'auth-token-generation:'
+
+    def __init__(self, max_size=10000, timeout=60, cache_alias=None):
+        self.max_size = max_size
+        self.timeout = timeout
+        self.cache_alias = cache_alias
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def shared(self):
+        return caches[self.cache_alias] if self.cache_alias else None
+
+    def generation(self, key):
+        """Текущее поколение токена; читается до проверки токена в базе"""
+        if self.shared is None:
+            return 0
+        return self.shared.get(self.generation_prefix + key, 0)
+
+    def get(self, key):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] > now:
+                    self._entries.move_to_end(key)
+                else:
+                    del self._entries[key]
+                    entry = None
+        if self.shared is None:
+            return entry[2] if entry is not None else None
+        found = self.shared.get_many([self.key_prefix + key, self.generation_prefix + key])
+        current = found.get(self.generation_prefix + key, 0)
+        if entry is not None and entry[1] == current:
+            return entry[2]
+        stored = found.get(self.key_prefix + key)
+        if stored is not None and stored[0] == current:
+            self._remember(key, stored[1], current, now)
+            return stored[1]
+        if entry is not None:
+            with self._lock:
+                self._entries.pop(key, None)
+        return None
+
+    def set(self, key, value, generation=0):
+        self._remember(key, value, generation, time.monotonic())
+        if self.shared is not None:
+            self.shared.set(self.key_prefix + key, (generation, value), self.timeout)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+        if self.shared is not None:
+            self.shared.delete(self.key_prefix + key)
+            # записи старше отзыва живут не дольше timeout
+            self.shared.add(self.generation_prefix + key, 0, self.timeout)
+            try:
+                self.shared.incr(self.generation_prefix + key)
+            except ValueError:
+                self.shared.set(self.generation_prefix + key, 1, self.timeout)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def _remember(self, key, value, generation, now):
+        with self._lock:
+            self._entries[key] = (now + self.timeout, generation, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+
+_options = getattr(settings, 'TOKEN_CACHE', {})
+token_cache = TokenCache(
+    max_size=_options.get('MAX_SIZE', 10000),
+    timeout=_options.get('TIMEOUT', 60),
+    cache_alias=_options.get('CACHE_ALIAS'),
+)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """TokenAuthentication, не обращающийся к базе за уже проверенным токеном"""
+
+    def authenticate_credentials(self, key):
+        cached = token_cache.get(key)
+        if cached is not None:
+            return thaw(cached)
+        # поколение до чтения из базы: отзыв во время проверки не даст закэшировать старое
+        generation = token_cache.generation(key)
+        user, token = super().authenticate_credentials(key)
+        token_cache.set(key, freeze(user, token), generation)
+        return user, token
+
+
+def freeze(user, token):
+    """Значения полей вместо экземпляров: каждый запрос получает свои объекты"""
+    return (
+        user._state.db,
+        tuple(getattr(user, field.attname) for field in User._meta.concrete_fields),
+        tuple(getattr(token, field.attname) for field in Token._meta.concrete_fields),
+    )
+
+
+def thaw(frozen):
+    db, user_values, token_values = frozen
+    user = User.from_db(db, [field.attname for field in User._meta.concrete_fields], user_values)
+    token = Token.from_db(db, [field.attname for field in Token._meta.concrete_fields], token_values)
+    token.user = user
+    return user, token
+
+
+def forget_tokens(keys):
+    """Отзывает токены сейчас и ещё раз после коммита
+
+    Запрос, прочитавший до коммита старые данные, мог закэшировать их уже
+    после первого отзыва.
+    """
+    keys = list(keys)
+
+    def forget():
+        for key in keys:
+            token_cache.delete(key)
+
+    forget()
+    transaction.on_commit(forget)
+
+
+@receiver(post_save, sender=Token)
+def stick_new_token(sender, instance, created, raw=False, **kwargs):
+    # реплика может ещё не знать новый токен: первые запросы с ним читают с основной базы
+    if created and not raw:
+        key = instance.key
+        transaction.on_commit(lambda: stick(key))
+
+
+@receiver(post_delete, sender=Token)
+def forget_deleted_token(sender, instance, **kwargs):
+    forget_tokens([instance.key])
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def forget_user_tokens(sender, instance, **kwargs):
+    forget_tokens(Token.objects.filter(user_id=instance.pk).values_list('key', flat=True))
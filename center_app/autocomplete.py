@@ -0,0 +1,207 @@
+import re
+import threading
+import time
+from bisect import bisect_left
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .bulk import chunks
+from .changes import KINDS, horizon
+from .models import Building, ChangeEvent
+from .signals import bulk_changed
+
+ADDRESS_FIELDS = ('City', 'Street', 'Number')
+SEPARATORS = re.compile(r'[\W_]+')
+
+
+def normalize(text):
+    """Нижний регистр, ё как е, знаки препинания и пробелы - один пробел"""
+    return SEPARATORS.sub(' ', text.lower().replace('ё', 'е')).strip()
+
+
+def address_keys(city, street, number):
+    # адрес находится и с городом, и без него
+    street_key = normalize('%s %s' % (street, number))
+    return {normalize('%s %s' % (city, street_key)), street_key}
+
+
+def last_change():
+    """Номер последнего изменения зданий в журнале"""
+    return ChangeEvent.objects.filter(kind=KINDS[Building]).order_by('-seq') \
+        .values_list('seq', flat=True).first() or 0
+
+
+class AddressIndex:
+    """Подсказки адресов зданий по началу строки
+
+    Ключи адресов хранятся в отсортированном списке, поиск - bisect по
+    префиксу. Индекс строится при первом запросе процесса, дальше не чаще
+    раза в refresh_interval секунд из журнала изменений (changes.py)
+    применяются изменения зданий - и этого процесса, и других. Обновляет
+    индекс один поток, остальные тем временем ищут по прежнему; под
+    блокировкой только поиск и правка отдельных ключей. Полная перестройка
+    (если журнал сжат дальше, чем индекс) собирается без блокировки и
+    подменяет индекс целиком. Если зданий больше max_buildings, индекс не
+    строится и подсказки ищутся запросом к базе.
+    """
+
+    def __init__(self, max_buildings=100000, refresh_interval=1):
+        self.max_buildings = max_buildings
+        self.refresh_interval = refresh_interval
+        self._lock = threading.Lock()
+        # обновляет индекс один поток за раз
+        self._refresh_lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        self.keys = []
+        self.owners = []
+        # ключи здания, строки общие со списком keys
+        self.building_keys = {}
+        self.ready = False
+        self.overflow = False
+        # номер последнего применённого изменения из журнала
+        self.seq = 0
+        self.built = None
+        self.checked = None
+
+    def _add(self, pk, address):
+        self.building_keys[pk] = keys = tuple(address_keys(*address))
+        for key in keys:
+            position = bisect_left(self.keys, key)
+            self.keys.insert(position, key)
+            self.owners.insert(position, pk)
+
+    def _remove(self, pk):
+        for key in self.building_keys.pop(pk, ()):
+            position = bisect_left(self.keys, key)
+            while self.owners[position] != pk:
+                position += 1
+            del self.keys[position]
+            del self.owners[position]
+
+    def rebuild(self):
+        # номер берётся до чтения зданий: изменения между ними применятся повторно
+        seq = last_change()
+        building_keys, keys, owners = {}, [], []
+        overflow = Building.objects.count() > self.max_buildings
+        if not overflow:
+            entries = []
+            for pk, *address in Building.objects.values_list('pk', *ADDRESS_FIELDS).iterator():
+                building_keys[pk] = pk_keys = tuple(address_keys(*address))
+                entries.extend((key, pk) for key in pk_keys)
+            entries.sort()
+            keys = [key for key, pk in entries]
+            owners = [pk for key, pk in entries]
+        with self._lock:
+            self.keys, self.owners, self.building_keys = keys, owners, building_keys
+            self.overflow, self.seq = overflow, seq
+            self.built = self.checked = time.monotonic()
+            self.ready = True
+
+    def refresh(self):
+        """Применяет изменения зданий из журнала после self.seq"""
+        self.checked = time.monotonic()
+        if horizon() > self.seq:
+            # метки удаления после self.seq могли быть сжаты
+            return self.rebuild()
+        events = list(ChangeEvent.objects.filter(kind=KINDS[Building], seq__gt=self.seq)
+                      .order_by('seq').values_list('seq', 'object_id'))
+        if not events:
+            return
+        if self.overflow:
+            # зданий могло стать меньше max_buildings
+            return self.rebuild()
+        pks = list(dict.fromkeys(pk for seq, pk in events))
+        rows = []
+        for chunk in chunks(pks):
+            rows.extend(Building.objects.filter(pk__in=chunk).values_list('pk', *ADDRESS_FIELDS))
+        with self._lock:
+            # зданий, которых нет среди rows, больше нет в базе
+            for pk in pks:
+                self._remove(pk)
+            for pk, *address in rows:
+                self._add(pk, tuple(address))
+            self.seq = events[-1][0]
+        if len(self.building_keys) > self.max_buildings:
+            self.rebuild()
+
+    def ensure(self):
+        if not self.ready:
+            # первый запрос процесса ждёт построения индекса
+            with self._refresh_lock:
+                if not self.ready:
+                    self.rebuild()
+            return
+        if self.checked is not None and time.monotonic() - self.checked < self.refresh_interval:
+            return
+        # индекс уже обновляет другой поток - ищем по прежнему
+        if self._refresh_lock.acquire(blocking=False):
+            try:
+                self.refresh()
+            finally:
+                self._refresh_lock.release()
+
+    def invalidate(self):
+        """Изменения зданий этого процесса, вызывается после коммита
+
+        Следующий поиск сразу применит их из журнала, не дожидаясь
+        refresh_interval.
+        """
+        self.checked = None
+
+    def lookup(self, prefix, limit=10):
+        """[(pk, (город, улица, номер))] по алфавиту ключей"""
+        key = normalize(prefix)
+        if not key:
+            return []
+        self.ensure()
+        with self._lock:
+            overflow, found = self.overflow, []
+            if not overflow:
+                for position in range(bisect_left(self.keys, key), len(self.keys)):
+                    if not self.keys[position].startswith(key) or len(found) == limit:
+                        break
+                    pk = self.owners[position]
+                    if pk not in found:
+                        found.append(pk)
+        if not overflow:
+            # сами адреса в памяти не хранятся, подсказок не больше limit
+            addresses = {pk: tuple(address) for pk, *address in
+                         Building.objects.filter(pk__in=found).values_list('pk', *ADDRESS_FIELDS)}
+            return [(pk, addresses[pk]) for pk in found if pk in addresses]
+        # регистр как во вводе: LIKE в SQLite не сворачивает регистр кириллицы
+        word = SEPARATORS.sub(' ', prefix).split()[0]
+        rows = (
+            Building.objects.filter(Q(City__istartswith=word) | Q(Street__istartswith=word))
+            .order_by('City', 'Street', 'Number').values_list('pk', *ADDRESS_FIELDS)[:limit]
+        )
+        return [(pk, tuple(address)) for pk, *address in rows]
+
+
+_options = getattr(settings, 'ADDRESS_AUTOCOMPLETE', {})
+address_index = AddressIndex(
+    max_buildings=_options.get('MAX_BUILDINGS', 100000),
+    refresh_interval=_options.get('REFRESH_INTERVAL', 1),
+)
+
+
+@receiver(post_save, sender=Building)
+def index_address(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and not set(update_fields) & set(ADDRESS_FIELDS):
+        return
+    transaction.on_commit(address_index.invalidate)
+
+
+@receiver(post_delete, sender=Building)
+def remove_address(sender, instance, **kwargs):
+    transaction.on_commit(address_index.invalidate)
+
+
+@receiver(bulk_changed, sender=Building)
+def index_bulk_addresses(sender, pks, **kwargs):
+    transaction.on_commit(address_index.invalidate)
@@ -0,0 +1,143 @@
+import asyncio
+import io
+import json
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.core.handlers.exception import response_for_exception
+from django.core.handlers.wsgi import WSGIRequest
+from django.db import close_old_connections, connection, transaction
+from django.urls import Resolver404, resolve
+from rest_framework import serializers, status
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+# у каждого потока своё соединение с базой
+executor = ThreadPoolExecutor(
+    max_workers=getattr(settings, 'BATCH_MAX_WORKERS', 4), thread_name_prefix='batch',
+)
+
+
+class BatchItemSerializer(serializers.Serializer):
+    method = serializers.ChoiceField(choices=('GET', 'HEAD', 'OPTIONS', 'POST', 'PUT', 'PATCH', 'DELETE'),
+                                     default='GET')
+    path = serializers.RegexField(r'^/', max_length=2000)
+    body = serializers.JSONField(required=False)
+
+
+class BatchSerializer(serializers.Serializer):
+    requests = BatchItemSerializer(many=True, allow_empty=False)
+    atomic = serializers.BooleanField(default=False)
+
+    def validate_requests(self, value):
+        max_requests = getattr(settings, 'BATCH_MAX_REQUESTS', 50)
+        if len(value) > max_requests:
+            raise serializers.ValidationError('Не больше %d запросов в пакете' % max_requests)
+        return value
+
+
+def sub_request(request, item):
+    """Запрос пакета как отдельный запрос с окружением и пользователем исходного"""
+    url = urlsplit(item['path'])
+    payload = json.dumps(item['body']).encode() if 'body' in item else b''
+    environ = {key: value for key, value in request.META.items() if not key.startswith(('CONTENT_', 'wsgi.'))}
+    environ.update({
+        'REQUEST_METHOD': item['method'],
+        'PATH_INFO': url.path,
+        'QUERY_STRING': url.query,
+        'CONTENT_TYPE': 'application/json',
+        'CONTENT_LENGTH': str(len(payload)),
+        'wsgi.input': io.BytesIO(payload),
+        'wsgi.url_scheme': request.scheme,
+    })
+    sub = WSGIRequest(environ)
+    sub.COOKIES = request.COOKIES
+    # аутентификация уже выполнена для всего пакета
+    sub.user = sub._force_auth_user = request.user
+    sub._force_auth_token = request.auth
+    return sub
+
+
+def execute(request, item):
+    """Выполняет запрос пакета, возвращает {status, headers, body}"""
+    sub = sub_request(request, item)
+    try:
+        match = resolve(sub.path_info)
+    except Resolver404:
+        return {'status': status.HTTP_404_NOT_FOUND, 'headers': {}, 'body': {'detail': 'Страница не найдена.'}}
+    if getattr(match.func, 'cls', None) is BatchView:
+        return {'status': status.HTTP_400_BAD_REQUEST, 'headers': {},
+                'body': {'detail': 'Вложенные пакеты не поддерживаются'}}
+    sub.resolver_match = match
+    view = match.func
+    if asyncio.iscoroutinefunction(view):
+        # асинхронные чтения под ASGI (center_app.async_views) выполняются в
+        # своём пуле со своими соединениями и не видят транзакцию пакета;
+        # вызывается то же представление DRF синхронно, в потоке пакета
+        view = view.cls.as_view(**view.initkwargs) if hasattr(view, 'cls') else async_to_sync(view)
+    try:
+        response = view(sub, *match.args, **match.kwargs)
+    except Exception as exc:
+        # как обработчик Django: Http404, PermissionDenied и прочее - в ответ
+        response = response_for_exception(sub, exc)
+    if getattr(response, 'streaming', False):
+        return {'status': status.HTTP_400_BAD_REQUEST, 'headers': {},
+                'body': {'detail': 'Потоковые ответы в пакете не поддерживаются'}}
+    if hasattr(response, 'data'):
+        body = response.data
+    else:
+        content = response.content.decode(response.charset)
+        body = json.loads(content) if response.get('Content-Type', '').startswith('application/json') else content
+    return {'status': response.status_code, 'headers': dict(response.items()), 'body': body}
+
+
+def execute_in_pool(request, item):
+    close_old_connections()
+    try:
+        return execute(request, item)
+    finally:
+        close_old_connections()
+
+
+class BatchView(APIView):
+    """Несколько запросов к API за один HTTP-запрос
+
+    POST {"requests": [{"method", "path", "body"}, ...], "atomic": false}.
+    Запросы выполняются по порядку с пользователем пакета; идущие подряд
+    чтения выполняются параллельно, запись дожидается предыдущих запросов.
+    При atomic все запросы идут в одной транзакции и откатываются, если
+    хотя бы один ответ - ошибка; тогда пакет отвечает 400.
+    """
+
+    def post(self, request, format=None):
+        serializer = BatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        items = serializer.validated_data['requests']
+
+        if serializer.validated_data['atomic']:
+            with transaction.atomic():
+                results = [execute(request, item) for item in items]
+                committed = all(result['status'] < 400 for result in results)
+                if not committed:
+                    transaction.set_rollback(True)
+            return Response({'committed': committed, 'results': results},
+                            status=status.HTTP_200_OK if committed else status.HTTP_400_BAD_REQUEST)
+        return Response({'results': self.run(request, items)})
+
+    def run(self, request, items):
+        # другие соединения не видят незафиксированную транзакцию запроса
+        if connection.in_atomic_block:
+            return [execute(request, item) for item in items]
+        results, reads = [], []
+        for item in items:
+            if item['method'] in SAFE_METHODS:
+                reads.append(executor.submit(execute_in_pool, request, item))
+                continue
+            results.extend(future.result() for future in reads)
+            reads = []
+            results.append(execute(request, item))
+        results.extend(future.result() for future in reads)
+        return results
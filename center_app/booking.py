@@ -0,0 +1,96 @@
+import datetime
+
+from django.db import connection
+from django.db.models import F
+from rest_framework.exceptions import ValidationError
+
+from .models import Apartment, Contract
+
+
+def lock_apartments(apartment_ids):
+    """Блокирует квартиры до конца транзакции
+
+    Проверка пересечений и запись договора должны идти под блокировкой,
+    иначе два параллельных запроса могут забронировать одни и те же даты.
+    SQLite не поддерживает SELECT ... FOR UPDATE, поэтому там блокировку
+    записи берёт холостой UPDATE.
+    """
+    apartment_ids = sorted(set(apartment_ids))
+    for start in range(0, len(apartment_ids), 900):
+        queryset = Apartment.objects.filter(pk__in=apartment_ids[start:start + 900])
+        if connection.features.has_select_for_update:
+            list(queryset.select_for_update().values_list('pk', flat=True))
+        else:
+            queryset.update(Number=F('Number'))
+
+
+def parse_period(params, default=None):
+    """Полуинтервал дат из ?from= и ?to=
+
+    default - пара дат, которая подставляется вместо отсутствующих параметров.
+    """
+    period, errors = {}, {}
+    for index, param in enumerate(('from', 'to')):
+        value = params.get(param)
+        if value is None and default is not None:
+            period[param] = default[index]
+            continue
+        try:
+            period[param] = datetime.date.fromisoformat(value)
+        except (TypeError, ValueError):
+            errors[param] = 'Ожидается дата в формате ГГГГ-ММ-ДД'
+    if not errors and period['to'] <= period['from']:
+        errors['to'] = 'Дата окончания должна быть позже даты начала'
+    if errors:
+        raise ValidationError(errors)
+    return period['from'], period['to']
+
+
+def intervals_overlap(start, end, other_start, other_end):
+    """Пересечение полуинтервалов, пустая дата - открытая граница"""
+    return ((start is None or other_end is None or start < other_end)
+            and (end is None or other_start is None or other_start < end))
+
+
+def find_conflict(apartment, start, end, exclude=None):
+    """Активный договор, занимающий квартиру в [start, end)"""
+    queryset = Contract.objects.active().overlapping(start, end).filter(ApartmentID=apartment)
+    if exclude is not None:
+        queryset = queryset.exclude(pk=exclude)
+    return queryset.values_list('pk', flat=True).first()
+
+
+def find_batch_conflicts(contracts):
+    """Для каждого договора пакета - ключ конфликтующего договора или None
+
+    Учитываются и договоры в базе, и предыдущие договоры того же пакета.
+    """
+    active = [c for c in contracts if c.Status in Contract.ACTIVE_STATUSES]
+    apartment_ids = sorted({c.ApartmentID_id for c in active})
+    own = {c.pk for c in contracts}
+    queryset = Contract.objects.active()
+    starts = [c.startDate for c in active]
+    ends = [c.endDate for c in active]
+    if active and None not in starts and None not in ends:
+        # достаточно договоров, задевающих общий диапазон дат пакета
+        queryset = queryset.overlapping(min(starts), max(ends))
+    booked = {}
+    for start in range(0, len(apartment_ids), 900):
+        rows = (queryset.filter(ApartmentID__in=apartment_ids[start:start + 900])
+                .values_list('pk', 'ApartmentID', 'startDate', 'endDate'))
+        for pk, apartment, start_date, end_date in rows:
+            if pk not in own:
+                booked.setdefault(apartment, []).append((pk, start_date, end_date))
+
+    conflicts = []
+    for contract in contracts:
+        conflict = None
+        if contract.Status in Contract.ACTIVE_STATUSES:
+            taken = booked.setdefault(contract.ApartmentID_id, [])
+            for pk, start_date, end_date in taken:
+                if pk != contract.pk and intervals_overlap(contract.startDate, contract.endDate, start_date, end_date):
+                    conflict = pk
+                    break
+            taken.append((contract.pk, contract.startDate, contract.endDate))
+        conflicts.append(conflict)
+    return conflicts
@@ -0,0 +1,286 @@
+import json
+
+from django.conf import settings
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import transaction
+from rest_framework import generics, serializers, status
+from rest_framework.exceptions import ParseError, ValidationError
+from rest_framework.parsers import BaseParser, JSONParser
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.validators import UniqueValidator
+
+from .signals import bulk_changed, bulk_changing
+
+# SQLite ограничивает число параметров в одном запросе
+QUERY_CHUNK = 900
+
+
+def chunks(items, size=QUERY_CHUNK):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def to_pks(model, values):
+    """Приводит сырые значения к типу первичного ключа, пропуская мусор"""
+    pks = []
+    for value in values:
+        if isinstance(value, bool):
+            continue
+        try:
+            pk = model._meta.pk.to_python(value)
+        except (TypeError, DjangoValidationError):
+            continue
+        if pk is not None:
+            pks.append(pk)
+    return pks
+
+
+def existing_pks(queryset, pks):
+    found = set()
+    for chunk in chunks(list(set(pks))):
+        found.update(queryset.filter(pk__in=chunk).values_list('pk', flat=True))
+    return found
+
+
+class NDJSONParser(BaseParser):
+    """Поток JSON-объектов, по одному на строку"""
+    media_type = 'application/x-ndjson'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        if stream is None:
+            return []
+        encoding = (parser_context or {}).get('encoding', settings.DEFAULT_CHARSET)
+        items = []
+        for number, line in enumerate(stream, start=1):
+            line = line.decode(encoding).strip()
+            if not line:
+                continue
+            try:
+                items.append(json.loads(line))
+            except ValueError as exc:
+                raise ParseError('NDJSON, строка %d: %s' % (number, exc))
+        return items
+
+
+class BulkPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """Связь по ключу, разрешаемая по объектам, заранее загруженным на весь пакет"""
+
+    def to_internal_value(self, data):
+        related = self.context.get('bulk_related')
+        if related is None:
+            return super().to_internal_value(data)
+        model = self.get_queryset().model
+        pks = to_pks(model, [data])
+        if not pks:
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        try:
+            return related[model][pks[0]]
+        except KeyError:
+            self.fail('does_not_exist', pk_value=data)
+
+
+class BulkListSerializer(serializers.ListSerializer):
+    """Проверка пакета: связанные объекты загружаются одним запросом на модель"""
+
+    def related_fields(self):
+        for name, field in self.child.fields.items():
+            if field.read_only:
+                continue
+            many = isinstance(field, serializers.ManyRelatedField)
+            relation = field.child_relation if many else field
+            if isinstance(relation, BulkPrimaryKeyRelatedField):
+                yield name, relation, many
+
+    def load_related(self, data):
+        wanted = {}
+        for name, relation, many in self.related_fields():
+            model = relation.get_queryset().model
+            values = []
+            for item in data:
+                if not isinstance(item, dict) or item.get(name) is None:
+                    continue
+                value = item[name]
+                values.extend(value if many and isinstance(value, list) else [value])
+            wanted.setdefault(model, set()).update(to_pks(model, values))
+        return {
+            model: model._default_manager.in_bulk(list(pks)) if pks else {}
+            for model, pks in wanted.items()
+        }
+
+    def to_internal_value(self, data):
+        if isinstance(data, list):
+            max_items = getattr(settings, 'BULK_MAX_ITEMS', 10000)
+            if len(data) > max_items:
+                raise ValidationError({
+                    api_settings.NON_FIELD_ERRORS_KEY: ['Не больше %d объектов за запрос' % max_items]
+                })
+            self._context['bulk_related'] = self.load_related(data)
+        return super().to_internal_value(data)
+
+
+class BulkSerializerMixin:
+    """Сериализатор элемента пакета
+
+    Проверки, требующие обращения к базе (уникальность ключа, существование
+    связанных объектов), выполняются по данным, загруженным на весь пакет.
+    """
+    serializer_related_field = BulkPrimaryKeyRelatedField
+
+    def get_fields(self):
+        fields = super().get_fields()
+        pk_field = fields.get(self.Meta.model._meta.pk.name)
+        if pk_field is not None:
+            pk_field.validators = [
+                validator for validator in pk_field.validators
+                if not isinstance(validator, UniqueValidator)
+            ]
+        return fields
+
+    def validate(self, attrs):
+        attrs = super().validate(attrs)
+        pk_name = self.Meta.model._meta.pk.name
+        pk = attrs.get(pk_name)
+        taken = self.context.get('bulk_taken')
+        if taken is not None:
+            if pk in taken:
+                raise ValidationError({pk_name: ['Объект с таким ключом уже существует']})
+            taken.add(pk)
+        instances = self.context.get('bulk_instances')
+        if instances is not None and pk not in instances:
+            raise ValidationError({pk_name: ['Объект не найден']})
+        return attrs
+
+
+class BulkModelView(generics.GenericAPIView):
+    """Пакетное создание (POST), изменение (PUT, PATCH) и удаление (DELETE)
+
+    Принимает JSON-массив или NDJSON. Пакет проверяется целиком и пишется
+    bulk_create/bulk_update в одной транзакции; при ошибках ничего не
+    записывается, а в ответе возвращаются ошибки по каждому элементу.
+    """
+    parser_classes = (JSONParser, NDJSONParser)
+    batch_size = 500
+    bulk_context = {}
+
+    @property
+    def model(self):
+        return self.get_queryset().model
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context.update(self.bulk_context)
+        return context
+
+    def get_items(self):
+        items = self.request.data
+        if not isinstance(items, list):
+            raise ValidationError({api_settings.NON_FIELD_ERRORS_KEY: ['Ожидается массив объектов']})
+        return items
+
+    def item_pks(self, items):
+        pk_name = self.model._meta.pk.name
+        return to_pks(self.model, [item.get(pk_name) for item in items if isinstance(item, dict)])
+
+    def split_many_to_many(self, attrs):
+        return {
+            field: attrs.pop(field.name)
+            for field in self.model._meta.many_to_many if field.name in attrs
+        }
+
+    def set_many_to_many(self, values):
+        """values: {поле: {pk объекта: [связанные объекты]}}"""
+        for field, targets in values.items():
+            through = field.remote_field.through
+            source = through._meta.get_field(field.m2m_field_name()).attname
+            target = through._meta.get_field(field.m2m_reverse_field_name()).attname
+            for chunk in chunks(list(targets)):
+                through.objects.filter(**{source + '__in': chunk}).delete()
+            through.objects.bulk_create(
+                [through(**{source: pk, target: related.pk})
+                 for pk, related_objects in targets.items() for related in related_objects],
+                batch_size=self.batch_size,
+            )
+
+    def validate_objects(self, objects):
+        """Проверки всего пакета перед записью, выполняются внутри транзакции
+
+        objects идут в том же порядке, что и элементы запроса; ошибки
+        возвращаются списком той же длины через ValidationError.
+        """
+
+    def post(self, request, *args, **kwargs):
+        items = self.get_items()
+        self.bulk_context = {'bulk_taken': existing_pks(self.get_queryset(), self.item_pks(items))}
+        serializer = self.get_serializer(data=items, many=True)
+        serializer.is_valid(raise_exception=True)
+
+        objects, many_to_many = [], {}
+        for attrs in serializer.validated_data:
+            attrs = dict(attrs)
+            relations = self.split_many_to_many(attrs)
+            instance = self.model(**attrs)
+            objects.append(instance)
+            for field, related in relations.items():
+                many_to_many.setdefault(field, {})[instance.pk] = related
+
+        with transaction.atomic():
+            self.validate_objects(objects)
+            self.model.objects.bulk_create(objects, batch_size=self.batch_size)
+            self.set_many_to_many(many_to_many)
+            pks = [instance.pk for instance in objects]
+            bulk_changed.send(sender=self.model, pks=pks, action='create')
+        return Response({'count': len(pks), 'ids': pks}, status=status.HTTP_201_CREATED)
+
+    def put(self, request, *args, **kwargs):
+        items = self.get_items()
+        instances = {}
+        for chunk in chunks(list(set(self.item_pks(items)))):
+            instances.update(self.get_queryset().in_bulk(chunk))
+        self.bulk_context = {'bulk_instances': instances}
+        serializer = self.get_serializer(data=items, many=True, partial=kwargs.pop('partial', False))
+        serializer.is_valid(raise_exception=True)
+
+        pk_name = self.model._meta.pk.name
+        auto_now = [f for f in self.model._meta.concrete_fields if getattr(f, 'auto_now', False)]
+        objects, fields, many_to_many = [], set(f.name for f in auto_now), {}
+        for attrs in serializer.validated_data:
+            attrs = dict(attrs)
+            instance = instances[attrs.pop(pk_name)]
+            for field, related in self.split_many_to_many(attrs).items():
+                many_to_many.setdefault(field, {})[instance.pk] = related
+            for name, value in attrs.items():
+                setattr(instance, name, value)
+            fields.update(attrs)
+            for field in auto_now:
+                field.pre_save(instance, add=False)
+            objects.append(instance)
+
+        changed = {instance.pk: instance for instance in objects}
+        with transaction.atomic():
+            self.validate_objects(objects)
+            state = {}
+            bulk_changing.send(sender=self.model, pks=list(changed), state=state)
+            self.model.objects.bulk_update(list(changed.values()), sorted(fields), batch_size=self.batch_size)
+            self.set_many_to_many(many_to_many)
+            bulk_changed.send(sender=self.model, pks=list(changed), action='update', state=state)
+        return Response({'count': len(changed), 'ids': list(changed)})
+
+    def patch(self, request, *args, **kwargs):
+        kwargs['partial'] = True
+        return self.put(request, *args, **kwargs)
+
+    def delete(self, request, *args, **kwargs):
+        items = self.get_items()
+        found = existing_pks(self.get_queryset(), to_pks(self.model, items))
+        errors = []
+        for item in items:
+            pks = to_pks(self.model, [item])
+            errors.append({} if pks and pks[0] in found else {'pk': ['Объект не найден']})
+        if any(errors):
+            raise ValidationError(errors)
+
+        with transaction.atomic():
+            for chunk in chunks(list(found)):
+                self.get_queryset().filter(pk__in=chunk).delete()
+        return Response({'count': len(found), 'ids': sorted(found)})
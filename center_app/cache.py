@@ -0,0 +1,139 @@
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.response import Response
+
+from .models import Apartment, Building
+from .routers import reading_replicas, use_primary
+from .signals import bulk_changed, photo_variants_ready
+
+
+class ResponseCache:
+    """Кэш сериализованных ответов с версиями по пространствам имён
+
+    Ключ ответа включает текущие версии своих пространств, поэтому
+    изменение данных сводится к увеличению версии: старые записи больше
+    не находятся и вытесняются сами.
+    """
+    version_prefix = 'resp-version:'
+    key_prefix = 'resp:'
+
+    def __init__(self, cache_alias='default', timeout=300):
+        self.cache_alias = cache_alias
+        self.timeout = timeout
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    @property
+    def cache(self):
+        return caches[self.cache_alias]
+
+    def version(self, namespace):
+        key = self.version_prefix + namespace
+        version = self.cache.get(key)
+        if version is None:
+            # новое значение не совпадёт с вытесненной версией
+            self.cache.add(key, time.time_ns(), None)
+            version = self.cache.get(key)
+        return version
+
+    def bump(self, *namespaces):
+        for namespace in namespaces:
+            key = self.version_prefix + namespace
+            try:
+                self.cache.incr(key)
+            except ValueError:
+                self.cache.add(key, time.time_ns(), None)
+
+    def key(self, namespaces, path):
+        versions = ':'.join('%s=%s' % (ns, self.version(ns)) for ns in namespaces)
+        return '%s%s:%s' % (self.key_prefix, versions, path)
+
+    def get(self, key):
+        data = self.cache.get(key)
+        with self._lock:
+            if data is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return data
+
+    def set(self, key, data):
+        self.cache.set(key, data, self.timeout)
+
+    def stats(self):
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses}
+
+    def reset_stats(self):
+        with self._lock:
+            self.hits = self.misses = 0
+
+
+_options = getattr(settings, 'RESPONSE_CACHE', {})
+response_cache = ResponseCache(
+    cache_alias=_options.get('CACHE_ALIAS', 'default'),
+    timeout=_options.get('TIMEOUT', 300),
+)
+
+
+class CachedResponseMixin:
+    """Отдаёт GET из кэша, пока не изменились данные из cache_namespaces
+
+    Промах читается с основной базы: ответ с отстающей реплики попал бы
+    в кэш под новой версией и достался бы всем, в том числе записавшему
+    клиенту, который должен видеть свои изменения.
+    """
+    cache_namespaces = ()
+
+    def get(self, request, *args, **kwargs):
+        key = response_cache.key(self.cache_namespaces, request.build_absolute_uri())
+        data = response_cache.get(key)
+        if data is not None:
+            response = Response(data)
+            response['X-Cache'] = 'HIT'
+            return response
+        if reading_replicas():
+            with use_primary():
+                response = super().get(request, *args, **kwargs)
+        else:
+            response = super().get(request, *args, **kwargs)
+        if response.status_code == 200:
+            response_cache.set(key, response.data)
+        response['X-Cache'] = 'MISS'
+        return response
+
+
+def invalidate(*namespaces):
+    """Сбрасывает кэш сейчас и ещё раз после коммита
+
+    Первый сброс нужен чтениям внутри той же транзакции. Параллельный
+    запрос до коммита видит старые строки и может сохранить их под новой
+    версией; второй сброс после коммита убирает и их.
+    """
+    response_cache.bump(*namespaces)
+    transaction.on_commit(lambda: response_cache.bump(*namespaces))
+
+
+@receiver(post_save, sender=Apartment)
+@receiver(post_delete, sender=Apartment)
+@receiver(bulk_changed, sender=Apartment)
+@receiver(photo_variants_ready, sender=Apartment)
+def invalidate_apartments(sender, **kwargs):
+    # квартиры вложены в представление здания
+    invalidate('apartment', 'building')
+
+
+@receiver(post_save, sender=Building)
+@receiver(post_delete, sender=Building)
+@receiver(m2m_changed, sender=Building.Apartments.through)
+@receiver(bulk_changed, sender=Building)
+@receiver(photo_variants_ready, sender=Building)
+def invalidate_buildings(sender, **kwargs):
+    invalidate('building')
@@ -0,0 +1,172 @@
+import datetime
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .bulk import chunks
+from .models import Apartment, Building, ChangeCompaction, ChangeEvent, Contract, User
+from .serializers import (
+    ApartmentChangeSerializer, BuildingChangeSerializer, ContractChangeSerializer, UserChangeSerializer,
+)
+from .signals import bulk_changed, photo_variants_ready
+
+# тип объекта в ленте: выборка и сериализатор
+FEEDS = {
+    'apartment': (Apartment.objects.all(), ApartmentChangeSerializer),
+    'building': (Building.objects.prefetch_related('Apartments'), BuildingChangeSerializer),
+    'contract': (Contract.objects.all(), ContractChangeSerializer),
+    'user': (User.objects.prefetch_related('groups', 'user_permissions'), UserChangeSerializer),
+}
+KINDS = {queryset.model: kind for kind, (queryset, serializer_class) in FEEDS.items()}
+ACTIONS = {'create': 'c', 'update': 'u', 'delete': 'd'}
+ACTION_NAMES = {code: name for name, code in ACTIONS.items()}
+
+# ключ pg_advisory_xact_lock для записи журнала
+LOG_LOCK = 0x63686e67
+
+
+def option(name, default):
+    return getattr(settings, 'CHANGE_FEED', {}).get(name, default)
+
+
+def lock_log():
+    """Записи в журнал по одной транзакции за раз
+
+    Номер изменения выдаётся при вставке, а видна строка после коммита.
+    На PostgreSQL без блокировки транзакция с меньшим номером может
+    зафиксироваться позже, и клиент, уже прочитавший больший номер, её
+    пропустит. Блокировка держится до конца транзакции с самими данными.
+    SQLite и так пишет по одной транзакции.
+    """
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT pg_advisory_xact_lock(%s)', [LOG_LOCK])
+
+
+def write(kind, pks, action):
+    """Новая запись для каждого объекта вместо прежних"""
+    with transaction.atomic():
+        lock_log()
+        for chunk in chunks(pks):
+            ChangeEvent.objects.filter(kind=kind, object_id__in=chunk).delete()
+        ChangeEvent.objects.bulk_create([ChangeEvent(kind=kind, object_id=pk, action=action) for pk in pks])
+
+
+def record(model, pks, action):
+    """Записывает изменение объектов в журнал; action - create, update или delete
+
+    Запись идёт в транзакции самого изменения: откат убирает и её, а
+    зафиксированное изменение не остаётся без записи в журнале.
+    """
+    pks = list(dict.fromkeys(pks))
+    if pks:
+        write(KINDS[model], pks, ACTIONS[action])
+
+
+def horizon():
+    """Граница сжатия: клиент с since меньше неё мог пропустить удаление"""
+    return ChangeCompaction.objects.filter(pk=1).values_list('horizon', flat=True).first() or 0
+
+
+def compact(before=None):
+    """Удаляет метки удаления старше before (по умолчанию TOMBSTONE_DAYS дней)
+
+    Прочие записи сжимаются при записи: на объект остаётся последняя,
+    поэтому размер журнала ограничен числом объектов и удалений за
+    TOMBSTONE_DAYS. Возвращает число удалённых меток.
+    """
+    if before is None:
+        before = timezone.now() - datetime.timedelta(days=option('TOMBSTONE_DAYS', 30))
+    with transaction.atomic():
+        lock_log()
+        last = ChangeEvent.objects.filter(action=ACTIONS['delete'], created__lt=before) \
+            .order_by('-seq').values_list('seq', flat=True).first()
+        if last is None:
+            return 0
+        removed, _ = ChangeEvent.objects.filter(action=ACTIONS['delete'], seq__lte=last).delete()
+        ChangeCompaction.objects.update_or_create(pk=1, defaults={'horizon': last})
+    return removed
+
+
+def changes_since(since, limit, context=None):
+    """Изменения с номером больше since: (изменения, номер последнего, есть ли ещё)
+
+    Изменение - {seq, type, id, action, data}, у удаления data нет. Создание
+    и изменение клиент применяет одинаково: в журнале только последняя
+    запись объекта. Объект, которого уже нет в базе, отдаётся удалённым -
+    его метка удаления придёт позже.
+    """
+    events = list(ChangeEvent.objects.filter(seq__gt=since).order_by('seq')[:limit + 1])
+    more = len(events) > limit
+    events = events[:limit]
+
+    wanted = {}
+    for event in events:
+        if event.action != ACTIONS['delete']:
+            wanted.setdefault(event.kind, []).append(event.object_id)
+    rows = {}
+    for kind, pks in wanted.items():
+        queryset, serializer_class = FEEDS[kind]
+        for chunk in chunks(pks):
+            objects = list(queryset.filter(pk__in=chunk))
+            data = serializer_class(objects, many=True, context=context or {}).data
+            rows.update(((kind, instance.pk), item) for instance, item in zip(objects, data))
+
+    changes = []
+    for event in events:
+        item = rows.get((event.kind, event.object_id))
+        change = {'seq': event.seq, 'type': event.kind, 'id': event.object_id,
+                  'action': ACTION_NAMES[event.action] if item is not None else 'delete'}
+        if item is not None:
+            change['data'] = item
+        changes.append(change)
+    return changes, events[-1].seq if events else since, more
+
+
+@receiver(post_save, sender=Apartment)
+@receiver(post_save, sender=Building)
+@receiver(post_save, sender=Contract)
+@receiver(post_save, sender=User)
+def record_save(sender, instance, created, **kwargs):
+    record(sender, [instance.pk], 'create' if created else 'update')
+
+
+@receiver(post_delete, sender=Apartment)
+@receiver(post_delete, sender=Building)
+@receiver(post_delete, sender=Contract)
+@receiver(post_delete, sender=User)
+def record_delete(sender, instance, **kwargs):
+    record(sender, [instance.pk], 'delete')
+
+
+@receiver(bulk_changed, sender=Apartment)
+@receiver(bulk_changed, sender=Building)
+@receiver(bulk_changed, sender=Contract)
+def record_bulk(sender, pks, action, **kwargs):
+    record(sender, pks, action)
+
+
+@receiver(photo_variants_ready)
+def record_photo(sender, pk, **kwargs):
+    if sender in KINDS:
+        record(sender, [pk], 'update')
+
+
+@receiver(pre_delete, sender=Apartment)
+def record_apartment_buildings(sender, instance, **kwargs):
+    # квартира пропадает из списков квартир своих зданий
+    record(Building, Building.objects.filter(Apartments=instance).values_list('pk', flat=True), 'update')
+
+
+@receiver(m2m_changed, sender=Building.Apartments.through)
+def record_membership(sender, instance, action, reverse, pk_set, **kwargs):
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            record(Building, [instance.pk], 'update')
+    elif action == 'pre_clear':
+        record(Building, Building.objects.filter(Apartments=instance).values_list('pk', flat=True), 'update')
+    elif action in ('post_add', 'post_remove'):
+        record(Building, pk_set, 'update')
@@ -0,0 +1,31 @@
+from django.conf import settings
+from django.core.checks import Tags, Warning, register
+
+# настройки с кэшем, через который процессы сервера узнают об изменениях
+# друг друга: (настройка, алиас по умолчанию); настройка - алиас или
+# словарь с CACHE_ALIAS
+SHARED_CACHES = (
+    ('RESPONSE_CACHE', 'default'),
+    ('TOKEN_CACHE', None),
+    ('REPLICA_STICKY_CACHE', 'default'),
+)
+LOCAL_BACKENDS = ('LocMemCache', 'DummyCache')
+
+
+@register(Tags.caches, deploy=True)
+def check_shared_caches(app_configs, **kwargs):
+    """manage.py check --deploy: кэш в памяти процесса не виден другим воркерам"""
+    warnings = []
+    for name, default in SHARED_CACHES:
+        value = getattr(settings, name, default)
+        alias = value.get('CACHE_ALIAS', default) if isinstance(value, dict) else value
+        if alias is None:
+            continue
+        backend = settings.CACHES.get(alias, {}).get('BACKEND', '')
+        if backend.endswith(LOCAL_BACKENDS):
+            warnings.append(Warning(
+                '%s: кэш %r хранится в памяти процесса, другие процессы не увидят сбросов' % (name, alias),
+                hint='Укажите общий кэш, например CENTER_MEMCACHED=host:11211',
+                id='center_app.W001',
+            ))
+    return warnings
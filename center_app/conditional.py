@@ -0,0 +1,92 @@
+import hashlib
+from functools import reduce
+from operator import or_
+
+from django.db.models import Count, Max, Q, Subquery
+from django.utils.cache import get_conditional_response, quote_etag
+from django.utils.http import http_date
+
+from .changes import KINDS
+from .models import ChangeEvent
+
+
+class ConditionalGetMixin:
+    """Условный GET: ETag и Last-Modified без выборки самих объектов
+
+    Для объекта валидаторы - дата его изменения (и связанных объектов из
+    get_modified_fields). Для списка - номер последнего изменения таблиц
+    этих объектов в журнале /changes/: журнал пишется в одной транзакции
+    с данными, а номер берётся по индексу, без просмотра выборки. ETag
+    списка включает путь с параметрами, поэтому у страниц и фильтров он
+    свой. Ответ 304 отдаётся без сериализации.
+    """
+    modified_field = 'modifiedDate'
+    # вложенные объекты, изменения которых не попадают в журнал как изменения
+    # самих объектов списка: ('apartment',) для зданий
+    nested_change_kinds = ()
+
+    def get_modified_fields(self):
+        return [self.modified_field]
+
+    def get_change_kinds(self):
+        """Типы объектов журнала изменений, из которых собран ответ"""
+        kinds = set(self.nested_change_kinds)
+        for field in self.get_modified_fields():
+            model = self.get_queryset().model
+            for name in field.split('__')[:-1]:
+                model = model._meta.get_field(name).related_model
+            kinds.add(KINDS[model])
+        return sorted(kinds)
+
+    def last_changes(self):
+        """Последнее изменение каждого типа одним запросом: (тип, номер, дата)
+
+        Номер каждого типа берётся подзапросом по индексу (kind, seq).
+        """
+        latest = [
+            Q(seq=Subquery(ChangeEvent.objects.filter(kind=kind).order_by('-seq').values('seq')[:1]))
+            for kind in self.get_change_kinds()
+        ]
+        return ChangeEvent.objects.filter(reduce(or_, latest)).order_by('kind').values_list('kind', 'seq', 'created')
+
+    def get_validators(self):
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        if lookup_url_kwarg not in self.kwargs:
+            return self.get_list_validators()
+
+        queryset = self.get_queryset().filter(**{self.lookup_field: self.kwargs[lookup_url_kwarg]})
+        fields = self.get_modified_fields()
+        aggregates = {'field_%d' % i: Max(field) for i, field in enumerate(fields)}
+        summary = queryset.order_by().aggregate(count=Count('pk', distinct=True), **aggregates)
+        if not summary['count']:
+            return None, None
+
+        dates = [summary['field_%d' % i] for i in range(len(fields))]
+        last_modified = max((date for date in dates if date is not None), default=None)
+        return self.make_etag(summary['count'], *dates), last_modified
+
+    def get_list_validators(self):
+        changes = list(self.last_changes())
+        last_modified = max((created for kind, seq, created in changes), default=None)
+        return self.make_etag(*('%s=%d' % (kind, seq) for kind, seq, created in changes)), last_modified
+
+    def make_etag(self, *parts):
+        fingerprint = '|'.join([self.request.get_full_path()] + [
+            part.isoformat() if hasattr(part, 'isoformat') else '' if part is None else str(part)
+            for part in parts
+        ])
+        return quote_etag(hashlib.md5(fingerprint.encode()).hexdigest())
+
+    def get(self, request, *args, **kwargs):
+        etag, last_modified = self.get_validators()
+        if etag is not None:
+            timestamp = int(last_modified.timestamp()) if last_modified else None
+            response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+            if response is not None:
+                return response
+        response = super().get(request, *args, **kwargs)
+        if etag is not None and response.status_code == 200:
+            response['ETag'] = etag
+            if last_modified is not None:
+                response['Last-Modified'] = http_date(last_modified.timestamp())
+        return response
@@ -0,0 +1,77 @@
+import csv
+import datetime
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import Http404, StreamingHttpResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from rest_framework.exceptions import ValidationError
+from rest_framework.views import APIView
+
+
+class Echo:
+    """Псевдо-файл для csv.writer: строка сразу отдаётся в поток"""
+
+    def write(self, value):
+        return value
+
+
+def csv_rows(queryset, fields, chunk_size):
+    writer = csv.writer(Echo())
+    yield writer.writerow(fields)
+    for row in queryset.values_list(*fields).iterator(chunk_size=chunk_size):
+        yield writer.writerow(row)
+
+
+def ndjson_rows(queryset, fields, chunk_size):
+    for row in queryset.values(*fields).iterator(chunk_size=chunk_size):
+        yield json.dumps(row, cls=DjangoJSONEncoder, ensure_ascii=False) + '\n'
+
+
+class ExportView(APIView):
+    """Потоковая выгрузка таблицы в CSV или NDJSON
+
+    Строки читаются из базы порциями по chunk_size и сразу уходят клиенту,
+    поэтому память не зависит от размера таблицы. ?since= (дата или
+    дата и время) оставляет только записи, изменённые начиная с этого момента.
+    """
+    model = None
+    chunk_size = 2000
+    formats = {
+        'csv': (csv_rows, 'text/csv; charset=utf-8'),
+        'ndjson': (ndjson_rows, 'application/x-ndjson; charset=utf-8'),
+    }
+
+    def get_fields(self):
+        return [field.name for field in self.model._meta.concrete_fields]
+
+    def get_since(self):
+        value = self.request.query_params.get('since')
+        if not value:
+            return None
+        since = parse_datetime(value)
+        if since is None:
+            date = parse_date(value)
+            if date is None:
+                raise ValidationError({'since': 'Ожидается дата или дата и время в формате ISO 8601'})
+            since = datetime.datetime.combine(date, datetime.time.min)
+        if timezone.is_naive(since):
+            since = timezone.make_aware(since)
+        return since
+
+    def get_queryset(self):
+        queryset = self.model.objects.order_by('pk')
+        since = self.get_since()
+        if since is not None:
+            queryset = queryset.filter(modifiedDate__gte=since)
+        return queryset
+
+    def get(self, request, fmt, format=None):
+        if fmt not in self.formats:
+            raise Http404
+        rows, content_type = self.formats[fmt]
+        response = StreamingHttpResponse(
+            rows(self.get_queryset(), self.get_fields(), self.chunk_size), content_type=content_type)
+        response['Content-Disposition'] = 'attachment; filename="%s.%s"' % (self.model._meta.model_name, fmt)
+        return response
@@ -0,0 +1,142 @@
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db.models import Q, Value
+from django.db.models.functions import Coalesce
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import BaseFilterBackend, OrderingFilter
+
+COMPARISONS = ['exact', 'lt', 'lte', 'gt', 'gte']
+BOOLEANS = {'true': True, '1': True, 'false': False, '0': False}
+
+
+class FieldFilterBackend(BaseFilterBackend):
+    """Фильтры из параметров запроса: ?Cost__lte=5000&City=Москва
+
+    Разрешённые поля и сравнения задаёт filter_fields представления:
+    {'Cost': ['exact', 'lte', 'gte'], ...}; exact пишется без суффикса.
+    Прочие параметры не трогаются.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        allowed = getattr(view, 'filter_fields', {})
+        conditions, errors = Q(), {}
+        for param, values in request.query_params.lists():
+            name, _, lookup = param.partition('__')
+            lookup = lookup or 'exact'
+            if lookup not in allowed.get(name, ()):
+                continue
+            field = queryset.model._meta.get_field(name)
+            try:
+                conditions &= Q(**{'%s__%s' % (name, lookup): self.parse(field, lookup, values[-1])})
+            except (DjangoValidationError, ValueError):
+                errors[param] = 'Недопустимое значение: %s' % values[-1]
+        if errors:
+            raise ValidationError(errors)
+        return queryset.filter(conditions)
+
+    def parse(self, field, lookup, value):
+        if lookup == 'isnull':
+            return BOOLEANS[value.lower()]
+        target = getattr(field, 'target_field', field)
+        if lookup == 'in':
+            return [target.to_python(item) for item in value.split(',') if item]
+        if target.get_internal_type() == 'BooleanField':
+            return BOOLEANS[value.lower()]
+        return target.to_python(value)
+
+
+class KeysetOrderingFilter(OrderingFilter):
+    """Сортировка по ?ordering= из ordering_fields с ключом в конце
+
+    Первичный ключ замыкает порядок, чтобы строки с одинаковым значением
+    сортировки шли в одном и том же порядке на всех страницах.
+
+    Курсор выбирает следующую страницу условием ``поле > значение``, а
+    NULL под такое условие не попадает. Поля, которые могут быть пустыми,
+    перечисляются в ordering_nulls представления: {'startDate': date.min}.
+    Сортировка по ним идёт по значению с подставленным вместо NULL.
+    """
+    null_key_suffix = '_order'
+
+    def get_ordering(self, request, queryset, view):
+        ordering = list(super().get_ordering(request, queryset, view) or ())
+        nulls = getattr(view, 'ordering_nulls', {})
+        ordering = [
+            field + self.null_key_suffix if field.lstrip('-') in nulls else field
+            for field in ordering
+        ]
+        pk = queryset.model._meta.pk.name
+        if not any(field.lstrip('-') in (pk, 'pk') for field in ordering):
+            ordering.append(pk)
+        return ordering
+
+    def filter_queryset(self, request, queryset, view):
+        nulls = getattr(view, 'ordering_nulls', {})
+        ordering = self.get_ordering(request, queryset, view)
+        for name, default in nulls.items():
+            if any(field.lstrip('-') == name + self.null_key_suffix for field in ordering):
+                field = queryset.model._meta.get_field(name)
+                queryset = queryset.annotate(**{
+                    name + self.null_key_suffix: Coalesce(name, Value(default, output_field=field)),
+                })
+        return queryset.order_by(*ordering)
+
+
+class SparseFieldsMixin:
+    """Ответ только с полями из ?fields=, а запрос - только с их столбцами
+
+    Ставится первым в списке базовых классов представления, чтобы
+    .only() видел select_related и prefetch_related остальных примесей.
+    """
+    fields_param = 'fields'
+
+    def get_sparse_fields(self):
+        raw = self.request.query_params.get(self.fields_param)
+        if not raw:
+            return None
+        names = {name.strip() for name in raw.split(',') if name.strip()}
+        known = set(self.get_serializer_class()(context=self.get_serializer_context()).fields)
+        unknown = names - known
+        if unknown:
+            raise ValidationError({self.fields_param: 'Неизвестные поля: %s' % ', '.join(sorted(unknown))})
+        return names
+
+    def get_serializer(self, *args, **kwargs):
+        serializer = super().get_serializer(*args, **kwargs)
+        names = self.get_sparse_fields()
+        if names:
+            target = getattr(serializer, 'child', serializer)
+            for name in set(target.fields) - names:
+                target.fields.pop(name)
+        return serializer
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        names = self.get_sparse_fields()
+        if not names:
+            return queryset
+        serializer = self.get_serializer_class()(context=self.get_serializer_context())
+        sources = {serializer.fields[name].source.split('.')[0] for name in names}
+        opts = queryset.model._meta
+        # ключ и поля сортировки нужны пагинатору, связи из select_related - join'у
+        columns = {opts.pk.name} | {field.lstrip('-') for field in self.get_ordering_fields()}
+        if isinstance(queryset.query.select_related, dict):
+            columns |= set(queryset.query.select_related)
+        for source in sources:
+            try:
+                field = opts.get_field(source)
+            except Exception:
+                continue
+            if field.concrete and not field.many_to_many:
+                columns.add(field.name)
+        prefetch = [
+            lookup for lookup in queryset._prefetch_related_lookups
+            if str(getattr(lookup, 'prefetch_through', lookup)).split('__')[0] in sources
+        ]
+        return queryset.prefetch_related(None).prefetch_related(*prefetch).only(*columns)
+
+    def get_ordering_fields(self):
+        fields = getattr(self, 'ordering_fields', None) or ()
+        ordering = getattr(self, 'ordering', None) or ()
+        if isinstance(ordering, str):
+            ordering = (ordering,)
+        return [field for field in (*fields, *ordering) if field != '__all__']
@@ -0,0 +1,112 @@
+import io
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import close_old_connections, transaction
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from PIL import Image, ImageOps
+
+from .models import Apartment, Building, User
+from .signals import photo_variants_ready
+
+# Уменьшенные копии фотографий: имя -> (максимальные ширина и высота, качество JPEG)
+VARIANTS = getattr(settings, 'PHOTO_VARIANTS', {
+    'thumb': ((320, 320), 75),
+    'web': ((1280, 1280), 82),
+})
+
+logger = logging.getLogger(__name__)
+
+executor = ThreadPoolExecutor(
+    max_workers=getattr(settings, 'PHOTO_WORKERS', 2),
+    thread_name_prefix='photo-variants',
+)
+
+
+def variant_name(name, variant):
+    root, _ = os.path.splitext(name)
+    return 'variants/%s.%s.jpg' % (root, variant)
+
+
+def render_variants(name, storage=default_storage):
+    """Строит все уменьшенные копии фотографии name"""
+    with storage.open(name) as source:
+        image = ImageOps.exif_transpose(Image.open(source))
+        image.load()
+    if image.mode not in ('RGB', 'L'):
+        image = image.convert('RGB')
+
+    names = {}
+    for variant, (size, quality) in VARIANTS.items():
+        copy = image.copy()
+        copy.thumbnail(size, Image.LANCZOS)
+        buffer = io.BytesIO()
+        copy.save(buffer, 'JPEG', quality=quality, optimize=True, progressive=True)
+        target = variant_name(name, variant)
+        # ContentAddressedStorage перезаписывает копии одной операцией;
+        # другое хранилище дописало бы к занятому имени суффикс
+        if not target.startswith(getattr(storage, 'passthrough_prefixes', ())) and storage.exists(target):
+            storage.delete(target)
+        names[variant] = storage.save(target, ContentFile(buffer.getvalue()))
+    return names
+
+
+def process_photo(model, pk, name):
+    render_variants(name)
+    with transaction.atomic():
+        photo_variants_ready.send(sender=model, pk=pk)
+
+
+def process_photo_in_worker(model, pk, name):
+    close_old_connections()
+    try:
+        process_photo(model, pk, name)
+    finally:
+        close_old_connections()
+
+
+def schedule_variants(model, pk, name):
+    """Ставит построение копий в очередь фоновых потоков
+
+    PHOTO_VARIANTS_SYNC = True строит их сразу, в текущем потоке.
+    """
+    if getattr(settings, 'PHOTO_VARIANTS_SYNC', False):
+        return process_photo(model, pk, name)
+    future = executor.submit(process_photo_in_worker, model, pk, name)
+    future.add_done_callback(lambda done: log_failure(done, model, pk, name))
+    return future
+
+
+def log_failure(future, model, pk, name):
+    exception = None if future.cancelled() else future.exception()
+    if exception is not None:
+        logger.error('Не удалось построить копии %s для %s %s', name, model.__name__, pk,
+                     exc_info=(type(exception), exception, exception.__traceback__))
+
+
+def variant_urls(photo, storage=default_storage):
+    """URL готовых копий; пока копия строится, её в ответе нет"""
+    if not photo:
+        return None
+    urls = {}
+    for variant in VARIANTS:
+        name = variant_name(photo.name, variant)
+        if storage.exists(name):
+            urls[variant] = storage.url(name)
+    return urls
+
+
+@receiver(post_save, sender=Apartment)
+@receiver(post_save, sender=Building)
+@receiver(post_save, sender=User)
+def build_photo_variants(sender, instance, **kwargs):
+    photo = instance.Photo
+    if not photo or all(default_storage.exists(variant_name(photo.name, v)) for v in VARIANTS):
+        return
+    pk, name = instance.pk, photo.name
+    transaction.on_commit(lambda: schedule_variants(sender, pk, name))
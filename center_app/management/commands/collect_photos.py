@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from center_app.storage import collect_photos
+
+
+class Command(BaseCommand):
+    help = 'Сверяет счётчики ссылок на фотографии с записями и удаляет файлы без ссылок'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--grace', type=int, default=3600,
+                            help='не удалять файлы моложе стольких секунд')
+
+    def handle(self, *args, **options):
+        fixed, removed = collect_photos(grace=options['grace'])
+        self.stdout.write('Исправлено счётчиков: %d, удалено файлов: %d' % (fixed, removed))
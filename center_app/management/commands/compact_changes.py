@@ -0,0 +1,18 @@
+import datetime
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from center_app.changes import compact, horizon, option
+
+
+class Command(BaseCommand):
+    help = 'Удаляет из журнала изменений старые метки удаления'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=option('TOMBSTONE_DAYS', 30),
+                            help='сколько дней хранить метки удаления')
+
+    def handle(self, *args, **options):
+        removed = compact(timezone.now() - datetime.timedelta(days=options['days']))
+        self.stdout.write('Удалено меток: %d, граница сжатия: %d' % (removed, horizon()))
@@ -0,0 +1,134 @@
+import re
+
+from django.apps import apps
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import RequestFactory
+from django.urls import URLPattern, URLResolver, get_resolver
+from rest_framework.generics import GenericAPIView
+from rest_framework.request import Request
+
+# параметры, без которых некоторые списки не строят запрос
+SAMPLE_PARAMS = {'from': '2024-01-01', 'to': '2024-01-08'}
+
+# антисоединение по своей природе идёт по квартирам в порядке ключа
+# и останавливается, набрав страницу
+DEFAULT_ALLOWED = ('apartments/available/',)
+
+SCAN_PATTERNS = {
+    'sqlite': re.compile(r'\bSCAN (?:TABLE )?(\w+)(?: USING (?:COVERING )?INDEX (\w+))?'),
+    'postgresql': re.compile(r'Seq Scan on (\w+)()'),
+}
+
+
+def partial_indexes():
+    """Имена частичных индексов: их просмотр читает только подходящие строки"""
+    return {
+        index.name
+        for model in apps.get_models()
+        for index in model._meta.indexes
+        if index.condition is not None
+    }
+
+
+def iter_views(patterns, prefix=''):
+    for pattern in patterns:
+        if isinstance(pattern, URLResolver):
+            yield from iter_views(pattern.url_patterns, prefix + str(pattern.pattern))
+        elif isinstance(pattern, URLPattern):
+            view_class = getattr(pattern.callback, 'view_class', None)
+            if view_class and issubclass(view_class, GenericAPIView) and hasattr(view_class, 'get'):
+                yield prefix + str(pattern.pattern), view_class
+
+
+def view_querysets(route, view_class):
+    """Запросы, которые представление выполнит на GET: выборка и валидаторы условного GET"""
+    view, queryset = view_queryset(route, view_class)
+    querysets = [queryset]
+    if hasattr(view, 'last_changes') and queryset.query.high_mark is not None:
+        querysets.append(view.last_changes())
+    return querysets
+
+
+def view_queryset(route, view_class):
+    """Представление и запрос, который оно выполнит на GET"""
+    view = view_class()
+    request = Request(RequestFactory().get('/' + route, SAMPLE_PARAMS))
+    request.user = AnonymousUser()
+    view.setup(request)
+    view.request, view.format_kwarg = request, None
+    queryset = view.filter_queryset(view.get_queryset())
+    lookup = view.lookup_url_kwarg or view.lookup_field
+    if '<' in route and lookup in route:
+        return view, queryset.filter(**{view.lookup_field: 0})
+    paginator = view.paginator
+    if paginator is None:
+        return view, queryset
+    ordering = paginator.get_ordering(request, queryset, view)
+    return view, queryset.order_by(*ordering)[:paginator.get_page_size(request) + 1]
+
+
+def full_scans(plan, queryset, vendor):
+    """Таблицы, которые план просматривает целиком
+
+    Просмотр без фильтра в порядке индекса с LIMIT не считается: он
+    прочитает только страницу.
+    """
+    query = queryset.query
+    early_stop = not query.where and query.high_mark is not None and 'TEMP B-TREE' not in plan
+    partial = partial_indexes()
+    tables = []
+    for line in plan.splitlines():
+        match = SCAN_PATTERNS[vendor].search(line)
+        if match and not early_stop and match.group(2) not in partial:
+            tables.append(match.group(1))
+    return tables
+
+
+def table_rows(table):
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT COUNT(*) FROM %s' % connection.ops.quote_name(table))
+        return cursor.fetchone()[0]
+
+
+class Command(BaseCommand):
+    help = 'Печатает планы запросов GET-представлений и падает на полном просмотре больших таблиц'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--max-rows', type=int, default=1000,
+                            help='полный просмотр таблицы больше этого числа строк считается ошибкой')
+        parser.add_argument('--allow', action='append', default=None,
+                            help='маршрут, которому разрешён полный просмотр; можно повторять')
+
+    def handle(self, *args, **options):
+        vendor = connection.vendor
+        if vendor not in SCAN_PATTERNS:
+            raise CommandError('Разбор планов для %s не поддерживается' % vendor)
+        allowed = DEFAULT_ALLOWED if options['allow'] is None else options['allow']
+        failures = []
+        for route, view_class in iter_views(get_resolver().url_patterns):
+            try:
+                querysets = view_querysets(route, view_class)
+            except Exception as exc:
+                self.stdout.write('SKIP %s: %s' % (route, exc))
+                continue
+            plans, scans = [], []
+            for queryset in querysets:
+                plan = queryset.explain()
+                plans.append(plan)
+                scans += [
+                    (table, rows) for table, rows in
+                    ((table, table_rows(table)) for table in full_scans(plan, queryset, vendor))
+                    if rows > options['max_rows']
+                ]
+            plan = '\n'.join(plans)
+            status = 'OK'
+            if scans and route not in allowed:
+                status = 'FAIL'
+                failures.append('%s (%s)' % (route, ', '.join('%s: %d строк' % scan for scan in scans)))
+            self.stdout.write('%-4s %s' % (status, route))
+            for line in plan.splitlines():
+                self.stdout.write('       ' + line)
+        if failures:
+            raise CommandError('Полный просмотр больших таблиц: ' + '; '.join(failures))
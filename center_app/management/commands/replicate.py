@@ -0,0 +1,23 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from center_app.routers import replicas, replicate
+
+
+class Command(BaseCommand):
+    help = 'Копирует основную базу SQLite в реплики из DATABASE_REPLICAS'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float, default=0,
+                            help='повторять каждые N секунд; 0 - один раз')
+
+    def handle(self, *args, **options):
+        if not replicas():
+            self.stdout.write('DATABASE_REPLICAS пуст')
+            return
+        while True:
+            replicate()
+            if not options['interval']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from center_app.rollups import drift, rebuild
+
+
+class Command(BaseCommand):
+    help = 'Проверяет таблицы сводок по месяцам на расхождение с договорами или пересчитывает их'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rebuild', action='store_true', help='пересчитать сводки с нуля')
+        parser.add_argument('--limit', type=int, default=20, help='сколько расхождений показать')
+
+    def handle(self, *args, **options):
+        if options['rebuild']:
+            self.stdout.write('Строк в сводках: %d' % rebuild())
+            return
+        differences = drift()
+        for model, owner, month, stored, expected in differences[:options['limit']]:
+            self.stdout.write('%s %s %s: в таблице %s, по договорам %s' % (model, owner, month, stored, expected))
+        if differences:
+            raise CommandError('Расхождений: %d, выполните rollups --rebuild' % len(differences))
+        self.stdout.write('Сводки совпадают с договорами')
@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+
+from center_app.search import get_backend
+
+
+class Command(BaseCommand):
+    help = 'Заново индексирует квартиры и здания в поисковом индексе SEARCH_BACKEND'
+
+    def handle(self, *args, **options):
+        self.stdout.write('Документов в индексе: %d' % get_backend().rebuild())
@@ -0,0 +1,140 @@
+import mimetypes
+import os
+import re
+import stat
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseNotAllowed, StreamingHttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response, quote_etag
+from django.utils.http import http_date, parse_http_date_safe
+
+# Пути исходных файлов ContentAddressedStorage (ab/cd/<sha256>.jpg) никогда
+# не меняют содержимое; группа 1 - хэш. Уменьшенные копии в variants/ названы
+# по хэшу исходника и перестраиваются, под шаблон они не попадают.
+IMMUTABLE_PATH = re.compile(getattr(
+    settings, 'MEDIA_IMMUTABLE_PATTERN', r'[0-9a-f]{2}/[0-9a-f]{2}/([0-9a-f]{64})(\.[0-9A-Za-z]+)?',
+))
+RANGE = re.compile(r'^bytes=(\d*)-(\d*)$')
+CHUNK_SIZE = 64 * 1024
+
+
+def parse_range(header, size):
+    """(начало, конец) включительно для одного диапазона; None - отдать файл целиком
+
+    Несколько диапазонов в одном запросе не поддерживаются и отдаются целиком.
+    ValueError - диапазон за пределами файла (ответ 416).
+    """
+    match = RANGE.match(header.strip())
+    if not match:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        length = int(last)
+        if length == 0:
+            raise ValueError(header)
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or end < start:
+        raise ValueError(header)
+    return start, end
+
+
+def read_range(path, start, end):
+    with open(path, 'rb') as handle:
+        handle.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = handle.read(min(CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+def serve_media(request, path):
+    """Отдача загруженных файлов из MEDIA_ROOT
+
+    Полный ответ идёт через FileResponse, то есть через wsgi.file_wrapper
+    (sendfile) сервера. Если задан MEDIA_ACCEL_REDIRECT, тело отдаёт nginx
+    по X-Accel-Redirect. Поддерживаются Range, ETag и Last-Modified;
+    файлы, адресованные хэшем содержимого, кэшируются навсегда. Скрытые
+    файлы и каталоги (.incoming и т.п.) не отдаются.
+    """
+    if request.method not in ('GET', 'HEAD'):
+        return HttpResponseNotAllowed(['GET', 'HEAD'])
+    if any(part.startswith('.') for part in path.replace('\\', '/').split('/')):
+        raise Http404(path)
+    try:
+        full_path = safe_join(settings.MEDIA_ROOT, path)
+        info = os.stat(full_path)
+    except (SuspiciousFileOperation, OSError):
+        raise Http404(path)
+    if not stat.S_ISREG(info.st_mode):
+        raise Http404(path)
+
+    immutable = IMMUTABLE_PATH.fullmatch(path)
+    if immutable:
+        etag = quote_etag(immutable.group(1))
+        cache_control = 'public, max-age=31536000, immutable'
+    else:
+        etag = quote_etag('%x-%x' % (info.st_size, info.st_mtime_ns))
+        cache_control = 'public, max-age=%d' % getattr(settings, 'MEDIA_MAX_AGE', 3600)
+    last_modified = int(info.st_mtime)
+
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        response = build_media_response(request, path, full_path, info.st_size, etag, last_modified)
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    response['Cache-Control'] = cache_control
+    response['Accept-Ranges'] = 'bytes'
+    return response
+
+
+def build_media_response(request, path, full_path, size, etag, last_modified):
+    content_type, encoding = mimetypes.guess_type(full_path)
+    content_type = content_type or 'application/octet-stream'
+
+    accel = getattr(settings, 'MEDIA_ACCEL_REDIRECT', None)
+    if accel:
+        # nginx сам обработает Range и отдаст файл без участия воркера
+        response = HttpResponse(content_type=content_type)
+        response['X-Accel-Redirect'] = accel + quote(path)
+        return response
+
+    byte_range = None
+    header = request.META.get('HTTP_RANGE')
+    if header and if_range_matches(request, etag, last_modified):
+        try:
+            byte_range = parse_range(header, size)
+        except ValueError:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = 'bytes */%d' % size
+            return response
+
+    if byte_range is None:
+        response = FileResponse(open(full_path, 'rb'), content_type=content_type)
+    else:
+        start, end = byte_range
+        response = StreamingHttpResponse(read_range(full_path, start, end), status=206,
+                                         content_type=content_type)
+        response['Content-Range'] = 'bytes %d-%d/%d' % (start, end, size)
+        response['Content-Length'] = str(end - start + 1)
+    if encoding:
+        response['Content-Encoding'] = encoding
+    return response
+
+
+def if_range_matches(request, etag, last_modified):
+    value = request.META.get('HTTP_IF_RANGE')
+    if not value:
+        return True
+    if value.startswith(('"', 'W/')):
+        return value == etag
+    return parse_http_date_safe(value) == last_modified
@@ -1,81 +1,81 @@
-# Generated by Django 3.2.4 on 2021-06-22 19:30
-
-from django.conf import settings
-import django.contrib.auth.models
-import django.contrib.auth.validators
-from django.db import migrations, models
-import django.db.models.deletion
-import django.utils.timezone
-
-
-class Migration(migrations.Migration):
-
-    initial = True
-
-    dependencies = [
-        ('auth', '0012_alter_user_first_name_max_length'),
-    ]
-
-    operations = [
-        migrations.CreateModel(
-            name='User',
-            fields=[
-                ('UserID', models.IntegerField(auto_created=True, primary_key=True, serialize=False)),
-                ('password', models.CharField(max_length=128, verbose_name='password')),
-                ('last_login', models.DateTimeField(blank=True, null=True, verbose_name='last login')),
-                ('is_superuser', models.BooleanField(default=False, help_text='Designates that this user has all permissions without explicitly assigning them.', verbose_name='superuser status')),
-                ('username', models.CharField(error_messages={'unique': 'A user with that username already exists.'}, help_text='Required. 150 characters or fewer. Letters, digits and @/./+/-/_ only.', max_length=150, unique=True, validators=[django.contrib.auth.validators.UnicodeUsernameValidator()], verbose_name='username')),
-                ('first_name', models.CharField(blank=True, max_length=150, verbose_name='first name')),
-                ('last_name', models.CharField(blank=True, max_length=150, verbose_name='last name')),
-                ('email', models.EmailField(blank=True, max_length=254, verbose_name='email address')),
-                ('is_staff', models.BooleanField(default=False, help_text='Designates whether the user can log into this admin site.', verbose_name='staff status')),
-                ('is_active', models.BooleanField(default=True, help_text='Designates whether this user should be treated as active. Unselect this instead of deleting accounts.', verbose_name='active')),
-                ('date_joined', models.DateTimeField(default=django.utils.timezone.now, verbose_name='date joined')),
-                ('Passport', models.CharField(blank=True, max_length=100, null=True, verbose_name='Паспорт клиента')),
-                ('Phone', models.CharField(blank=True, max_length=11, null=True, verbose_name='Телефон для связи с клиентом')),
-                ('BirthDate', models.DateField(blank=True, null=True)),
-                ('groups', models.ManyToManyField(blank=True, help_text='The groups this user belongs to. A user will get all permissions granted to each of their groups.', related_name='user_set', related_query_name='user', to='auth.Group', verbose_name='groups')),
-                ('user_permissions', models.ManyToManyField(blank=True, help_text='Specific permissions for this user.', related_name='user_set', related_query_name='user', to='auth.Permission', verbose_name='user permissions')),
-            ],
-            options={
-                'verbose_name': 'user',
-                'verbose_name_plural': 'users',
-                'abstract': False,
-            },
-            managers=[
-                ('objects', django.contrib.auth.models.UserManager()),
-            ],
-        ),
-        migrations.CreateModel(
-            name='Apartment',
-            fields=[
-                ('ApartmentID', models.IntegerField(primary_key=True, serialize=False, verbose_name='Идентификатор')),
-                ('Number', models.IntegerField(verbose_name='Номер квартиры')),
-                ('Square', models.IntegerField(verbose_name='Общая площадь квартиры')),
-                ('Photo', models.ImageField(blank=True, null=True, upload_to='', verbose_name='Изображение')),
-                ('Cost', models.IntegerField(verbose_name='Суточная стоимость квартиры')),
-            ],
-        ),
-        migrations.CreateModel(
-            name='Contract',
-            fields=[
-                ('ContractID', models.IntegerField(primary_key=True, serialize=False, verbose_name='Регистрационный номер договора')),
-                ('Status', models.CharField(choices=[('v', 'На подтверждении'), ('l', 'Активен'), ('f', 'Завершен')], default='v', max_length=1, verbose_name='Статус')),
-                ('AgentID', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='topic_agent_id', to=settings.AUTH_USER_MODEL, verbose_name='Идентификационный номер агента')),
-                ('ApartmentID', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='center_app.apartment', verbose_name='Код квартиры')),
-                ('ClientID', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='topic_client_id', to=settings.AUTH_USER_MODEL, verbose_name='Регистрационный номер клиента')),
-            ],
-        ),
-        migrations.CreateModel(
-            name='Building',
-            fields=[
-                ('BuildingID', models.IntegerField(primary_key=True, serialize=False, verbose_name='Идентификатор')),
-                ('City', models.CharField(max_length=100, verbose_name='Город')),
-                ('Street', models.CharField(max_length=100, verbose_name='Улица')),
-                ('Number', models.CharField(max_length=100, verbose_name='Номер дома')),
-                ('Type', models.CharField(blank=True, max_length=100, null=True, verbose_name='Тип дома')),
-                ('Photo', models.ImageField(blank=True, null=True, upload_to='', verbose_name='Изображение')),
-                ('Apartments', models.ManyToManyField(blank=True, null=True, related_name='apartments', to='center_app.Apartment', verbose_name='Квартиры')),
-            ],
-        ),
-    ]
+# Generated by Django 3.2.4 on 2021-06-22 19:30
+
+from django.conf import settings
+import django.contrib.auth.models
+import django.contrib.auth.validators
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='User',
+            fields=[
+                ('UserID', models.IntegerField(auto_created=True, primary_key=True, serialize=False)),
+                ('password', models.CharField(max_length=128, verbose_name='password')),
+                ('last_login', models.DateTimeField(blank=True, null=True, verbose_name='last login')),
+                ('is_superuser', models.BooleanField(default=False, help_text='Designates that this user has all permissions without explicitly assigning them.', verbose_name='superuser status')),
+                ('username', models.CharField(error_messages={'unique': 'A user with that username already exists.'}, help_text='Required. 150 characters or fewer. Letters, digits and @/./+/-/_ only.', max_length=150, unique=True, validators=[django.contrib.auth.validators.UnicodeUsernameValidator()], verbose_name='username')),
+                ('first_name', models.CharField(blank=True, max_length=150, verbose_name='first name')),
+                ('last_name', models.CharField(blank=True, max_length=150, verbose_name='last name')),
+                ('email', models.EmailField(blank=True, max_length=254, verbose_name='email address')),
+                ('is_staff', models.BooleanField(default=False, help_text='Designates whether the user can log into this admin site.', verbose_name='staff status')),
+                ('is_active', models.BooleanField(default=True, help_text='Designates whether this user should be treated as active. Unselect this instead of deleting accounts.', verbose_name='active')),
+                ('date_joined', models.DateTimeField(default=django.utils.timezone.now, verbose_name='date joined')),
+                ('Passport', models.CharField(blank=True, max_length=100, null=True, verbose_name='Паспорт клиента')),
+                ('Phone', models.CharField(blank=True, max_length=11, null=True, verbose_name='Телефон для связи с клиентом')),
+                ('BirthDate', models.DateField(blank=True, null=True)),
+                ('groups', models.ManyToManyField(blank=True, help_text='The groups this user belongs to. A user will get all permissions granted to each of their groups.', related_name='user_set', related_query_name='user', to='auth.Group', verbose_name='groups')),
+                ('user_permissions', models.ManyToManyField(blank=True, help_text='Specific permissions for this user.', related_name='user_set', related_query_name='user', to='auth.Permission', verbose_name='user permissions')),
+            ],
+            options={
+                'verbose_name': 'user',
+                'verbose_name_plural': 'users',
+                'abstract': False,
+            },
+            managers=[
+                ('objects', django.contrib.auth.models.UserManager()),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Apartment',
+            fields=[
+                ('ApartmentID', models.IntegerField(primary_key=True, serialize=False, verbose_name='Идентификатор')),
+                ('Number', models.IntegerField(verbose_name='Номер квартиры')),
+                ('Square', models.IntegerField(verbose_name='Общая площадь квартиры')),
+                ('Photo', models.ImageField(blank=True, null=True, upload_to='', verbose_name='Изображение')),
+                ('Cost', models.IntegerField(verbose_name='Суточная стоимость квартиры')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Contract',
+            fields=[
+                ('ContractID', models.IntegerField(primary_key=True, serialize=False, verbose_name='Регистрационный номер договора')),
+                ('Status', models.CharField(choices=[('v', 'На подтверждении'), ('l', 'Активен'), ('f', 'Завершен')], default='v', max_length=1, verbose_name='Статус')),
+                ('AgentID', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='topic_agent_id', to=settings.AUTH_USER_MODEL, verbose_name='Идентификационный номер агента')),
+                ('ApartmentID', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='center_app.apartment', verbose_name='Код квартиры')),
+                ('ClientID', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='topic_client_id', to=settings.AUTH_USER_MODEL, verbose_name='Регистрационный номер клиента')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Building',
+            fields=[
+                ('BuildingID', models.IntegerField(primary_key=True, serialize=False, verbose_name='Идентификатор')),
+                ('City', models.CharField(max_length=100, verbose_name='Город')),
+                ('Street', models.CharField(max_length=100, verbose_name='Улица')),
+                ('Number', models.CharField(max_length=100, verbose_name='Номер дома')),
+                ('Type', models.CharField(blank=True, max_length=100, null=True, verbose_name='Тип дома')),
+                ('Photo', models.ImageField(blank=True, null=True, upload_to='', verbose_name='Изображение')),
+                ('Apartments', models.ManyToManyField(blank=True, null=True, related_name='apartments', to='center_app.Apartment', verbose_name='Квартиры')),
+            ],
+        ),
+    ]
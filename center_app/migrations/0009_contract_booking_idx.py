@@ -0,0 +1,17 @@
+# Generated by Django 3.2.2 on 2026-10-17 12:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('center_app', '0008_modifieddate'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='contract',
+            index=models.Index(fields=['ApartmentID', 'Status', 'startDate', 'endDate'], name='contract_booking_idx'),
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 3.2.2 on 2026-10-17 12:00
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('center_app', '0009_contract_booking_idx'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='contract',
+            name='AgentID',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='topic_agent_id', to=settings.AUTH_USER_MODEL, verbose_name='Идентификационный номер агента'),
+        ),
+        migrations.AlterField(
+            model_name='contract',
+            name='ClientID',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='topic_client_id', to=settings.AUTH_USER_MODEL, verbose_name='Регистрационный номер клиента'),
+        ),
+        migrations.AddIndex(
+            model_name='contract',
+            index=models.Index(fields=['Status', 'ContractID'], name='contract_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='contract',
+            index=models.Index(fields=['ClientID', 'Status'], name='contract_client_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='contract',
+            index=models.Index(fields=['AgentID', 'startDate'], name='contract_agent_start_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(condition=models.Q(('is_staff', True)), fields=['UserID'], name='user_agent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(condition=models.Q(('is_staff', False)), fields=['UserID'], name='user_client_idx'),
+        ),
+    ]
@@ -0,0 +1,63 @@
+# Generated by Django 3.2.2 on 2026-10-18 12:00
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('center_app', '0010_hot_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BuildingMonthRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField(verbose_name='Первый день месяца')),
+                ('contracts', models.IntegerField(default=0, verbose_name='Начато договоров')),
+                ('active_contracts', models.IntegerField(default=0, verbose_name='Начато активных договоров')),
+                ('booked_days', models.IntegerField(default=0, verbose_name='Оплачиваемые дни')),
+                ('revenue', models.BigIntegerField(default=0, verbose_name='Выручка')),
+                ('BuildingID', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='center_app.building', verbose_name='Здание')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ApartmentMonthRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField(verbose_name='Первый день месяца')),
+                ('contracts', models.IntegerField(default=0, verbose_name='Начато договоров')),
+                ('active_contracts', models.IntegerField(default=0, verbose_name='Начато активных договоров')),
+                ('booked_days', models.IntegerField(default=0, verbose_name='Оплачиваемые дни')),
+                ('revenue', models.BigIntegerField(default=0, verbose_name='Выручка')),
+                ('ApartmentID', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='center_app.apartment', verbose_name='Квартира')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='AgentMonthRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField(verbose_name='Первый день месяца')),
+                ('contracts', models.IntegerField(default=0, verbose_name='Начато договоров')),
+                ('active_contracts', models.IntegerField(default=0, verbose_name='Начато активных договоров')),
+                ('booked_days', models.IntegerField(default=0, verbose_name='Оплачиваемые дни')),
+                ('revenue', models.BigIntegerField(default=0, verbose_name='Выручка')),
+                ('AgentID', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Агент')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='buildingmonthrollup',
+            constraint=models.UniqueConstraint(fields=('BuildingID', 'month'), name='building_month_rollup_key'),
+        ),
+        migrations.AddConstraint(
+            model_name='apartmentmonthrollup',
+            constraint=models.UniqueConstraint(fields=('ApartmentID', 'month'), name='apartment_month_rollup_key'),
+        ),
+        migrations.AddConstraint(
+            model_name='agentmonthrollup',
+            constraint=models.UniqueConstraint(fields=('AgentID', 'month'), name='agent_month_rollup_key'),
+        ),
+    ]
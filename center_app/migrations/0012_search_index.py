@@ -0,0 +1,39 @@
+# Generated by Django 3.2.2 on 2026-10-18 12:00
+
+from django.db import migrations
+
+# FTS5 есть только в SQLite; на других базах search.get_backend выбирает DatabaseBackend
+CREATE = [
+    "CREATE VIRTUAL TABLE center_app_search USING fts5("
+    "kind UNINDEXED, City, Street, Number, Type, Description, "
+    "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')",
+    # адрес весит больше описания; kind в релевантности не участвует
+    "INSERT INTO center_app_search (center_app_search, rank) VALUES ('rank', 'bm25(0, 4, 4, 2, 2, 1)')",
+    "INSERT INTO center_app_search (rowid, kind, Description) "
+    "SELECT ApartmentID * 2, 'apartment', Description FROM center_app_apartment",
+    "INSERT INTO center_app_search (rowid, kind, City, Street, Number, Type, Description) "
+    "SELECT BuildingID * 2 + 1, 'building', City, Street, Number, Type, Description FROM center_app_building",
+]
+
+
+def create_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for statement in CREATE:
+        schema_editor.execute(statement)
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute('DROP TABLE IF EXISTS center_app_search')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('center_app', '0011_month_rollups'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 3.2.2 on 2026-10-18 12:00
+
+from django.db import migrations, models
+
+# существующие объекты попадают в журнал как созданные: since=0 отдаёт всё
+KINDS = (('user', 'User'), ('apartment', 'Apartment'), ('building', 'Building'), ('contract', 'Contract'))
+
+
+def record_existing(apps, schema_editor):
+    ChangeEvent = apps.get_model('center_app', 'ChangeEvent')
+    for kind, name in KINDS:
+        pks = apps.get_model('center_app', name).objects.order_by('pk').values_list('pk', flat=True)
+        ChangeEvent.objects.bulk_create(
+            (ChangeEvent(kind=kind, object_id=pk, action='c') for pk in pks.iterator()), batch_size=500,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('center_app', '0012_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChangeCompaction',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('horizon', models.BigIntegerField(default=0, verbose_name='Номер последней удалённой метки')),
+                ('compacted', models.DateTimeField(auto_now=True, verbose_name='Дата сжатия')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ChangeEvent',
+            fields=[
+                ('seq', models.BigAutoField(primary_key=True, serialize=False, verbose_name='Номер изменения')),
+                ('kind', models.CharField(max_length=16, verbose_name='Тип объекта')),
+                ('object_id', models.BigIntegerField(verbose_name='Ключ объекта')),
+                ('action', models.CharField(choices=[('c', 'Создание'), ('u', 'Изменение'), ('d', 'Удаление')], max_length=1, verbose_name='Действие')),
+                ('created', models.DateTimeField(auto_now_add=True, verbose_name='Дата изменения')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='changeevent',
+            index=models.Index(fields=['kind', 'object_id'], name='change_object_idx'),
+        ),
+        migrations.RunPython(record_existing, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 3.2.2 on 2026-10-18 12:00
+
+from collections import Counter
+
+from django.db import migrations, models
+
+PHOTO_MODELS = ('User', 'Apartment', 'Building')
+
+
+def count_references(apps, schema_editor):
+    StoredPhoto = apps.get_model('center_app', 'StoredPhoto')
+    references = Counter()
+    for name in PHOTO_MODELS:
+        model = apps.get_model('center_app', name)
+        references.update(model.objects.exclude(Photo__isnull=True).exclude(Photo='')
+                          .values_list('Photo', flat=True).iterator())
+    StoredPhoto.objects.bulk_create(
+        (StoredPhoto(name=name, references=count) for name, count in references.items()), batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('center_app', '0013_change_feed'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='apartment',
+            name='Photo',
+            field=models.ImageField(blank=True, db_index=True, null=True, upload_to='', verbose_name='Изображение'),
+        ),
+        migrations.AlterField(
+            model_name='building',
+            name='Photo',
+            field=models.ImageField(blank=True, db_index=True, null=True, upload_to='', verbose_name='Изображение'),
+        ),
+        migrations.AlterField(
+            model_name='user',
+            name='Photo',
+            field=models.ImageField(blank=True, db_index=True, null=True, upload_to='', verbose_name='Изображение'),
+        ),
+        migrations.CreateModel(
+            name='StoredPhoto',
+            fields=[
+                ('name', models.CharField(max_length=255, primary_key=True, serialize=False, verbose_name='Имя файла')),
+                ('references', models.IntegerField(default=0, verbose_name='Ссылок')),
+            ],
+        ),
+        migrations.RunPython(count_references, migrations.RunPython.noop),
+    ]
@@ -1,53 +1,184 @@
-from django.conf import settings
-from django.db import models
-from django.contrib.auth.models import AbstractUser
-
-
-class User(AbstractUser):
-    """описание пользователя"""
-    UserID = models.BigAutoField(primary_key=True, auto_created=True)
-    Passport = models.CharField(max_length=100, verbose_name='Паспорт клиента', null=True, blank=True)
-    Phone = models.CharField(max_length=11, verbose_name='Телефон для связи с клиентом', null=True, blank=True)
-    BirthDate = models.DateField(null=True, blank=True)
-    Photo = models.ImageField(verbose_name='Изображение', null=True, blank=True)
-
-
-class Apartment(models.Model):
-    """описание квартиры для продажи"""
-    ApartmentID = models.IntegerField(primary_key=True, verbose_name='Идентификатор')
-    Number = models.IntegerField(verbose_name='Номер квартиры')
-    Square = models.IntegerField(verbose_name='Общая площадь квартиры')
-    Description = models.CharField(max_length=255, verbose_name='Описание', null=True, blank=True)
-    Photo = models.ImageField(verbose_name='Изображение', null=True, blank=True)
-    Cost = models.IntegerField(verbose_name='Суточная стоимость квартиры')
-
-
-class Building(models.Model):
-    """описание здания для продажи"""
-    BuildingID = models.IntegerField(primary_key=True, verbose_name='Идентификатор')
-    City = models.CharField(max_length=100, verbose_name='Город')
-    Street = models.CharField(max_length=100, verbose_name='Улица')
-    Number = models.CharField(max_length=100, verbose_name='Номер дома')
-    Type = models.CharField(max_length=100, verbose_name='Тип дома', null=True, blank=True)
-    Description = models.CharField(max_length=255, verbose_name='Описание', null=True, blank=True)
-    Photo = models.ImageField(verbose_name='Изображение', null=True, blank=True)
-    Apartments = models.ManyToManyField(Apartment, null=True, blank=True, verbose_name="Квартиры",
-                                     related_name="apartments")
-
-
-class Contract(models.Model):
-    """описание договора продажи"""
-    status_types = (
-        ('v', 'На подтверждении'),
-        ('l', 'Активен'),
-        ('f', 'Завершен')
-    )
-    ContractID = models.IntegerField(primary_key=True, verbose_name='Регистрационный номер договора')
-    AgentID = models.ForeignKey(User, on_delete=models.CASCADE, related_name='topic_agent_id',
-                                verbose_name='Идентификационный номер агента')
-    ClientID = models.ForeignKey(User, on_delete=models.CASCADE, related_name='topic_client_id',
-                                 verbose_name='Регистрационный номер клиента')
-    ApartmentID = models.ForeignKey(Apartment, on_delete=models.CASCADE, verbose_name='Идентификатор квартиры')
-    Status = models.CharField(max_length=1, choices=status_types, default='v', verbose_name='Статус')
-    startDate = models.DateField(null=True, blank=True)
-    endDate = models.DateField(null=True, blank=True)
\ No newline at end of file
+from django.conf import settings
+from django.db import models, router, transaction
+from django.contrib.auth.models import AbstractUser
+
+
+class AtomicSaveMixin:
+    """save() в одной транзакции с сигналами pre_save и post_save
+
+    Сводки (rollups) читают прежнее состояние под блокировкой строки, а
+    журнал изменений (changes) пишется в той же транзакции, что и данные.
+    """
+
+    def save(self, *args, **kwargs):
+        with transaction.atomic(using=kwargs.get('using') or router.db_for_write(type(self), instance=self)):
+            super().save(*args, **kwargs)
+
+
+class User(AtomicSaveMixin, AbstractUser):
+    """описание пользователя"""
+    UserID = models.BigAutoField(primary_key=True, auto_created=True)
+    Passport = models.CharField(max_length=100, verbose_name='Паспорт клиента', null=True, blank=True)
+    Phone = models.CharField(max_length=11, verbose_name='Телефон для связи с клиентом', null=True, blank=True)
+    BirthDate = models.DateField(null=True, blank=True)
+    Photo = models.ImageField(verbose_name='Изображение', null=True, blank=True, db_index=True)
+    modifiedDate = models.DateTimeField(auto_now=True, db_index=True, verbose_name='Дата изменения')
+
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            # списки агентов и клиентов в порядке ключа; условие индекса
+            # совпадает с тем, как Django записывает фильтр is_staff
+            models.Index(fields=['UserID'], condition=models.Q(is_staff=True), name='user_agent_idx'),
+            models.Index(fields=['UserID'], condition=models.Q(is_staff=False), name='user_client_idx'),
+        ]
+
+
+class Apartment(AtomicSaveMixin, models.Model):
+    """описание квартиры для продажи"""
+    ApartmentID = models.IntegerField(primary_key=True, verbose_name='Идентификатор')
+    Number = models.IntegerField(verbose_name='Номер квартиры')
+    Square = models.IntegerField(verbose_name='Общая площадь квартиры')
+    Description = models.CharField(max_length=255, verbose_name='Описание', null=True, blank=True)
+    Photo = models.ImageField(verbose_name='Изображение', null=True, blank=True, db_index=True)
+    Cost = models.IntegerField(verbose_name='Суточная стоимость квартиры')
+    modifiedDate = models.DateTimeField(auto_now=True, db_index=True, verbose_name='Дата изменения')
+
+
+class Building(AtomicSaveMixin, models.Model):
+    """описание здания для продажи"""
+    BuildingID = models.IntegerField(primary_key=True, verbose_name='Идентификатор')
+    City = models.CharField(max_length=100, verbose_name='Город')
+    Street = models.CharField(max_length=100, verbose_name='Улица')
+    Number = models.CharField(max_length=100, verbose_name='Номер дома')
+    Type = models.CharField(max_length=100, verbose_name='Тип дома', null=True, blank=True)
+    Description = models.CharField(max_length=255, verbose_name='Описание', null=True, blank=True)
+    Photo = models.ImageField(verbose_name='Изображение', null=True, blank=True, db_index=True)
+    Apartments = models.ManyToManyField(Apartment, null=True, blank=True, verbose_name="Квартиры",
+                                     related_name="apartments")
+    modifiedDate = models.DateTimeField(auto_now=True, db_index=True, verbose_name='Дата изменения')
+
+
+class ContractQuerySet(models.QuerySet):
+
+    def active(self):
+        """Договоры, которые занимают квартиру"""
+        return self.filter(Status__in=Contract.ACTIVE_STATUSES)
+
+    def overlapping(self, start, end):
+        """Договоры, пересекающиеся с полуинтервалом [start, end)
+
+        Пустая дата начала или окончания считается открытой границей.
+        """
+        return self.filter(
+            models.Q(startDate__lt=end) | models.Q(startDate__isnull=True),
+            models.Q(endDate__gt=start) | models.Q(endDate__isnull=True),
+        )
+
+
+class Contract(AtomicSaveMixin, models.Model):
+    """описание договора продажи"""
+    status_types = (
+        ('v', 'На подтверждении'),
+        ('l', 'Активен'),
+        ('f', 'Завершен')
+    )
+    ACTIVE_STATUSES = ('v', 'l')
+    ContractID = models.IntegerField(primary_key=True, verbose_name='Регистрационный номер договора')
+    # отдельные индексы не нужны: поля открывают составные индексы из Meta
+    AgentID = models.ForeignKey(User, on_delete=models.CASCADE, related_name='topic_agent_id', db_index=False,
+                                verbose_name='Идентификационный номер агента')
+    ClientID = models.ForeignKey(User, on_delete=models.CASCADE, related_name='topic_client_id', db_index=False,
+                                 verbose_name='Регистрационный номер клиента')
+    ApartmentID = models.ForeignKey(Apartment, on_delete=models.CASCADE, verbose_name='Идентификатор квартиры')
+    Status = models.CharField(max_length=1, choices=status_types, default='v', verbose_name='Статус')
+    startDate = models.DateField(null=True, blank=True)
+    endDate = models.DateField(null=True, blank=True)
+    modifiedDate = models.DateTimeField(auto_now=True, db_index=True, verbose_name='Дата изменения')
+
+    objects = ContractQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # поиск занятости квартиры: ключ, статус, затем диапазон дат
+            models.Index(fields=['ApartmentID', 'Status', 'startDate', 'endDate'], name='contract_booking_idx'),
+            models.Index(fields=['Status', 'ContractID'], name='contract_status_idx'),
+            models.Index(fields=['ClientID', 'Status'], name='contract_client_status_idx'),
+            models.Index(fields=['AgentID', 'startDate'], name='contract_agent_start_idx'),
+        ]
+
+
+class MonthRollup(models.Model):
+    """Сводка договоров за месяц, ведётся center_app.rollups
+
+    contracts и active_contracts считаются в месяце начала договора,
+    booked_days и revenue - по дням оплачиваемых договоров в этом месяце.
+    """
+    month = models.DateField(verbose_name='Первый день месяца')
+    contracts = models.IntegerField(default=0, verbose_name='Начато договоров')
+    active_contracts = models.IntegerField(default=0, verbose_name='Начато активных договоров')
+    booked_days = models.IntegerField(default=0, verbose_name='Оплачиваемые дни')
+    revenue = models.BigIntegerField(default=0, verbose_name='Выручка')
+
+    class Meta:
+        abstract = True
+
+
+class AgentMonthRollup(MonthRollup):
+    """Сводка по агенту за месяц"""
+    AgentID = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+', verbose_name='Агент')
+
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=['AgentID', 'month'], name='agent_month_rollup_key')]
+
+
+class BuildingMonthRollup(MonthRollup):
+    """Сводка по зданию за месяц"""
+    BuildingID = models.ForeignKey(Building, on_delete=models.CASCADE, related_name='+', verbose_name='Здание')
+
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=['BuildingID', 'month'], name='building_month_rollup_key')]
+
+
+class ApartmentMonthRollup(MonthRollup):
+    """Сводка по квартире за месяц"""
+    ApartmentID = models.ForeignKey(Apartment, on_delete=models.CASCADE, related_name='+', verbose_name='Квартира')
+
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=['ApartmentID', 'month'], name='apartment_month_rollup_key')]
+
+
+class StoredPhoto(models.Model):
+    """Файл в ContentAddressedStorage и число сохранений, которые на него ссылаются"""
+    name = models.CharField(max_length=255, primary_key=True, verbose_name='Имя файла')
+    references = models.IntegerField(default=0, verbose_name='Ссылок')
+
+
+class ChangeEvent(models.Model):
+    """Последнее изменение объекта для ленты /changes/, ведётся center_app.changes
+
+    Номер изменения растёт монотонно; при новой записи прежние записи того
+    же объекта удаляются, поэтому в журнале не больше строки на объект.
+    """
+    action_types = (
+        ('c', 'Создание'),
+        ('u', 'Изменение'),
+        ('d', 'Удаление'),
+    )
+    seq = models.BigAutoField(primary_key=True, verbose_name='Номер изменения')
+    kind = models.CharField(max_length=16, verbose_name='Тип объекта')
+    object_id = models.BigIntegerField(verbose_name='Ключ объекта')
+    action = models.CharField(max_length=1, choices=action_types, verbose_name='Действие')
+    created = models.DateTimeField(auto_now_add=True, verbose_name='Дата изменения')
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['kind', 'object_id'], name='change_object_idx'),
+            # последнее изменение таблицы для ETag списков (center_app.conditional)
+            models.Index(fields=['kind', 'seq'], name='change_kind_seq_idx'),
+        ]
+
+
+class ChangeCompaction(models.Model):
+    """Граница сжатия журнала: метки удаления с номером не больше horizon удалены"""
+    horizon = models.BigIntegerField(default=0, verbose_name='Номер последней удалённой метки')
+    compacted = models.DateTimeField(auto_now=True, verbose_name='Дата сжатия')
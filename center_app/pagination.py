@@ -0,0 +1,114 @@
+import json
+
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import Cursor, CursorPagination, _reverse_ordering
+
+
+class KeysetPagination(CursorPagination):
+    """Курсорная пагинация по первичному ключу
+
+    Следующая страница выбирается условием ``pk > <последний ключ>``,
+    поэтому стоимость запроса не зависит от глубины листания.
+
+    При сортировке по другому полю курсор хранит значения всех полей
+    порядка, а ключ замыкает его: условие
+    ``(поле > v) OR (поле = v AND pk > id)`` не пропускает и не повторяет
+    строки с одинаковым значением, сколько бы их ни было. Смещение, как в
+    CursorPagination, не используется.
+    """
+    page_size = getattr(settings, 'PAGE_SIZE', 100)
+    page_size_query_param = 'page_size'
+    max_page_size = getattr(settings, 'MAX_PAGE_SIZE', 1000)
+
+    def get_ordering(self, request, queryset, view):
+        has_ordering_filter = any(
+            hasattr(backend, 'get_ordering')
+            for backend in getattr(view, 'filter_backends', [])
+        )
+        if not has_ordering_filter:
+            self.ordering = getattr(view, 'ordering', None) or queryset.model._meta.pk.name
+        ordering = tuple(super().get_ordering(request, queryset, view))
+        pk = queryset.model._meta.pk.name
+        if not any(field.lstrip('-') in (pk, 'pk') for field in ordering):
+            ordering += (pk,)
+        return ordering
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.cursor = self.decode_cursor(request)
+        reverse, position = (False, None) if self.cursor is None else self.cursor[1:]
+
+        queryset = queryset.order_by(*(_reverse_ordering(self.ordering) if reverse else self.ordering))
+        if position is not None:
+            queryset = queryset.filter(self.after(queryset, position, reverse))
+
+        results = list(queryset[:self.page_size + 1])
+        self.page = results[:self.page_size]
+        following = self._get_position_from_instance(results[-1], self.ordering) \
+            if len(results) > len(self.page) else None
+        if reverse:
+            self.page.reverse()
+            self.has_next, self.next_position = position is not None, position
+            self.has_previous, self.previous_position = following is not None, following
+        else:
+            self.has_next, self.next_position = following is not None, following
+            self.has_previous, self.previous_position = position is not None, position
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+        return self.page
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        position = self._get_position_from_instance(self.page[-1], self.ordering) if self.page \
+            else self.next_position
+        return self.encode_cursor(Cursor(offset=0, reverse=False, position=position))
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        position = self._get_position_from_instance(self.page[0], self.ordering) if self.page \
+            else self.previous_position
+        return self.encode_cursor(Cursor(offset=0, reverse=True, position=position))
+
+    def after(self, queryset, position, reverse):
+        """Условие на строки после позиции курсора в порядке self.ordering"""
+        try:
+            values = json.loads(position)
+            if not isinstance(values, list) or len(values) != len(self.ordering):
+                raise ValueError
+            values = [self.order_field(queryset, field.lstrip('-')).to_python(value)
+                      for field, value in zip(self.ordering, values)]
+        except (ValueError, TypeError, ValidationError, FieldDoesNotExist):
+            raise NotFound(self.invalid_cursor_message)
+        condition, equal = Q(), Q()
+        for field, value in zip(self.ordering, values):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') != reverse else 'gt'
+            condition |= equal & Q(**{'%s__%s' % (name, lookup): value})
+            equal &= Q(**{name: value})
+        return condition
+
+    def order_field(self, queryset, name):
+        if name == 'pk':
+            return queryset.model._meta.pk
+        annotation = queryset.query.annotations.get(name)
+        if annotation is not None:
+            return annotation.output_field
+        return queryset.model._meta.get_field(name)
+
+    def _get_position_from_instance(self, instance, ordering):
+        values = []
+        for field in ordering:
+            name = field.lstrip('-')
+            value = instance[name] if isinstance(instance, dict) else getattr(instance, name)
+            values.append(None if value is None else str(value))
+        return json.dumps(values)
@@ -0,0 +1,203 @@
+import os
+import threading
+import time
+
+
+class PoolTimeout(Exception):
+    """Свободное соединение не появилось за отведённое время"""
+
+
+class ConnectionPool:
+    """Ограниченный пул соединений одного процесса
+
+    factory открывает новое соединение, check проверяет соединение из пула
+    перед повторной выдачей. Соединения старше max_lifetime секунд
+    закрываются вместо повторного использования.
+    """
+
+    def __init__(self, factory, max_size=10, timeout=5, max_lifetime=600, check=None):
+        self.factory = factory
+        self.max_size = max_size
+        self.timeout = timeout
+        self.max_lifetime = max_lifetime
+        self.check = check
+        self._idle = []
+        self._born = {}
+        self._size = 0
+        self._condition = threading.Condition()
+        self.checked_out = 0
+        self.created = 0
+        self.reused = 0
+        self.discarded = 0
+        self.waits = 0
+        self.timeouts = 0
+
+    def acquire(self):
+        with self._condition:
+            if not self._idle and self._size >= self.max_size:
+                self.waits += 1
+                deadline = time.monotonic() + self.timeout
+                while not self._idle and self._size >= self.max_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self.timeouts += 1
+                        raise PoolTimeout('Нет свободного соединения за %s с' % self.timeout)
+                    self._condition.wait(remaining)
+            if self._idle:
+                conn = self._idle.pop()
+            else:
+                conn = None
+                # место занимается до открытия соединения вне блокировки
+                self._size += 1
+            self.checked_out += 1
+
+        if conn is not None:
+            if not self._expired(conn) and self._usable(conn):
+                with self._condition:
+                    self.reused += 1
+                return conn
+            # испорченное соединение заменяется новым на том же месте
+            self._close(conn)
+        return self._open()
+
+    def release(self, conn, discard=False):
+        """Возвращает соединение в пул; discard - закрыть его"""
+        discard = discard or self._expired(conn)
+        with self._condition:
+            self.checked_out -= 1
+            if not discard:
+                self._idle.append(conn)
+            self._condition.notify()
+        if discard:
+            self._close(conn)
+            with self._condition:
+                self._size -= 1
+                self._condition.notify()
+
+    def close_all(self):
+        with self._condition:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            self._close(conn)
+            with self._condition:
+                self._size -= 1
+
+    def stats(self):
+        with self._condition:
+            return {
+                'size': self._size,
+                'idle': len(self._idle),
+                'checked_out': self.checked_out,
+                'max_size': self.max_size,
+                'created': self.created,
+                'reused': self.reused,
+                'discarded': self.discarded,
+                'waits': self.waits,
+                'timeouts': self.timeouts,
+            }
+
+    def _open(self):
+        try:
+            conn = self.factory()
+        except Exception:
+            with self._condition:
+                self._size -= 1
+                self.checked_out -= 1
+                self._condition.notify()
+            raise
+        with self._condition:
+            self._born[id(conn)] = time.monotonic()
+            self.created += 1
+        return conn
+
+    def _close(self, conn):
+        with self._condition:
+            self._born.pop(id(conn), None)
+            self.discarded += 1
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def _expired(self, conn):
+        born = self._born.get(id(conn))
+        return born is not None and time.monotonic() - born > self.max_lifetime
+
+    def _usable(self, conn):
+        if self.check is None:
+            return True
+        try:
+            return self.check(conn)
+        except Exception:
+            return False
+
+
+def ping(conn):
+    """Проверка соединения запросом SELECT 1"""
+    cursor = conn.cursor()
+    try:
+        cursor.execute('SELECT 1')
+    finally:
+        cursor.close()
+    return True
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(wrapper, factory=None):
+    """Пул для алиаса базы в текущем процессе
+
+    Ключ включает pid: после fork воркер заводит свой пул и не трогает
+    соединения родителя.
+    """
+    key = (os.getpid(), wrapper.alias)
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            options = wrapper.settings_dict.get('POOL', {})
+            pool = _pools[key] = ConnectionPool(
+                factory,
+                max_size=options.get('MAX_SIZE', 10),
+                timeout=options.get('TIMEOUT', 5),
+                max_lifetime=options.get('MAX_LIFETIME', 600),
+                check=ping if options.get('HEALTH_CHECK', True) else None,
+            )
+        return pool
+
+
+def pool_stats():
+    pid = os.getpid()
+    with _pools_lock:
+        pools = [(alias, pool) for (owner, alias), pool in _pools.items() if owner == pid]
+    return {alias: pool.stats() for alias, pool in pools}
+
+
+class PooledDatabaseWrapperMixin:
+    """Берёт соединения из пула и возвращает их туда при закрытии
+
+    Подмешивается к DatabaseWrapper бэкенда. С CONN_MAX_AGE = 0 соединение
+    возвращается в пул в конце каждого запроса.
+    """
+
+    def get_new_connection(self, conn_params):
+        parent = super()
+
+        def factory():
+            return parent.get_new_connection(conn_params)
+
+        return get_pool(self, factory).acquire()
+
+    def _close(self):
+        if self.connection is None:
+            return
+        conn = self.connection
+        broken = self.errors_occurred and not self.is_usable()
+        if not broken:
+            try:
+                # незавершённая транзакция не должна попасть к следующему запросу
+                conn.rollback()
+            except Exception:
+                broken = True
+        get_pool(self).release(conn, discard=broken)
@@ -0,0 +1,344 @@
+import datetime
+from collections import defaultdict, namedtuple
+
+from django.db import IntegrityError, connection, transaction
+from django.db.models import F
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from .booking import lock_apartments
+from .bulk import chunks
+from .models import AgentMonthRollup, Apartment, ApartmentMonthRollup, Building, BuildingMonthRollup, Contract
+from .signals import bulk_changed, bulk_changing
+from .stats import REVENUE_STATUSES
+
+ROLLUPS = {
+    AgentMonthRollup: 'AgentID_id',
+    BuildingMonthRollup: 'BuildingID_id',
+    ApartmentMonthRollup: 'ApartmentID_id',
+}
+COUNTERS = ('contracts', 'active_contracts', 'booked_days', 'revenue')
+
+ContractState = namedtuple('ContractState', 'pk agent apartment status start end')
+STATE_FIELDS = ('pk', 'AgentID_id', 'ApartmentID_id', 'Status', 'startDate', 'endDate')
+
+Membership = Building.Apartments.through
+
+
+def month_spans(start, end):
+    """Разбивает [start, end) на части по месяцам: (первый день месяца, дней)"""
+    day = start
+    while day < end:
+        month = day.replace(day=1)
+        next_month = (month + datetime.timedelta(days=32)).replace(day=1)
+        stop = min(end, next_month)
+        yield month, (stop - day).days
+        day = stop
+
+
+def contract_state(instance):
+    return ContractState(
+        instance.pk, instance.AgentID_id, instance.ApartmentID_id, instance.Status,
+        Contract._meta.get_field('startDate').to_python(instance.startDate),
+        Contract._meta.get_field('endDate').to_python(instance.endDate),
+    )
+
+
+def load_states(queryset):
+    return {values[0]: ContractState(*values) for values in queryset.values_list(*STATE_FIELDS).iterator()}
+
+
+def lock_contracts(pks):
+    """Блокирует договоры до конца транзакции, как booking.lock_apartments
+
+    Прежнее состояние договора читается под блокировкой: иначе две
+    параллельные записи вычтут из сводок одно и то же состояние.
+    """
+    for chunk in chunks(sorted(set(pks))):
+        queryset = Contract.objects.filter(pk__in=chunk)
+        if connection.features.has_select_for_update:
+            list(queryset.select_for_update().values_list('pk', flat=True))
+        else:
+            queryset.update(Status=F('Status'))
+
+
+def fetch_states(pks, lock=False):
+    if lock:
+        lock_contracts(pks)
+    states = {}
+    for chunk in chunks(list(pks)):
+        states.update(load_states(Contract.objects.filter(pk__in=chunk)))
+    return states
+
+
+def fetch_costs(pks, lock=False):
+    if lock:
+        lock_apartments(pks)
+    costs = {}
+    for chunk in chunks(list(pks)):
+        costs.update(Apartment.objects.filter(pk__in=chunk).values_list('pk', 'Cost'))
+    return costs
+
+
+def apartment_context(apartment_ids):
+    """Стоимость и здания квартир: {квартира: стоимость}, {квартира: [здания]}"""
+    costs, buildings = {}, defaultdict(list)
+    for chunk in chunks(sorted(set(apartment_ids))):
+        costs.update(Apartment.objects.filter(pk__in=chunk).values_list('pk', 'Cost'))
+        for apartment, building in Membership.objects.filter(apartment_id__in=chunk).values_list(
+                'apartment_id', 'building_id'):
+            buildings[apartment].append(building)
+    return costs, buildings
+
+
+def add_contract(cells, state, cost, owners, sign=1):
+    """Добавляет вклад договора в ячейки сводок; sign=-1 вычитает его
+
+    Договоры без даты начала или окончания в сводки не попадают.
+    """
+    if state.start is None or state.end is None:
+        return
+    active = state.status in Contract.ACTIVE_STATUSES
+    spans = list(month_spans(state.start, state.end)) if state.status in REVENUE_STATUSES else []
+    started = state.start.replace(day=1)
+    for model, owner in owners:
+        cell = cells[model, owner, started]
+        cell[0] += sign
+        cell[1] += sign * active
+        for month, days in spans:
+            cell = cells[model, owner, month]
+            cell[2] += sign * days
+            cell[3] += sign * days * (cost or 0)
+
+
+def contract_owners(state, buildings):
+    owners = [(AgentMonthRollup, state.agent), (ApartmentMonthRollup, state.apartment)]
+    owners.extend((BuildingMonthRollup, building) for building in buildings.get(state.apartment, ()))
+    return owners
+
+
+def contract_cells(old_states=(), new_states=(), costs=None):
+    """Разница ячеек между старыми и новыми состояниями договоров
+
+    costs подменяет текущие стоимости квартир для старых состояний.
+    """
+    old_states, new_states = list(old_states), list(new_states)
+    current, buildings = apartment_context(state.apartment for state in old_states + new_states)
+    cells = defaultdict(lambda: [0, 0, 0, 0])
+    for state in old_states:
+        cost = (costs or current).get(state.apartment, current.get(state.apartment))
+        add_contract(cells, state, cost, contract_owners(state, buildings), sign=-1)
+    for state in new_states:
+        add_contract(cells, state, current.get(state.apartment), contract_owners(state, buildings))
+    return cells
+
+
+def apply_cells(cells):
+    """Прибавляет ячейки к таблицам сводок
+
+    Существующие строки увеличиваются выражениями F() одним bulk_update на
+    таблицу, недостающие создаются. Строка без положительного вклада не
+    создаётся: её владелец удаляется вместе с договорами.
+    """
+    by_model = defaultdict(dict)
+    for (model, owner, month), delta in cells.items():
+        if any(delta):
+            by_model[model][owner, month] = delta
+    for model, deltas in by_model.items():
+        owner_field = ROLLUPS[model]
+        months = sorted({month for _, month in deltas})
+        existing = {}
+        for chunk in chunks(sorted({owner for owner, _ in deltas})):
+            rows = model.objects.filter(**{owner_field + '__in': chunk, 'month__in': months})
+            for pk, owner, month in rows.values_list('pk', owner_field, 'month'):
+                existing[owner, month] = pk
+
+        updates = []
+        for key, pk in existing.items():
+            if key in deltas:
+                updates.append(model(pk=pk, **{
+                    name: F(name) + value for name, value in zip(COUNTERS, deltas[key])
+                }))
+        model.objects.bulk_update(updates, COUNTERS, batch_size=500)
+
+        missing = [key for key, delta in deltas.items() if key not in existing and any(v > 0 for v in delta)]
+        if not missing:
+            continue
+        try:
+            with transaction.atomic():
+                model.objects.bulk_create([
+                    model(**{owner_field: owner, 'month': month}, **dict(zip(COUNTERS, deltas[owner, month])))
+                    for owner, month in missing
+                ])
+        except IntegrityError:
+            # строку успела создать параллельная транзакция
+            for owner, month in missing:
+                key = {owner_field: owner, 'month': month}
+                changes = {name: F(name) + value for name, value in zip(COUNTERS, deltas[owner, month])}
+                if not model.objects.filter(**key).update(**changes):
+                    model.objects.create(**key, **dict(zip(COUNTERS, deltas[owner, month])))
+
+
+def compute_cells(contracts=None, buildings_only=None):
+    """Ячейки сводок с нуля по всем договорам или по queryset contracts
+
+    buildings_only - считать только сводки этих зданий.
+    """
+    contracts = Contract.objects.all() if contracts is None else contracts
+    states = load_states(contracts.filter(startDate__isnull=False, endDate__isnull=False))
+    costs, buildings = apartment_context(state.apartment for state in states.values())
+    cells = defaultdict(lambda: [0, 0, 0, 0])
+    for state in states.values():
+        if buildings_only is None:
+            owners = contract_owners(state, buildings)
+        else:
+            owners = [(BuildingMonthRollup, building) for building in buildings.get(state.apartment, ())
+                      if building in buildings_only]
+        add_contract(cells, state, costs.get(state.apartment), owners)
+    return cells
+
+
+def stored_cells(model, **filters):
+    owner = ROLLUPS[model]
+    return {
+        (model, values[0], values[1]): list(values[2:])
+        for values in model.objects.filter(**filters).values_list(owner, 'month', *COUNTERS).iterator()
+    }
+
+
+def cell_objects(cells):
+    return [
+        model(**{ROLLUPS[model]: owner, 'month': month}, **dict(zip(COUNTERS, values)))
+        for (model, owner, month), values in cells.items() if any(values)
+    ]
+
+
+@transaction.atomic
+def rebuild():
+    """Пересчитывает все сводки по договорам; возвращает число строк"""
+    objects = cell_objects(compute_cells())
+    for model in ROLLUPS:
+        model.objects.all().delete()
+        model.objects.bulk_create([obj for obj in objects if isinstance(obj, model)], batch_size=1000)
+    return len(objects)
+
+
+def drift():
+    """Расхождения сводок с договорами: [(модель, владелец, месяц, в таблице, по договорам)]"""
+    expected = {key: values for key, values in compute_cells().items() if any(values)}
+    stored = {}
+    for model in ROLLUPS:
+        stored.update({key: values for key, values in stored_cells(model).items() if any(values)})
+    return [
+        (key[0].__name__, key[1], key[2], stored.get(key), expected.get(key))
+        for key in sorted(set(expected) | set(stored), key=lambda key: (key[0].__name__, key[1], key[2]))
+        if stored.get(key) != expected.get(key)
+    ]
+
+
+def refresh_buildings(building_ids):
+    """Пересчитывает сводки зданий после изменения состава квартир"""
+    building_ids = set(building_ids)
+    if not building_ids:
+        return
+    BuildingMonthRollup.objects.filter(BuildingID__in=building_ids).delete()
+    contracts = Contract.objects.filter(ApartmentID__apartments__in=building_ids).distinct()
+    BuildingMonthRollup.objects.bulk_create(
+        cell_objects(compute_cells(contracts, buildings_only=building_ids)), batch_size=1000,
+    )
+
+
+@receiver(pre_save, sender=Contract)
+def remember_contract(sender, instance, raw=False, **kwargs):
+    if not raw:
+        instance._rollup_state = fetch_states([instance.pk], lock=True).get(instance.pk)
+
+
+@receiver(post_save, sender=Contract)
+def update_contract_rollups(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    old = getattr(instance, '_rollup_state', None)
+    apply_cells(contract_cells([old] if old else [], [contract_state(instance)]))
+
+
+@receiver(post_delete, sender=Contract)
+def remove_contract_rollups(sender, instance, **kwargs):
+    apply_cells(contract_cells([contract_state(instance)]))
+
+
+@receiver(pre_save, sender=Apartment)
+def remember_cost(sender, instance, raw=False, **kwargs):
+    if not raw:
+        instance._rollup_cost = fetch_costs([instance.pk], lock=True).get(instance.pk)
+
+
+@receiver(post_save, sender=Apartment)
+def update_cost_rollups(sender, instance, raw=False, **kwargs):
+    old = getattr(instance, '_rollup_cost', None)
+    if not raw and old is not None and old != instance.Cost:
+        reprice({instance.pk: old})
+
+
+@receiver(pre_delete, sender=Apartment)
+def remember_apartment_buildings(sender, instance, **kwargs):
+    # связи со зданиями удаляются вместе с квартирой без m2m_changed
+    instance._rollup_buildings = list(Membership.objects.filter(apartment=instance).values_list(
+        'building_id', flat=True))
+
+
+@receiver(post_delete, sender=Apartment)
+def update_apartment_buildings(sender, instance, **kwargs):
+    refresh_buildings(getattr(instance, '_rollup_buildings', []))
+
+
+def reprice(old_costs):
+    """Пересчитывает выручку договоров квартир с изменившейся стоимостью"""
+    for chunk in chunks(list(old_costs)):
+        states = load_states(Contract.objects.filter(ApartmentID__in=chunk, Status__in=REVENUE_STATUSES))
+        apply_cells(contract_cells(states.values(), states.values(), costs=old_costs))
+
+
+@receiver(bulk_changing, sender=Contract)
+@receiver(bulk_changing, sender=Apartment)
+def remember_bulk(sender, pks, state=None, **kwargs):
+    # старые значения передаются в bulk_changed той же записи через state
+    if state is None:
+        return
+    if sender is Contract:
+        state['rollup_contracts'] = fetch_states(pks, lock=True)
+    else:
+        state['rollup_costs'] = fetch_costs(pks, lock=True)
+
+
+@receiver(bulk_changed, sender=Contract)
+def update_bulk_contract_rollups(sender, pks, state=None, **kwargs):
+    old = (state or {}).get('rollup_contracts', {})
+    apply_cells(contract_cells(old.values(), fetch_states(pks).values()))
+
+
+@receiver(bulk_changed, sender=Apartment)
+def update_bulk_cost_rollups(sender, pks, state=None, **kwargs):
+    old = (state or {}).get('rollup_costs', {})
+    if old:
+        current = fetch_costs(old)
+        reprice({pk: cost for pk, cost in old.items() if current.get(pk) != cost})
+
+
+@receiver(bulk_changed, sender=Building)
+def update_bulk_building_rollups(sender, pks, **kwargs):
+    refresh_buildings(pks)
+
+
+@receiver(m2m_changed, sender=Membership)
+def update_membership_rollups(sender, instance, action, reverse, pk_set, **kwargs):
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            refresh_buildings([instance.pk])
+    elif action == 'pre_clear':
+        instance._rollup_buildings = list(Membership.objects.filter(apartment=instance).values_list(
+            'building_id', flat=True))
+    elif action == 'post_clear':
+        refresh_buildings(getattr(instance, '_rollup_buildings', []))
+    elif action in ('post_add', 'post_remove'):
+        refresh_buildings(pk_set)
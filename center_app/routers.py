@@ -0,0 +1,164 @@
+import asyncio
+import hashlib
+import random
+import sqlite3
+import time
+
+from asgiref.local import Local
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS, connections
+from rest_framework.permissions import SAFE_METHODS
+
+# в отличие от threading.local доходит до потоков sync_to_async (async_views)
+_state = Local()
+
+STICKY_COOKIE = 'primary_until'
+STICKY_KEY_PREFIX = 'primary-until:'
+
+
+def replicas():
+    return getattr(settings, 'DATABASE_REPLICAS', [])
+
+
+class use_replicas:
+    """Разрешает чтение с реплик в пределах блока with"""
+    enabled = True
+
+    def __enter__(self):
+        self.previous = getattr(_state, 'replicas', False)
+        _state.replicas = self.enabled
+
+    def __exit__(self, *exc):
+        _state.replicas = self.previous
+
+
+class use_primary(use_replicas):
+    """Читает с основной базы в пределах блока with, даже внутри use_replicas"""
+    enabled = False
+
+
+def reading_replicas():
+    """Идёт ли чтение в текущем контексте с реплик"""
+    return bool(replicas()) and getattr(_state, 'replicas', False)
+
+
+def sticky_cache():
+    return caches[getattr(settings, 'REPLICA_STICKY_CACHE', 'default')]
+
+
+def sticky_key(credentials):
+    return STICKY_KEY_PREFIX + hashlib.sha256(credentials.encode()).hexdigest()
+
+
+def request_credentials(request):
+    """Токен из заголовка Authorization (последнее слово) или None"""
+    parts = request.META.get('HTTP_AUTHORIZATION', '').split()
+    return parts[-1] if parts else None
+
+
+def stick(credentials, now=None):
+    """Отправляет чтения клиента с этим токеном на основную базу на REPLICA_STICKY_SECONDS"""
+    seconds = getattr(settings, 'REPLICA_STICKY_SECONDS', 5)
+    sticky_cache().set(sticky_key(credentials), (now or time.time()) + seconds, seconds)
+
+
+class ReplicaRouter:
+    """Чтение с реплик внутри use_replicas, всё остальное - на основную базу
+
+    Вне запроса (воркеры, команды) и в запросах на запись чтение идёт с
+    основной базы, чтобы не видеть отстающие данные.
+    """
+
+    def db_for_read(self, model, **hints):
+        aliases = replicas()
+        if aliases and getattr(_state, 'replicas', False):
+            return random.choice(aliases)
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # реплики содержат те же данные, что и основная база
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db not in replicas()
+
+
+class ReplicaRoutingMiddleware:
+    """Направляет безопасные запросы на реплики
+
+    После успешной записи клиент получает куку primary_until и до её
+    истечения читает с основной базы, то есть видит свои изменения.
+    API-клиенты с токеном куки обычно не возвращают, поэтому срок ещё
+    хранится в кэше REPLICA_STICKY_CACHE по токену из Authorization;
+    только что выданный токен отмечается так же (authentication).
+    Работает и под ASGI без перехода в общий синхронный поток.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(get_response):
+            # как в MiddlewareMixin: Django вызовет __call__ как корутину
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def reads_replicas(self, request, now):
+        if request.method not in SAFE_METHODS:
+            return False
+        try:
+            if float(request.COOKIES.get(STICKY_COOKIE, 0)) > now:
+                return False
+        except ValueError:
+            pass
+        credentials = request_credentials(request)
+        return credentials is None or sticky_cache().get(sticky_key(credentials), 0) <= now
+
+    def remember_write(self, request, response, now):
+        if request.method not in SAFE_METHODS and response.status_code < 400:
+            seconds = getattr(settings, 'REPLICA_STICKY_SECONDS', 5)
+            response.set_cookie(STICKY_COOKIE, '%.3f' % (now + seconds), max_age=seconds, httponly=True)
+            credentials = request_credentials(request)
+            if credentials is not None:
+                stick(credentials, now)
+        return response
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        now = time.time()
+        if self.reads_replicas(request, now):
+            with use_replicas():
+                return self.get_response(request)
+        return self.remember_write(request, self.get_response(request), now)
+
+    async def __acall__(self, request):
+        now = time.time()
+        if self.reads_replicas(request, now):
+            with use_replicas():
+                return await self.get_response(request)
+        return self.remember_write(request, await self.get_response(request), now)
+
+
+def copy_database(source_name, target_name):
+    """Копирует файл SQLite целиком через backup API"""
+    source = sqlite3.connect(source_name)
+    target = sqlite3.connect(target_name)
+    try:
+        source.backup(target)
+    finally:
+        target.close()
+        source.close()
+
+
+def replicate(source=DEFAULT_DB_ALIAS, targets=None):
+    """Переносит содержимое основной базы в реплики
+
+    Заменяет настоящую репликацию при локальном запуске с двумя файлами SQLite.
+    """
+    source_name = connections[source].settings_dict['NAME']
+    for alias in targets if targets is not None else replicas():
+        copy_database(source_name, connections[alias].settings_dict['NAME'])
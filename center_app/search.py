@@ -0,0 +1,261 @@
+import html
+import re
+from functools import reduce
+from operator import or_
+
+from django.conf import settings
+from django.db import connections, router
+from django.db.models import Q
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+
+from .bulk import QUERY_CHUNK, chunks
+from .models import Apartment, Building
+from .signals import bulk_changed
+
+# тип документа: модель и поля, которые попадают в индекс
+DOCUMENTS = {
+    'apartment': (Apartment, ('Description',)),
+    'building': (Building, ('City', 'Street', 'Number', 'Type', 'Description')),
+}
+KINDS = tuple(DOCUMENTS)
+COLUMNS = ('City', 'Street', 'Number', 'Type', 'Description')
+
+TERM = re.compile(r'(\w+)(\*?)')
+
+
+class TooManyMatches(Exception):
+    """Совпадений больше, чем поисковый индекс ранжирует за разумное время"""
+
+    def __init__(self, limit):
+        super().__init__(limit)
+        self.limit = limit
+
+
+def parse_query(text):
+    """Слова запроса: [(слово, поиск по началу слова)]; слово* - префикс"""
+    return [(word, bool(star)) for word, star in TERM.findall(text)]
+
+
+def document_kind(model):
+    for kind, (document_model, fields) in DOCUMENTS.items():
+        if document_model is model:
+            return kind
+
+
+def highlights(values, terms):
+    """{поле: текст с <mark> вокруг слов запроса} для полей values с совпадениями
+
+    Значения экранируются, в ответе безопасно выводить их как HTML.
+    """
+    words = re.compile('|'.join(
+        r'\b%s%s' % (re.escape(word), r'\w*' if prefix else r'\b') for word, prefix in terms
+    ), re.IGNORECASE)
+    result = {}
+    for field, text in values.items():
+        text = text or ''
+        parts, end = [], 0
+        for found in words.finditer(text):
+            parts += [html.escape(text[end:found.start()]), '<mark>%s</mark>' % html.escape(found.group(0))]
+            end = found.end()
+        if parts:
+            result[field] = ''.join(parts) + html.escape(text[end:])
+    return result
+
+
+class SearchBackend:
+    """Поисковый индекс по DOCUMENTS
+
+    search возвращает список (тип, ключ, {поле: текст с <mark>}) по
+    убыванию релевантности; все слова запроса обязательны. Если
+    совпадений слишком много, чтобы ранжировать их все, поднимает
+    TooManyMatches.
+    """
+
+    def index(self, kind, objects):
+        raise NotImplementedError
+
+    def remove(self, kind, pks):
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+    def search(self, terms, kinds=KINDS, offset=0, limit=20):
+        raise NotImplementedError
+
+    def rebuild(self):
+        """Индексирует все документы заново, возвращает их число"""
+        self.clear()
+        count = 0
+        for kind, (model, fields) in DOCUMENTS.items():
+            batch = []
+            for instance in model.objects.only(*fields).iterator(chunk_size=QUERY_CHUNK):
+                batch.append(instance)
+                if len(batch) == QUERY_CHUNK:
+                    self.index(kind, batch)
+                    count, batch = count + len(batch), []
+            self.index(kind, batch)
+            count += len(batch)
+        return count
+
+
+class SQLiteFTSBackend(SearchBackend):
+    """Индекс FTS5 в той же базе SQLite, таблица создаётся миграцией
+
+    Документ пишется в той же транзакции, что и сама запись. rowid
+    документа вычисляется из типа и ключа, поэтому замена не требует
+    поиска по индексу.
+
+    Релевантность считается по всем совпадениям, но у частых слов их
+    сотни тысяч, и bm25 по всем занимает сотни миллисекунд. Поэтому
+    запрос с числом совпадений больше rank_window отклоняется
+    (TooManyMatches): ранжировать только часть значило бы отдать
+    случайные результаты. None - без ограничения.
+    """
+    table = 'center_app_search'
+    rank_window = getattr(settings, 'SEARCH_RANK_WINDOW', 1000)
+
+    def connection(self, write=False):
+        alias = router.db_for_write(Building) if write else router.db_for_read(Building)
+        return connections[alias]
+
+    def rowid(self, kind, pk):
+        return pk * len(KINDS) + KINDS.index(kind)
+
+    def delete_rows(self, cursor, rowids):
+        for chunk in chunks(rowids):
+            cursor.execute('DELETE FROM %s WHERE rowid IN (%s)' % (self.table, ', '.join(['%s'] * len(chunk))), chunk)
+
+    def index(self, kind, objects):
+        fields = DOCUMENTS[kind][1]
+        rows = [
+            (self.rowid(kind, instance.pk), kind) +
+            tuple(getattr(instance, column) if column in fields else None for column in COLUMNS)
+            for instance in objects
+        ]
+        if not rows:
+            return
+        with self.connection(write=True).cursor() as cursor:
+            self.delete_rows(cursor, [row[0] for row in rows])
+            cursor.executemany(
+                'INSERT INTO %s (rowid, kind, %s) VALUES (%s)'
+                % (self.table, ', '.join(COLUMNS), ', '.join(['%s'] * (len(COLUMNS) + 2))),
+                rows,
+            )
+
+    def remove(self, kind, pks):
+        with self.connection(write=True).cursor() as cursor:
+            self.delete_rows(cursor, [self.rowid(kind, pk) for pk in pks])
+
+    def clear(self):
+        with self.connection(write=True).cursor() as cursor:
+            cursor.execute('DELETE FROM %s' % self.table)
+
+    def match(self, terms):
+        # \w+ не содержит кавычек, каждое слово - отдельная фраза FTS5
+        return ' '.join('"%s"%s' % (word, '*' if prefix else '') for word, prefix in terms)
+
+    def search(self, terms, kinds=KINDS, offset=0, limit=20):
+        match = self.match(terms)
+        kind_filter, kind_params = '', []
+        if set(kinds) != set(KINDS):
+            kind_filter = 'AND kind IN (%s)' % ', '.join(['%s'] * len(kinds))
+            kind_params = list(kinds)
+        where = '%(table)s MATCH %%s %(kind_filter)s' % {'table': self.table, 'kind_filter': kind_filter}
+        with self.connection().cursor() as cursor:
+            if self.rank_window is not None:
+                # подсчёт без ранжирования, не дальше первой лишней строки
+                cursor.execute(
+                    'SELECT count(*) FROM (SELECT 1 FROM %s WHERE %s LIMIT %%s)' % (self.table, where),
+                    [match] + kind_params + [self.rank_window + 1],
+                )
+                if cursor.fetchone()[0] > self.rank_window:
+                    raise TooManyMatches(self.rank_window)
+            cursor.execute(
+                'SELECT rowid FROM %s WHERE %s ORDER BY rank LIMIT %%s OFFSET %%s' % (self.table, where),
+                [match] + kind_params + [limit, offset],
+            )
+            rowids = [row[0] for row in cursor.fetchall()]
+            if not rowids:
+                return []
+            # выделения считаются в Python: highlight() в запросе с MATCH заново
+            # собирает список совпадений префикса для каждой строки
+            cursor.execute(
+                'SELECT rowid, kind, %s FROM %s WHERE rowid IN (%s)'
+                % (', '.join(COLUMNS), self.table, ', '.join(['%s'] * len(rowids))),
+                rowids,
+            )
+            rows = {row[0]: row[1:] for row in cursor.fetchall()}
+        hits = []
+        for rowid in rowids:
+            kind, *texts = rows[rowid]
+            values = {column: text for column, text in zip(COLUMNS, texts) if column in DOCUMENTS[kind][1]}
+            hits.append((kind, rowid // len(KINDS), highlights(values, terms)))
+        return hits
+
+
+class DatabaseBackend(SearchBackend):
+    """Поиск без индекса: icontains по полям моделей, порядок по ключу
+
+    Для баз без FTS5; на больших таблицах это полный просмотр.
+    """
+
+    def index(self, kind, objects):
+        pass
+
+    def remove(self, kind, pks):
+        pass
+
+    def clear(self):
+        pass
+
+    def search(self, terms, kinds=KINDS, offset=0, limit=20):
+        hits = []
+        for kind in kinds:
+            model, fields = DOCUMENTS[kind]
+            condition = Q()
+            for word, prefix in terms:
+                condition &= reduce(or_, (Q(**{field + '__icontains': word}) for field in fields))
+            for instance in model.objects.filter(condition).only(*fields).order_by('pk')[:offset + limit]:
+                values = {field: getattr(instance, field) for field in fields}
+                hits.append((kind, instance.pk, highlights(values, terms)))
+        return hits[offset:offset + limit]
+
+
+def get_backend():
+    """SEARCH_BACKEND или, если он не задан, индекс FTS5 на SQLite и DatabaseBackend на прочих базах
+
+    Таблицу FTS5 миграция 0012 создаёт только в SQLite.
+    """
+    path = getattr(settings, 'SEARCH_BACKEND', None)
+    if path:
+        return import_string(path)()
+    if connections[router.db_for_write(Building)].vendor == 'sqlite':
+        return SQLiteFTSBackend()
+    return DatabaseBackend()
+
+
+@receiver(post_save, sender=Apartment)
+@receiver(post_save, sender=Building)
+def index_document(sender, instance, update_fields=None, **kwargs):
+    kind = document_kind(sender)
+    if update_fields is not None and not set(update_fields) & set(DOCUMENTS[kind][1]):
+        return
+    get_backend().index(kind, [instance])
+
+
+@receiver(post_delete, sender=Apartment)
+@receiver(post_delete, sender=Building)
+def remove_document(sender, instance, **kwargs):
+    get_backend().remove(document_kind(sender), [instance.pk])
+
+
+@receiver(bulk_changed, sender=Apartment)
+@receiver(bulk_changed, sender=Building)
+def index_bulk_documents(sender, pks, **kwargs):
+    kind = document_kind(sender)
+    backend = get_backend()
+    for chunk in chunks(list(pks)):
+        backend.index(kind, sender.objects.filter(pk__in=chunk).only(*DOCUMENTS[kind][1]))
@@ -1,139 +1,264 @@
-from rest_framework import serializers
-from rest_framework.response import Response
-from rest_framework.templatetags.rest_framework import data
-from rest_framework.views import APIView
-from .models import *
-
-
-# --------------------------------------------------------------------------User
-
-
-class UserSerializer(serializers.ModelSerializer):
-    """Список сотрудников"""
-
-    class Meta:
-        model = User
-        fields = ("first_name", "last_name", "post")
-
-
-class UserDetailSerializer(serializers.ModelSerializer):
-    """Сотрудник"""
-
-    class Meta:
-        model = User
-        fields = "__all__"
-
-
-class UserCreateSerializer(serializers.ModelSerializer):
-    """Действия с сотрудником"""
-
-    class Meta:
-        model = User
-        fields = "__all__"
-
-    def create(self, validated_data):
-        employee = User(**validated_data)
-        employee.save()
-        return employee
-
-
-# --------------------------------------------------------------------------Apartment
-
-
-class ApartmentSerializer(serializers.ModelSerializer):
-    """Список квартир"""
-
-    class Meta:
-        model = Apartment
-        fields = ("Number", "Square", "Photo", "Cost")
-
-
-class ApartmentDetailSerializer(serializers.ModelSerializer):
-    """Квартира"""
-
-    class Meta:
-        model = Apartment
-        fields = "__all__"
-
-
-class ApartmentCreateSerializer(serializers.ModelSerializer):
-    """Действия с квартирой"""
-
-    class Meta:
-        model = Apartment
-        fields = "__all__"
-
-    def create(self, validated_data):
-        apartment = Apartment(**validated_data)
-        apartment.save()
-        return apartment
-
-
-# --------------------------------------------------------------------------Building
-
-
-class BuildingSerializer(serializers.ModelSerializer):
-    """Список зданий"""
-
-    class Meta:
-        model = Building
-        fields = ("City", "Street", "Number", "Type", "Photo")
-
-
-class BuildingDetailSerializer(serializers.ModelSerializer):
-    """Здание"""
-
-    Apartments = ApartmentDetailSerializer(many=True, read_only=True)
-
-    class Meta:
-        model = Building
-        fields = "__all__"
-
-
-class BuildingCreateSerializer(serializers.ModelSerializer):
-    """Действия со зданием"""
-
-    class Meta:
-        model = Building
-        fields = "__all__"
-
-    def create(self, validated_data):
-        building = Building(**validated_data)
-        building.save()
-        return building
-
-
-# --------------------------------------------------------------------------Contract
-
-
-class ContractSerializer(serializers.ModelSerializer):
-    """Список контрактов"""
-
-    class Meta:
-        model = Contract
-        fields = ("client_id", "room_number", "arrival_date", "departure_date")
-
-
-class ContractDetailSerializer(serializers.ModelSerializer):
-    """Контракт"""
-
-
-    class Meta:
-        model = Contract
-        fields = "__all__"
-
-    Status = serializers.CharField(source='get_Status_display')
-
-
-
-class ContractCreateSerializer(serializers.ModelSerializer):
-    """Действия с контрактом"""
-
-    class Meta:
-        model = Contract
-        fields = "__all__"
-
-    def create(self, validated_data):
-        contract = Contract(**validated_data)
-        contract.save()
-        return contract
+from rest_framework import serializers
+from rest_framework.response import Response
+from rest_framework.templatetags.rest_framework import data
+from rest_framework.views import APIView
+from django.db import transaction
+from .booking import find_conflict, lock_apartments
+from .bulk import BulkListSerializer, BulkSerializerMixin
+from .images import variant_urls
+from .models import *
+
+
+class PhotoVariantsField(serializers.Field):
+    """Ссылки на уменьшенные копии фотографии"""
+
+    def __init__(self, **kwargs):
+        kwargs.setdefault('source', 'Photo')
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+
+    def to_representation(self, value):
+        urls = variant_urls(value)
+        request = self.context.get('request')
+        if urls and request is not None:
+            urls = {variant: request.build_absolute_uri(url) for variant, url in urls.items()}
+        return urls
+
+
+# --------------------------------------------------------------------------User
+
+
+class UserSerializer(serializers.ModelSerializer):
+    """Список сотрудников"""
+
+    class Meta:
+        model = User
+        fields = ("first_name", "last_name", "post")
+
+
+class UserDetailSerializer(serializers.ModelSerializer):
+    """Сотрудник"""
+
+    PhotoVariants = PhotoVariantsField()
+
+    class Meta:
+        model = User
+        fields = "__all__"
+
+
+class UserCreateSerializer(serializers.ModelSerializer):
+    """Действия с сотрудником"""
+
+    class Meta:
+        model = User
+        fields = "__all__"
+
+    def create(self, validated_data):
+        employee = User(**validated_data)
+        employee.save()
+        return employee
+
+
+# --------------------------------------------------------------------------Apartment
+
+
+class ApartmentSerializer(serializers.ModelSerializer):
+    """Список квартир"""
+
+    class Meta:
+        model = Apartment
+        fields = ("Number", "Square", "Photo", "Cost")
+
+
+class ApartmentDetailSerializer(serializers.ModelSerializer):
+    """Квартира"""
+
+    PhotoVariants = PhotoVariantsField()
+
+    class Meta:
+        model = Apartment
+        fields = "__all__"
+
+
+class ApartmentCreateSerializer(serializers.ModelSerializer):
+    """Действия с квартирой"""
+
+    class Meta:
+        model = Apartment
+        fields = "__all__"
+
+    def create(self, validated_data):
+        apartment = Apartment(**validated_data)
+        apartment.save()
+        return apartment
+
+
+class ApartmentBulkSerializer(BulkSerializerMixin, ApartmentCreateSerializer):
+    """Элемент пакета квартир"""
+
+    class Meta(ApartmentCreateSerializer.Meta):
+        list_serializer_class = BulkListSerializer
+
+
+# --------------------------------------------------------------------------Building
+
+
+class BuildingSerializer(serializers.ModelSerializer):
+    """Список зданий"""
+
+    class Meta:
+        model = Building
+        fields = ("City", "Street", "Number", "Type", "Photo")
+
+
+class BuildingDetailSerializer(serializers.ModelSerializer):
+    """Здание"""
+
+    Apartments = ApartmentDetailSerializer(many=True, read_only=True)
+    PhotoVariants = PhotoVariantsField()
+
+    class Meta:
+        model = Building
+        fields = "__all__"
+
+
+class BuildingCreateSerializer(serializers.ModelSerializer):
+    """Действия со зданием"""
+
+    class Meta:
+        model = Building
+        fields = "__all__"
+
+    def create(self, validated_data):
+        building = Building(**validated_data)
+        building.save()
+        return building
+
+
+class BuildingBulkSerializer(BulkSerializerMixin, BuildingCreateSerializer):
+    """Элемент пакета зданий"""
+
+    class Meta(BuildingCreateSerializer.Meta):
+        list_serializer_class = BulkListSerializer
+
+
+# --------------------------------------------------------------------------Contract
+
+
+class ContractSerializer(serializers.ModelSerializer):
+    """Список контрактов"""
+
+    class Meta:
+        model = Contract
+        fields = ("client_id", "room_number", "arrival_date", "departure_date")
+
+
+class ContractDetailSerializer(serializers.ModelSerializer):
+    """Контракт"""
+
+    # ?expand=<имя> заменяет ключ связанного объекта его полным представлением
+    expandable_fields = {
+        'agent': ('AgentID', UserDetailSerializer),
+        'client': ('ClientID', UserDetailSerializer),
+        'apartment': ('ApartmentID', ApartmentDetailSerializer),
+    }
+
+    class Meta:
+        model = Contract
+        fields = "__all__"
+
+    Status = serializers.CharField(source='get_Status_display')
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        for name in self.context.get('expand', ()):
+            field, serializer_class = self.expandable_fields[name]
+            self.fields[field] = serializer_class(read_only=True)
+
+
+
+class ContractCreateSerializer(serializers.ModelSerializer):
+    """Действия с контрактом"""
+
+    class Meta:
+        model = Contract
+        fields = "__all__"
+
+    def validate(self, attrs):
+        start = attrs.get('startDate', getattr(self.instance, 'startDate', None))
+        end = attrs.get('endDate', getattr(self.instance, 'endDate', None))
+        if start is not None and end is not None and end <= start:
+            raise serializers.ValidationError({'endDate': 'Дата окончания должна быть позже даты начала'})
+        return attrs
+
+    def check_overlap(self, validated_data):
+        """Отклоняет договор, если квартира уже занята на эти даты
+
+        Вызывается внутри транзакции после блокировки квартиры.
+        """
+        values = {
+            name: validated_data.get(name, getattr(self.instance, name, None))
+            for name in ('ApartmentID', 'Status', 'startDate', 'endDate')
+        }
+        if (values['Status'] or Contract._meta.get_field('Status').default) not in Contract.ACTIVE_STATUSES:
+            return
+        lock_apartments([values['ApartmentID'].pk])
+        conflict = find_conflict(values['ApartmentID'], values['startDate'], values['endDate'],
+                                 exclude=getattr(self.instance, 'pk', None))
+        if conflict is not None:
+            raise serializers.ValidationError(
+                {'ApartmentID': 'Квартира уже занята на эти даты (договор %s)' % conflict})
+
+    def create(self, validated_data):
+        with transaction.atomic():
+            self.check_overlap(validated_data)
+            contract = Contract(**validated_data)
+            contract.save()
+        return contract
+
+    def update(self, instance, validated_data):
+        with transaction.atomic():
+            self.check_overlap(validated_data)
+            return super().update(instance, validated_data)
+
+
+class ContractBulkSerializer(BulkSerializerMixin, ContractCreateSerializer):
+    """Элемент пакета контрактов"""
+
+    class Meta(ContractCreateSerializer.Meta):
+        list_serializer_class = BulkListSerializer
+
+
+# --------------------------------------------------------------------------Changes
+
+
+class UserChangeSerializer(serializers.ModelSerializer):
+    """Сотрудник в ленте изменений"""
+
+    class Meta:
+        model = User
+        exclude = ("password",)
+
+
+class ApartmentChangeSerializer(serializers.ModelSerializer):
+    """Квартира в ленте изменений"""
+
+    class Meta:
+        model = Apartment
+        fields = "__all__"
+
+
+class BuildingChangeSerializer(serializers.ModelSerializer):
+    """Здание в ленте изменений, квартиры - ключами"""
+
+    class Meta:
+        model = Building
+        fields = "__all__"
+
+
+class ContractChangeSerializer(serializers.ModelSerializer):
+    """Договор в ленте изменений"""
+
+    class Meta:
+        model = Contract
+        fields = "__all__"
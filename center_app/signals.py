@@ -0,0 +1,56 @@
+from django.db.models.signals import m2m_changed, post_save, pre_delete
+from django.dispatch import Signal, receiver
+from django.utils import timezone
+
+from .models import Apartment, Building
+
+# Пакетная запись (bulk_create/bulk_update) не вызывает post_save,
+# поэтому пакетные представления сообщают о ней отдельно.
+# Аргументы: sender - модель, pks - ключи объектов, action - 'create' или 'update',
+# state - словарь, переданный в bulk_changing той же записи (только для 'update').
+bulk_changed = Signal()
+
+# Пакетное изменение вот-вот будет записано, в базе ещё старые значения.
+# Аргументы: sender - модель, pks - ключи изменяемых объектов, state - словарь,
+# в котором получатели оставляют старые значения для bulk_changed.
+bulk_changing = Signal()
+
+# Построены уменьшенные копии фотографии. Аргументы: sender - модель, pk - ключ объекта.
+photo_variants_ready = Signal()
+
+
+def touch_buildings(queryset):
+    """Отмечает здания изменёнными, не вызывая сигналов сохранения"""
+    queryset.update(modifiedDate=timezone.now())
+
+
+@receiver(post_save, sender=Apartment)
+@receiver(pre_delete, sender=Apartment)
+def touch_apartment_buildings(sender, instance, **kwargs):
+    # квартиры входят в представление здания, значит меняют и его
+    touch_buildings(Building.objects.filter(Apartments=instance))
+
+
+@receiver(m2m_changed, sender=Building.Apartments.through)
+def touch_building_membership(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+    if not reverse:
+        touch_buildings(Building.objects.filter(pk=instance.pk))
+    elif action == 'pre_clear':
+        touch_buildings(Building.objects.filter(Apartments=instance))
+    else:
+        touch_buildings(Building.objects.filter(pk__in=pk_set))
+
+
+@receiver(bulk_changed, sender=Apartment)
+def touch_bulk_apartment_buildings(sender, pks, **kwargs):
+    for start in range(0, len(pks), 900):
+        touch_buildings(Building.objects.filter(Apartments__in=pks[start:start + 900]))
+
+
+@receiver(photo_variants_ready)
+def touch_photo_owner(sender, pk, **kwargs):
+    sender.objects.filter(pk=pk).update(modifiedDate=timezone.now())
+    if sender is Apartment:
+        touch_buildings(Building.objects.filter(Apartments=pk))
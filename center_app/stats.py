@@ -0,0 +1,134 @@
+import datetime
+from collections import defaultdict
+
+from django.db.models import Count, DateField, F, Func, IntegerField, Q, Sum, Value, Window
+from django.db.models.functions import Coalesce, Greatest, Least, Rank, TruncMonth
+
+from .models import AgentMonthRollup, ApartmentMonthRollup, Building, BuildingMonthRollup, Contract
+
+# договоры, за которые получены или будут получены деньги
+REVENUE_STATUSES = ('l', 'f')
+
+ROLLUP_GROUPS = {
+    'agent': (AgentMonthRollup, 'AgentID'),
+    'building': (BuildingMonthRollup, 'BuildingID'),
+    'city': (BuildingMonthRollup, 'BuildingID__City'),
+    'apartment': (ApartmentMonthRollup, 'ApartmentID'),
+    'month': (AgentMonthRollup, 'month'),
+}
+
+GROUPS = {
+    'agent': 'AgentID',
+    'building': 'ApartmentID__apartments',
+    'city': 'ApartmentID__apartments__City',
+    'month': 'month',
+}
+
+
+class DaysBetween(Func):
+    """Число дней от start до end, вычисляется в базе"""
+    output_field = IntegerField()
+    template = '(%(expressions)s)'
+    arg_joiner = ' - '
+
+    def __init__(self, end, start, **extra):
+        super().__init__(end, start, **extra)
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        return self.as_sql(
+            compiler, connection,
+            template='CAST(julianday(%(expressions)s) AS INTEGER)', arg_joiner=') - julianday(',
+            **extra_context
+        )
+
+    def as_mysql(self, compiler, connection, **extra_context):
+        return self.as_sql(compiler, connection, function='DATEDIFF', template='%(function)s(%(expressions)s)',
+                           arg_joiner=', ', **extra_context)
+
+
+def contract_stats(group, start, end):
+    """Сводка по договорам, пересекающим полуинтервал [start, end)
+
+    Дни договора обрезаются границами периода, пустые даты считаются
+    открытыми. Выручка - стоимость квартиры за сутки, умноженная на дни
+    договоров в статусах REVENUE_STATUSES. Договор относится к месяцу,
+    в котором он начинается в пределах периода.
+    """
+    first = Greatest(Coalesce('startDate', Value(start, output_field=DateField())), Value(start))
+    last = Least(Coalesce('endDate', Value(end, output_field=DateField())), Value(end))
+    days = DaysBetween(last, first)
+    paid = Q(Status__in=REVENUE_STATUSES)
+
+    queryset = Contract.objects.overlapping(start, end).annotate(first_day=first)
+    if group == 'month':
+        queryset = queryset.annotate(month=TruncMonth('first_day', output_field=DateField()))
+    key = GROUPS[group]
+    rows = (
+        queryset.values(key)
+        .annotate(
+            contracts=Count('pk'),
+            active_contracts=Count('pk', filter=Q(Status__in=Contract.ACTIVE_STATUSES)),
+            booked_days=Coalesce(Sum(days, filter=paid), 0),
+            revenue=Coalesce(Sum(days * F('ApartmentID__Cost'), filter=paid), 0),
+        )
+        .annotate(rank=Window(Rank(), order_by=F('revenue').desc()))
+        .order_by('rank', key)
+    )
+    return summary_rows(group, key, rows, start, end)
+
+
+def rollup_stats(group, start, end, building=None):
+    """Сводка как у contract_stats, но только по таблицам MonthRollup
+
+    Период выравнивается по месяцам. contracts - договоры, начатые в
+    периоде; договоры без дат в сводки не входят. building ограничивает
+    группировку по квартирам одним зданием.
+    """
+    model, key = ROLLUP_GROUPS[group]
+    queryset = model.objects.filter(month__gte=start, month__lt=end)
+    if building is not None:
+        queryset = queryset.filter(ApartmentID__apartments=building)
+    rows = (
+        queryset
+        .values(key)
+        .annotate(
+            contracts=Sum('contracts'),
+            active_contracts=Sum('active_contracts'),
+            booked_days=Sum('booked_days'),
+            revenue=Sum('revenue'),
+        )
+        .annotate(rank=Window(Rank(), order_by=F('revenue').desc()))
+        .order_by('rank', key)
+    )
+    return summary_rows(group, key, rows, start, end)
+
+
+def summary_rows(group, key, rows, start, end):
+    results = [dict(row, key=row.pop(key)) for row in rows]
+    capacity = apartment_counts(group)
+    if capacity is not None:
+        period = (end - start).days
+        for row in results:
+            apartments = capacity[row['key']]
+            row['occupancy'] = round(row['booked_days'] / (apartments * period), 4) if apartments else None
+    if group == 'month':
+        for row in results:
+            row['key'] = row['key'].strftime('%Y-%m')
+    return results
+
+
+def apartment_counts(group):
+    """Число квартир в здании или городе - знаменатель загрузки"""
+    if group == 'apartment':
+        return defaultdict(lambda: 1)
+    if group == 'building':
+        return defaultdict(int, Building.objects.values_list('pk').annotate(n=Count('Apartments')))
+    if group == 'city':
+        return defaultdict(int, Building.objects.values_list('City').annotate(n=Count('Apartments', distinct=True)))
+    return None
+
+
+def default_period(today=None):
+    """Текущий календарный год"""
+    today = today or datetime.date.today()
+    return datetime.date(today.year, 1, 1), datetime.date(today.year + 1, 1, 1)
@@ -0,0 +1,217 @@
+import hashlib
+import os
+import re
+import tempfile
+import time
+from collections import Counter
+
+from django.core.files.storage import FileSystemStorage, default_storage
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+from django.utils.deconstruct import deconstructible
+
+from .images import VARIANTS, variant_name
+from .models import Apartment, Building, StoredPhoto, User
+
+PHOTO_MODELS = (Apartment, Building, User)
+# имя исходного файла в ContentAddressedStorage
+STORED_NAME = re.compile(r'[0-9a-f]{2}/[0-9a-f]{2}/[0-9a-f]{64}(\.[0-9a-z]+)?')
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """Файловое хранилище с именами по SHA-256 содержимого
+
+    Файл хэшируется во время записи во временный файл и сохраняется как
+    ``ab/cd/<sha256><расширение>``; одинаковое содержимое хранится один раз.
+    Производные файлы (уменьшенные копии) уже названы по исходному хэшу,
+    сохраняются под своими именами и перезаписываются. Ссылки на файлы
+    учитываются в StoredPhoto вместе с записями, см. count_photo.
+
+    Временные файлы пишутся в каталог рядом с location (<location>.incoming):
+    на той же файловой системе, чтобы os.replace оставался одной операцией,
+    но вне каталога, который отдаётся наружу.
+    """
+    passthrough_prefixes = ('variants/',)
+    incoming_suffix = '.incoming'
+
+    def get_available_name(self, name, max_length=None):
+        # имя определяется содержимым, дописывать суффиксы не нужно
+        return name
+
+    def _receive(self, content):
+        """Пишет содержимое во временный файл: (путь, sha256)"""
+        incoming = self.location.rstrip(os.sep) + self.incoming_suffix
+        os.makedirs(incoming, exist_ok=True)
+        digest = hashlib.sha256()
+        fd, temporary = tempfile.mkstemp(dir=incoming)
+        with os.fdopen(fd, 'wb') as output:
+            for chunk in content.chunks():
+                digest.update(chunk)
+                output.write(chunk)
+        return temporary, digest.hexdigest()
+
+    def _place(self, temporary, name):
+        full_path = self.path(name)
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        os.replace(temporary, full_path)
+        if self.file_permissions_mode is not None:
+            os.chmod(full_path, self.file_permissions_mode)
+
+    def _save(self, name, content):
+        temporary, hexdigest = self._receive(content)
+        try:
+            if name.startswith(self.passthrough_prefixes):
+                # перезапись одной операцией: читатель видит старый или новый файл
+                self._place(temporary, name)
+                return name
+            extension = os.path.splitext(name)[1].lower()
+            stored = '%s/%s/%s%s' % (hexdigest[:2], hexdigest[2:4], hexdigest, extension)
+            with transaction.atomic():
+                # строка StoredPhoto заблокирована до конца транзакции записи,
+                # которая сохраняет файл: release_photo не удалит файл, пока
+                # ссылка на него не зафиксирована
+                lock_photo(stored)
+                if os.path.exists(self.path(stored)):
+                    # collect_photos не тронет только что переиспользованный файл
+                    os.utime(self.path(stored))
+                else:
+                    self._place(temporary, stored)
+        finally:
+            if os.path.exists(temporary):
+                os.remove(temporary)
+        return stored
+
+
+def acquire_photo(name, added=1):
+    """Добавляет ссылки на файл; строка StoredPhoto остаётся заблокированной до конца транзакции"""
+    for attempt in range(2):
+        try:
+            with transaction.atomic():
+                if not StoredPhoto.objects.filter(name=name).update(references=F('references') + added):
+                    StoredPhoto.objects.create(name=name, references=added)
+            return
+        except IntegrityError:
+            # ту же строку одновременно создал другой процесс
+            if attempt:
+                raise
+
+
+def lock_photo(name):
+    """Блокирует строку StoredPhoto до конца транзакции, не меняя счётчик"""
+    acquire_photo(name, 0)
+
+
+def photo_references(name):
+    """Сколько записей ссылается на файл name"""
+    return sum(model.objects.filter(Photo=name).count() for model in PHOTO_MODELS)
+
+
+def release_photo(name, storage=default_storage):
+    """Снимает ссылку на файл и удаляет его с копиями, когда ссылок не осталось
+
+    Счётчик в StoredPhoto меняется под блокировкой строки, как в
+    acquire_photo. Если он дошёл до нуля, ссылки пересчитываются по
+    записям: имя файла могли присвоить полю напрямую, минуя хранилище.
+    """
+    if not name:
+        return
+    with transaction.atomic():
+        if not StoredPhoto.objects.filter(name=name).update(references=F('references') - 1):
+            StoredPhoto.objects.create(name=name, references=0)
+        references = StoredPhoto.objects.get(name=name).references
+        if references <= 0:
+            references = photo_references(name)
+        if references > 0:
+            StoredPhoto.objects.filter(name=name).update(references=references)
+            return
+        remove_photo(name, storage)
+
+
+def remove_photo(name, storage):
+    StoredPhoto.objects.filter(name=name).delete()
+    for path in [name] + [variant_name(name, variant) for variant in VARIANTS]:
+        storage.delete(path)
+
+
+def stored_names(storage):
+    """Имена исходных файлов в хранилище"""
+    for directory, subdirectories, files in os.walk(storage.location):
+        relative = os.path.relpath(directory, storage.location).replace(os.sep, '/')
+        for file in files:
+            name = '%s/%s' % (relative, file)
+            if STORED_NAME.fullmatch(name):
+                yield name
+
+
+def collect_photos(storage=default_storage, grace=3600):
+    """Сверяет счётчики StoredPhoto с записями и удаляет файлы без ссылок
+
+    Счётчик меняется в транзакции записи, но имя файла могли присвоить полю
+    в обход сигналов (update()), а файл, сохранённый в откатившейся
+    транзакции, остаётся без строки StoredPhoto. Файл без ссылок удаляется,
+    если он старше grace секунд: более новый ещё может сохранять чья-то
+    транзакция. Возвращает (исправлено счётчиков, удалено файлов).
+    """
+    references = Counter()
+    for model in PHOTO_MODELS:
+        references.update(dict(
+            model.objects.filter(Photo__gt='').order_by().values_list('Photo').annotate(count=Count('pk'))
+        ))
+    stored = dict(StoredPhoto.objects.values_list('name', 'references'))
+    names = {name for name in set(references) | set(stored_names(storage)) if STORED_NAME.fullmatch(name)}
+    deadline = time.time() - grace
+    fixed = removed = 0
+    for name in sorted(names | set(stored)):
+        if references[name] > 0 and stored.get(name) == references[name]:
+            continue
+        with transaction.atomic():
+            lock_photo(name)
+            count = photo_references(name)
+            try:
+                recent = os.path.getmtime(storage.path(name)) > deadline
+            except FileNotFoundError:
+                recent = False
+            if count > 0 or recent:
+                fixed += stored.get(name, 0) != count
+                StoredPhoto.objects.filter(name=name).update(references=count)
+            else:
+                remove_photo(name, storage)
+                removed += 1
+    return fixed, removed
+
+
+@receiver(post_init, sender=Apartment)
+@receiver(post_init, sender=Building)
+@receiver(post_init, sender=User)
+def remember_photo(sender, instance, **kwargs):
+    # из базы приходит имя файла; новый загружаемый файл ещё не сохранён
+    value = instance.__dict__.get('Photo')
+    instance._stored_photo = value if isinstance(value, str) else None
+
+
+@receiver(post_save, sender=Apartment)
+@receiver(post_save, sender=Building)
+@receiver(post_save, sender=User)
+def count_photo(sender, instance, created, **kwargs):
+    previous = None if created else getattr(instance, '_stored_photo', None)
+    current = instance.Photo.name
+    instance._stored_photo = current
+    if previous == current or not isinstance(instance.Photo.storage, ContentAddressedStorage):
+        return
+    if current:
+        # в транзакции записи: при откате не остаётся и ссылки
+        acquire_photo(current)
+    if previous:
+        transaction.on_commit(lambda: release_photo(previous, instance.Photo.storage))
+
+
+@receiver(post_delete, sender=Apartment)
+@receiver(post_delete, sender=Building)
+@receiver(post_delete, sender=User)
+def release_deleted_photo(sender, instance, **kwargs):
+    name = instance.Photo.name
+    if name and isinstance(instance.Photo.storage, ContentAddressedStorage):
+        transaction.on_commit(lambda: release_photo(name, instance.Photo.storage))
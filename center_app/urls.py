@@ -1,39 +1,55 @@
-from django.urls import path, include
-from .views import *
-from rest_framework.authtoken.views import obtain_auth_token
-
-
-app_name = "center_app"
-
-urlpatterns = [
-    path('auth/', include('djoser.urls')),
-    path('auth/token/', obtain_auth_token, name='token'),
-    re_path(r'^auth/', include('djoser.urls.authtoken')),
-
-    path('apartments/', ApartmentListView.as_view()),
-    path('apartment/<int:pk>/', ApartmentDetailView.as_view()),
-    path('apartment/create/', ApartmentCreateView.as_view()),
-    path('apartment/update/<int:pk>/', ApartmentUpdateView.as_view()),
-    path('apartment/delete/<int:pk>/', ApartmentDeleteView.as_view()),
-
-    path('users/', UserListView.as_view()),
-    path('agents/', AgentListView.as_view()),
-    path('clients/', ClientListView.as_view()),
-    path('user/<int:pk>/', UserDetailView.as_view()),
-    path('user/create/', UserCreateView.as_view()),
-    path('user/update/<int:pk>/', UserUpdateView.as_view()),
-    path('user/delete/<int:pk>/', UserDeleteView.as_view()),
-
-
-    path('buildings/', BuildingListView.as_view()),
-    path('building/<int:pk>/', BuildingDetailView.as_view()),
-    path('building/create/', BuildingCreateView.as_view()),
-    path('building/update/<int:pk>/', BuildingUpdateView.as_view()),
-    path('building/delete/<int:pk>/', BuildingDeleteView.as_view()),
-
-    path('contracts/', ContractListView.as_view()),
-    path('contract/<int:pk>/', ContractDetailView.as_view()),
-    path('contract/create/', ContractCreateView.as_view()),
-    path('contract/update/<int:pk>/', ContractUpdateView.as_view()),
-    path('contract/delete/<int:pk>/', ContractDeleteView.as_view()),
-]
+from django.urls import path, include
+from .async_views import read_view
+from .batch import BatchView
+from .views import *
+from rest_framework.authtoken.views import obtain_auth_token
+
+
+app_name = "center_app"
+
+urlpatterns = [
+    path('auth/', include('djoser.urls')),
+    path('auth/token/', obtain_auth_token, name='token'),
+    re_path(r'^auth/', include('djoser.urls.authtoken')),
+    path('cache/stats/', ResponseCacheStatsView.as_view()),
+    path('db/pool/stats/', DatabasePoolStatsView.as_view()),
+
+    path('apartments/', read_view(ApartmentListView)),
+    path('apartments/available/', read_view(ApartmentAvailableView)),
+    path('apartments/export.<str:fmt>', ApartmentExportView.as_view()),
+    path('apartment/<int:pk>/', read_view(ApartmentDetailView)),
+    path('apartment/create/', ApartmentCreateView.as_view()),
+    path('apartment/update/<int:pk>/', ApartmentUpdateView.as_view()),
+    path('apartment/delete/<int:pk>/', ApartmentDeleteView.as_view()),
+    path('apartments/bulk/', ApartmentBulkView.as_view()),
+
+    path('users/', read_view(UserListView)),
+    path('agents/', read_view(AgentListView)),
+    path('clients/', read_view(ClientListView)),
+    path('user/<int:pk>/', read_view(UserDetailView)),
+    path('user/create/', UserCreateView.as_view()),
+    path('user/update/<int:pk>/', UserUpdateView.as_view()),
+    path('user/delete/<int:pk>/', UserDeleteView.as_view()),
+
+
+    path('buildings/', read_view(BuildingListView)),
+    path('building/<int:pk>/', read_view(BuildingDetailView)),
+    path('building/create/', BuildingCreateView.as_view()),
+    path('building/update/<int:pk>/', BuildingUpdateView.as_view()),
+    path('building/delete/<int:pk>/', BuildingDeleteView.as_view()),
+    path('buildings/bulk/', BuildingBulkView.as_view()),
+
+    path('contracts/', read_view(ContractListView)),
+    path('contracts/export.<str:fmt>', ContractExportView.as_view()),
+    path('contract/<int:pk>/', read_view(ContractDetailView)),
+    path('contract/create/', ContractCreateView.as_view()),
+    path('contract/update/<int:pk>/', ContractUpdateView.as_view()),
+    path('contract/delete/<int:pk>/', ContractDeleteView.as_view()),
+    path('contracts/bulk/', ContractBulkView.as_view()),
+    path('stats/contracts/', ContractStatsView.as_view()),
+    path('dashboard/', DashboardView.as_view()),
+    path('search/', SearchView.as_view()),
+    path('addresses/autocomplete/', AddressAutocompleteView.as_view()),
+    path('batch/', BatchView.as_view()),
+    path('changes/', ChangeFeedView.as_view()),
+]
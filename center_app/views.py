@@ -1,160 +1,463 @@
-from rest_framework import generics, permissions, status
-from django.shortcuts import render
-from django.urls import *
-from rest_framework.response import Response
-from rest_framework.views import APIView
-
-from .models import *
-from .serializers import *
-
-
-class Logout(APIView):
-
-    def get(self, request, format=None):
-        request.user.auth_token.delete()
-        return Response(status=status.HTTP_200_OK)
-
-
-# --------------------------------------------------------------------------Apartment
-
-
-class ApartmentListView(generics.ListAPIView):
-    """Вывод списка квартир"""
-    serializer_class = ApartmentDetailSerializer
-    queryset = Apartment.objects.all()
-
-
-class ApartmentDetailView(generics.RetrieveAPIView):
-    """Просмотр квартиры"""
-    queryset = Apartment.objects.all()
-    serializer_class = ApartmentDetailSerializer
-
-
-class ApartmentCreateView(generics.CreateAPIView):
-    """Добавление квартиры"""
-    queryset = Apartment.objects.all()
-    serializer_class = ApartmentCreateSerializer
-
-
-class ApartmentUpdateView(generics.RetrieveUpdateAPIView):
-    """Редактирование квартиры"""
-    queryset = Apartment.objects.all()
-    serializer_class = ApartmentCreateSerializer
-
-
-class ApartmentDeleteView(generics.DestroyAPIView):
-    """Удаление квартиры"""
-    queryset = Apartment.objects.filter()
-    serializer_class = ApartmentDetailSerializer
-
-
-# --------------------------------------------------------------------------User
-
-
-class AgentListView(generics.ListAPIView):
-    """Вывод списка агентов"""
-    serializer_class = UserDetailSerializer
-    queryset = User.objects.filter(is_staff=True)
-
-
-class ClientListView(generics.ListAPIView):
-    """Вывод списка клиентов"""
-    serializer_class = UserDetailSerializer
-    queryset = User.objects.filter(is_staff=False)
-
-
-class UserListView(generics.ListAPIView):
-    """Вывод списка пользователей"""
-    serializer_class = UserDetailSerializer
-    queryset = User.objects.all()
-
-
-class UserDetailView(generics.RetrieveAPIView):
-    """Просмотр сотрудника"""
-    queryset = User.objects.all()
-    serializer_class = UserDetailSerializer
-
-
-class UserCreateView(generics.CreateAPIView):
-    """Добавление сотрудника"""
-    queryset = User.objects.all()
-    serializer_class = UserCreateSerializer
-
-
-class UserUpdateView(generics.RetrieveUpdateAPIView):
-    """Редактирование сотрудника"""
-    queryset = User.objects.all()
-    serializer_class = UserCreateSerializer
-
-
-class UserDeleteView(generics.DestroyAPIView):
-    """Удаление сотрудника"""
-    queryset = User.objects.all()
-    serializer_class = UserDetailSerializer
-
-
-# --------------------------------------------------------------------------Building
-
-
-class BuildingListView(generics.ListAPIView):
-    """Вывод списка зданий"""
-    serializer_class = BuildingDetailSerializer
-    queryset = Building.objects.all()
-
-
-class BuildingDetailView(generics.RetrieveAPIView):
-    """Просмотр здания"""
-    queryset = Building.objects.all()
-    serializer_class = BuildingDetailSerializer
-
-
-class BuildingCreateView(generics.CreateAPIView):
-    """Добавление здания"""
-    queryset = Building.objects.all()
-    serializer_class = BuildingCreateSerializer
-
-
-class BuildingUpdateView(generics.RetrieveUpdateAPIView):
-    """Редактирование здания"""
-    queryset = Building.objects.all()
-    serializer_class = BuildingCreateSerializer
-
-
-class BuildingDeleteView(generics.DestroyAPIView):
-    """Удаление здания"""
-    queryset = Building.objects.filter()
-    serializer_class = BuildingDetailSerializer
-
-
-# --------------------------------------------------------------------------Contract
-
-
-class ContractListView(generics.ListAPIView):
-    """Вывод списка контрактов"""
-    serializer_class = ContractDetailSerializer
-    queryset = Contract.objects.all()
-
-
-class ContractDetailView(generics.RetrieveAPIView):
-    """Просмотр контракта"""
-    queryset = Contract.objects.all()
-    serializer_class = ContractDetailSerializer
-
-
-class ContractCreateView(generics.CreateAPIView):
-    """Добавление контракта"""
-    queryset = Contract.objects.all()
-    serializer_class = ContractCreateSerializer
-
-
-class ContractUpdateView(generics.RetrieveUpdateAPIView):
-    """Редактирование контракта"""
-    queryset = Contract.objects.all()
-    serializer_class = ContractCreateSerializer
-
-
-class ContractDeleteView(generics.DestroyAPIView):
-    """Удаление контракта"""
-    queryset = Contract.objects.filter()
-    serializer_class = ContractDetailSerializer
-    #permission_class = permissions.IsAuthenticatedOrReadOnly
+import datetime
+
+from django.conf import settings
+from django.db.models import Exists, OuterRef
+from rest_framework import generics, permissions, status
+from django.shortcuts import render
+from django.urls import *
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+from rest_framework.views import APIView
+
+from .autocomplete import address_index
+from .booking import find_batch_conflicts, lock_apartments, parse_period
+from .bulk import BulkModelView
+from .cache import CachedResponseMixin, response_cache
+from .changes import changes_since, horizon, option
+from .conditional import ConditionalGetMixin
+from .export import ExportView
+from .filters import COMPARISONS, FieldFilterBackend, KeysetOrderingFilter, SparseFieldsMixin
+from .models import *
+from .pagination import KeysetPagination
+from .pool import pool_stats
+from .search import DOCUMENTS, TooManyMatches, get_backend, parse_query
+from .serializers import *
+from .stats import GROUPS, ROLLUP_GROUPS, contract_stats, default_period, rollup_stats
+
+
+class Logout(APIView):
+
+    def get(self, request, format=None):
+        request.user.auth_token.delete()
+        return Response(status=status.HTTP_200_OK)
+
+
+class ResponseCacheStatsView(APIView):
+    """Счётчики попаданий и промахов кэша ответов"""
+    permission_classes = (permissions.IsAdminUser,)
+
+    def get(self, request, format=None):
+        return Response(response_cache.stats())
+
+
+class ContractStatsView(APIView):
+    """Сводка по договорам: ?group=agent|building|city|month&from=&to="""
+    permission_classes = (permissions.IsAdminUser,)
+
+    def get(self, request, format=None):
+        group = request.query_params.get('group', 'agent')
+        if group not in GROUPS:
+            raise ValidationError({'group': 'Ожидается одно из: %s' % ', '.join(GROUPS)})
+        start, end = parse_period(request.query_params, default=default_period())
+        return Response({
+            'group': group,
+            'from': start,
+            'to': end,
+            'results': contract_stats(group, start, end),
+        })
+
+
+class DashboardView(APIView):
+    """Сводка для панели агента из таблиц сводок по месяцам
+
+    ?group=agent|building|city|apartment|month, ?from= и ?to= - первые числа месяцев.
+    Группировка по квартирам требует ?building=.
+    """
+    permission_classes = (permissions.IsAdminUser,)
+
+    def get(self, request, format=None):
+        group = request.query_params.get('group', 'agent')
+        if group not in ROLLUP_GROUPS:
+            raise ValidationError({'group': 'Ожидается одно из: %s' % ', '.join(ROLLUP_GROUPS)})
+        start, end = parse_period(request.query_params, default=default_period())
+        errors = {param: 'Ожидается первое число месяца'
+                  for param, value in (('from', start), ('to', end)) if value.day != 1}
+        building = request.query_params.get('building')
+        if group == 'apartment' and not (building or '').isdigit():
+            errors['building'] = 'Укажите здание для сводки по квартирам'
+        if errors:
+            raise ValidationError(errors)
+        return Response({
+            'group': group,
+            'from': start,
+            'to': end,
+            'results': rollup_stats(group, start, end, building=int(building) if group == 'apartment' else None),
+        })
+
+
+class DatabasePoolStatsView(APIView):
+    """Счётчики пулов соединений текущего процесса"""
+    permission_classes = (permissions.IsAdminUser,)
+
+    def get(self, request, format=None):
+        return Response(pool_stats())
+
+
+class IntParamMixin:
+
+    def int_param(self, name, default, maximum=None):
+        value = self.request.query_params.get(name)
+        if value is None:
+            return default
+        if not value.isdigit():
+            raise ValidationError({name: 'Ожидается неотрицательное целое число'})
+        return min(int(value), maximum) if maximum else int(value)
+
+
+class SearchView(IntParamMixin, APIView):
+    """Поиск по адресам и описаниям квартир и зданий
+
+    ?q= - слова запроса, все обязательны; слово* ищет по началу слова.
+    ?type=apartment|building, ?offset=, ?page_size=. Запрос, у которого
+    больше SEARCH_RANK_WINDOW совпадений, получает 400: его нужно уточнить.
+    """
+    page_size = getattr(settings, 'PAGE_SIZE', 100)
+    max_page_size = getattr(settings, 'MAX_PAGE_SIZE', 1000)
+
+    def get(self, request, format=None):
+        terms = parse_query(request.query_params.get('q', ''))
+        if not terms:
+            raise ValidationError({'q': 'Пустой запрос'})
+        kinds = request.query_params.getlist('type') or list(DOCUMENTS)
+        unknown = set(kinds) - set(DOCUMENTS)
+        if unknown:
+            raise ValidationError({'type': 'Ожидается одно из: %s' % ', '.join(DOCUMENTS)})
+        offset = self.int_param('offset', 0)
+        page_size = self.int_param('page_size', self.page_size, self.max_page_size) or self.page_size
+
+        try:
+            hits = get_backend().search(terms, kinds, offset, page_size + 1)
+        except TooManyMatches as error:
+            raise ValidationError({'q': 'Больше %d совпадений, уточните запрос' % error.limit})
+        url = request.build_absolute_uri()
+        previous = None
+        if offset:
+            previous = replace_query_param(url, 'offset', max(offset - page_size, 0)) \
+                if offset > page_size else remove_query_param(url, 'offset')
+        return Response({
+            'next': replace_query_param(url, 'offset', offset + page_size) if len(hits) > page_size else None,
+            'previous': previous,
+            'results': [
+                {'type': kind, 'id': pk, 'highlights': highlights}
+                for kind, pk, highlights in hits[:page_size]
+            ],
+        })
+
+
+class ChangeFeedView(IntParamMixin, APIView):
+    """Изменения квартир, зданий, договоров и пользователей для синхронизации клиента
+
+    ?since= - номер последнего полученного изменения, 0 - загрузить всё;
+    ?page_size=. В ответе next - since для следующего запроса, more - есть
+    ли ещё изменения. Если журнал сжат дальше since, ответ 410: удаления
+    могли потеряться, данные нужно загрузить заново с since=0.
+    """
+
+    def get(self, request, format=None):
+        since = self.int_param('since', 0)
+        default = option('PAGE_SIZE', 500)
+        page_size = self.int_param('page_size', default, option('MAX_PAGE_SIZE', 5000)) or default
+        changes, last, more = changes_since(since, page_size, {'request': request})
+        # граница читается после журнала: сжатие во время чтения тоже заметно
+        boundary = horizon()
+        if 0 < since < boundary:
+            return Response({'detail': 'Журнал изменений сжат, загрузите данные с since=0', 'horizon': boundary},
+                            status=status.HTTP_410_GONE)
+        return Response({'next': last, 'more': more, 'changes': changes})
+
+
+class AddressAutocompleteView(APIView):
+    """Подсказки адресов зданий: ?q= - начало адреса (город или улица), ?limit= до 50"""
+    max_limit = 50
+
+    def get(self, request, format=None):
+        limit = request.query_params.get('limit', '10')
+        if not limit.isdigit() or not 0 < int(limit) <= self.max_limit:
+            raise ValidationError({'limit': 'Ожидается число от 1 до %d' % self.max_limit})
+        found = address_index.lookup(request.query_params.get('q', ''), int(limit))
+        return Response({'results': [
+            {'BuildingID': pk, 'City': city, 'Street': street, 'Number': number,
+             'address': '%s, %s, %s' % (city, street, number)}
+            for pk, (city, street, number) in found
+        ]})
+
+
+# --------------------------------------------------------------------------Apartment
+
+
+class ApartmentListView(SparseFieldsMixin, ConditionalGetMixin, CachedResponseMixin, generics.ListAPIView):
+    """Вывод списка квартир"""
+    serializer_class = ApartmentDetailSerializer
+    queryset = Apartment.objects.all()
+    pagination_class = KeysetPagination
+    ordering = 'ApartmentID'
+    filter_backends = (FieldFilterBackend, KeysetOrderingFilter)
+    filter_fields = {'Number': ['exact'], 'Cost': COMPARISONS, 'Square': COMPARISONS}
+    ordering_fields = ('ApartmentID', 'Number', 'Cost', 'Square')
+    cache_namespaces = ('apartment',)
+
+
+class ApartmentAvailableView(SparseFieldsMixin, generics.ListAPIView):
+    """Квартиры, свободные с ?from= по ?to= (дата выезда не включается)"""
+    serializer_class = ApartmentDetailSerializer
+    pagination_class = KeysetPagination
+    ordering = 'ApartmentID'
+    filter_backends = (FieldFilterBackend, KeysetOrderingFilter)
+    filter_fields = {'Number': ['exact'], 'Cost': COMPARISONS, 'Square': COMPARISONS}
+    ordering_fields = ('ApartmentID', 'Number', 'Cost', 'Square')
+
+    def get_queryset(self):
+        start, end = parse_period(self.request.query_params)
+        booked = Contract.objects.active().overlapping(start, end).filter(ApartmentID=OuterRef('pk'))
+        return Apartment.objects.filter(~Exists(booked))
+
+
+class ApartmentExportView(ExportView):
+    """Выгрузка квартир"""
+    model = Apartment
+
+
+class ApartmentDetailView(ConditionalGetMixin, CachedResponseMixin, generics.RetrieveAPIView):
+    """Просмотр квартиры"""
+    queryset = Apartment.objects.all()
+    serializer_class = ApartmentDetailSerializer
+    cache_namespaces = ('apartment',)
+
+
+class ApartmentCreateView(generics.CreateAPIView):
+    """Добавление квартиры"""
+    queryset = Apartment.objects.all()
+    serializer_class = ApartmentCreateSerializer
+
+
+class ApartmentUpdateView(generics.RetrieveUpdateAPIView):
+    """Редактирование квартиры"""
+    queryset = Apartment.objects.all()
+    serializer_class = ApartmentCreateSerializer
+
+
+class ApartmentDeleteView(generics.DestroyAPIView):
+    """Удаление квартиры"""
+    queryset = Apartment.objects.filter()
+    serializer_class = ApartmentDetailSerializer
+
+
+class ApartmentBulkView(BulkModelView):
+    """Пакетные операции с квартирами"""
+    queryset = Apartment.objects.all()
+    serializer_class = ApartmentBulkSerializer
+
+
+# --------------------------------------------------------------------------User
+
+
+class AgentListView(SparseFieldsMixin, ConditionalGetMixin, generics.ListAPIView):
+    """Вывод списка агентов"""
+    serializer_class = UserDetailSerializer
+    queryset = User.objects.filter(is_staff=True)
+    pagination_class = KeysetPagination
+    ordering = 'UserID'
+    filter_backends = (FieldFilterBackend, KeysetOrderingFilter)
+    filter_fields = {'first_name': ['exact'], 'last_name': ['exact'], 'BirthDate': COMPARISONS}
+    ordering_fields = ('UserID', 'last_name', 'date_joined')
+
+
+class ClientListView(SparseFieldsMixin, ConditionalGetMixin, generics.ListAPIView):
+    """Вывод списка клиентов"""
+    serializer_class = UserDetailSerializer
+    queryset = User.objects.filter(is_staff=False)
+    pagination_class = KeysetPagination
+    ordering = 'UserID'
+    filter_backends = (FieldFilterBackend, KeysetOrderingFilter)
+    filter_fields = {'first_name': ['exact'], 'last_name': ['exact'], 'BirthDate': COMPARISONS}
+    ordering_fields = ('UserID', 'last_name', 'date_joined')
+
+
+class UserListView(SparseFieldsMixin, ConditionalGetMixin, generics.ListAPIView):
+    """Вывод списка пользователей"""
+    serializer_class = UserDetailSerializer
+    queryset = User.objects.all()
+    pagination_class = KeysetPagination
+    ordering = 'UserID'
+    filter_backends = (FieldFilterBackend, KeysetOrderingFilter)
+    filter_fields = {'first_name': ['exact'], 'last_name': ['exact'], 'BirthDate': COMPARISONS}
+    ordering_fields = ('UserID', 'last_name', 'date_joined')
+
+
+class UserDetailView(ConditionalGetMixin, generics.RetrieveAPIView):
+    """Просмотр сотрудника"""
+    queryset = User.objects.all()
+    serializer_class = UserDetailSerializer
+
+
+class UserCreateView(generics.CreateAPIView):
+    """Добавление сотрудника"""
+    queryset = User.objects.all()
+    serializer_class = UserCreateSerializer
+
+
+class UserUpdateView(generics.RetrieveUpdateAPIView):
+    """Редактирование сотрудника"""
+    queryset = User.objects.all()
+    serializer_class = UserCreateSerializer
+
+
+class UserDeleteView(generics.DestroyAPIView):
+    """Удаление сотрудника"""
+    queryset = User.objects.all()
+    serializer_class = UserDetailSerializer
+
+
+# --------------------------------------------------------------------------Building
+
+
+class BuildingListView(SparseFieldsMixin, ConditionalGetMixin, CachedResponseMixin, generics.ListAPIView):
+    """Вывод списка зданий"""
+    serializer_class = BuildingDetailSerializer
+    queryset = Building.objects.prefetch_related('Apartments')
+    pagination_class = KeysetPagination
+    ordering = 'BuildingID'
+    filter_backends = (FieldFilterBackend, KeysetOrderingFilter)
+    filter_fields = {'City': ['exact'], 'Street': ['exact'], 'Type': ['exact']}
+    ordering_fields = ('BuildingID', 'City')
+    cache_namespaces = ('building',)
+    nested_change_kinds = ('apartment',)
+
+
+class BuildingDetailView(ConditionalGetMixin, CachedResponseMixin, generics.RetrieveAPIView):
+    """Просмотр здания"""
+    queryset = Building.objects.prefetch_related('Apartments')
+    serializer_class = BuildingDetailSerializer
+    cache_namespaces = ('building',)
+
+
+class BuildingCreateView(generics.CreateAPIView):
+    """Добавление здания"""
+    queryset = Building.objects.all()
+    serializer_class = BuildingCreateSerializer
+
+
+class BuildingUpdateView(generics.RetrieveUpdateAPIView):
+    """Редактирование здания"""
+    queryset = Building.objects.all()
+    serializer_class = BuildingCreateSerializer
+
+
+class BuildingDeleteView(generics.DestroyAPIView):
+    """Удаление здания"""
+    queryset = Building.objects.filter()
+    serializer_class = BuildingDetailSerializer
+
+
+class BuildingBulkView(BulkModelView):
+    """Пакетные операции с зданиями"""
+    queryset = Building.objects.all()
+    serializer_class = BuildingBulkSerializer
+
+
+# --------------------------------------------------------------------------Contract
+
+
+class ContractExpandMixin:
+    """Разворачивание агента, клиента и квартиры по ?expand=agent,client,apartment
+
+    Связанные объекты подтягиваются join'ом, а их many-to-many поля одной
+    выборкой на страницу, поэтому число запросов не зависит от числа контрактов.
+    """
+
+    def get_expand(self):
+        raw = self.request.query_params.get('expand', '')
+        names = {name.strip() for name in raw.split(',') if name.strip()}
+        unknown = names - set(ContractDetailSerializer.expandable_fields)
+        if unknown:
+            raise ValidationError({'expand': 'Неизвестные поля: %s' % ', '.join(sorted(unknown))})
+        return names
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        for name in self.get_expand():
+            field, serializer_class = ContractDetailSerializer.expandable_fields[name]
+            queryset = queryset.select_related(field)
+            if serializer_class is UserDetailSerializer:
+                queryset = queryset.prefetch_related(field + '__groups', field + '__user_permissions')
+        return queryset
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['expand'] = self.get_expand()
+        return context
+
+    def get_modified_fields(self):
+        # развёрнутые объекты тоже входят в ETag ответа
+        fields = super().get_modified_fields()
+        for name in self.get_expand():
+            field, serializer_class = ContractDetailSerializer.expandable_fields[name]
+            fields.append(field + '__modifiedDate')
+        return fields
+
+
+class ContractListView(SparseFieldsMixin, ContractExpandMixin, ConditionalGetMixin, generics.ListAPIView):
+    """Вывод списка контрактов"""
+    serializer_class = ContractDetailSerializer
+    queryset = Contract.objects.all()
+    pagination_class = KeysetPagination
+    ordering = 'ContractID'
+    filter_backends = (FieldFilterBackend, KeysetOrderingFilter)
+    filter_fields = {
+        'Status': ['exact', 'in'],
+        'AgentID': ['exact'],
+        'ClientID': ['exact'],
+        'ApartmentID': ['exact'],
+        'startDate': COMPARISONS + ['isnull'],
+        'endDate': COMPARISONS + ['isnull'],
+    }
+    ordering_fields = ('ContractID', 'Status', 'startDate', 'endDate')
+    # пустая дата начала - раньше всех, пустая дата окончания - позже всех
+    ordering_nulls = {'startDate': datetime.date.min, 'endDate': datetime.date.max}
+
+
+class ContractExportView(ExportView):
+    """Выгрузка контрактов"""
+    model = Contract
+
+
+class ContractDetailView(ContractExpandMixin, ConditionalGetMixin, generics.RetrieveAPIView):
+    """Просмотр контракта"""
+    queryset = Contract.objects.all()
+    serializer_class = ContractDetailSerializer
+
+
+class ContractCreateView(generics.CreateAPIView):
+    """Добавление контракта"""
+    queryset = Contract.objects.all()
+    serializer_class = ContractCreateSerializer
+
+
+class ContractUpdateView(generics.RetrieveUpdateAPIView):
+    """Редактирование контракта"""
+    queryset = Contract.objects.all()
+    serializer_class = ContractCreateSerializer
+
+
+class ContractDeleteView(generics.DestroyAPIView):
+    """Удаление контракта"""
+    queryset = Contract.objects.filter()
+    serializer_class = ContractDetailSerializer
+    #permission_class = permissions.IsAuthenticatedOrReadOnly
+
+
+class ContractBulkView(BulkModelView):
+    """Пакетные операции с контрактами"""
+    queryset = Contract.objects.all()
+    serializer_class = ContractBulkSerializer
+
+    def validate_objects(self, objects):
+        lock_apartments(c.ApartmentID_id for c in objects if c.Status in Contract.ACTIVE_STATUSES)
+        conflicts = find_batch_conflicts(objects)
+        if any(conflict is not None for conflict in conflicts):
+            raise ValidationError([
+                {} if conflict is None else
+                {'ApartmentID': ['Квартира уже занята на эти даты (договор %s)' % conflict]}
+                for conflict in conflicts
+            ])
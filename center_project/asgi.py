@@ -1,16 +1,18 @@
-"""
-ASGI config for center_project project.
-
-It exposes the ASGI callable as a module-level variable named ``application``.
-
-For more information on this file, see
-https://docs.djangoproject.com/en/3.2/howto/deployment/asgi/
-"""
-
-import os
-
-from django.core.asgi import get_asgi_application
-
-os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'center_project.settings')
-
-application = get_asgi_application()
+"""
+ASGI config for center_project project.
+
+It exposes the ASGI callable as a module-level variable named ``application``.
+
+For more information on this file, see
+https://docs.djangoproject.com/en/3.2/howto/deployment/asgi/
+"""
+
+import os
+
+from django.core.asgi import get_asgi_application
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'center_project.settings')
+# чтение каталога не ждёт общего потока синхронных представлений
+os.environ.setdefault('CENTER_ASYNC_READ_VIEWS', '1')
+
+application = get_asgi_application()
@@ -1,161 +1,272 @@
-"""
-Django settings for center_project project.
-
-Generated by 'django-admin startproject' using Django 3.2.2.
-
-For more information on this file, see
-https://docs.djangoproject.com/en/3.2/topics/settings/
-
-For the full list of settings and their values, see
-https://docs.djangoproject.com/en/3.2/ref/settings/
-"""
-import os
-from pathlib import Path
-
-# Build paths inside the project like this: BASE_DIR / 'subdir'.
-BASE_DIR = Path(__file__).resolve().parent.parent
-
-
-# Quick-start development settings - unsuitable for production
-# See https://docs.djangoproject.com/en/3.2/howto/deployment/checklist/
-
-# SECURITY WARNING: keep the secret key used in production secret!
-SECRET_KEY = 'django-insecure-x0c==$m0596rd6fxfh@8alr8ba$zt^9jfg7nippmzu49c&8i1d'
-
-# SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
-
-ALLOWED_HOSTS = []
-
-
-# Application definition
-
-INSTALLED_APPS = [
-    'drf_yasg',
-    'django.contrib.admin',
-    'django.contrib.auth',
-    'django.contrib.contenttypes',
-    'django.contrib.sessions',
-    'django.contrib.messages',
-    'django.contrib.staticfiles',
-    'rest_framework',
-    'rest_framework.authtoken',
-    'center_app',
-    'djoser',
-    'corsheaders',
-]
-
-AUTH_USER_MODEL = 'center_app.User'
-
-MIDDLEWARE = [
-    'corsheaders.middleware.CorsMiddleware',
-    'django.middleware.common.CommonMiddleware',
-    'django.middleware.security.SecurityMiddleware',
-    'django.contrib.sessions.middleware.SessionMiddleware',
-    'django.middleware.common.CommonMiddleware',
-    'django.middleware.csrf.CsrfViewMiddleware',
-    'django.contrib.auth.middleware.AuthenticationMiddleware',
-    'django.contrib.messages.middleware.MessageMiddleware',
-    'django.middleware.clickjacking.XFrameOptionsMiddleware',
-]
-
-CORS_ORIGIN_ALLOW_ALL = True
-
-ROOT_URLCONF = 'center_project.urls'
-
-TEMPLATES = [
-    {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
-        'DIRS': [],
-        'APP_DIRS': True,
-        'OPTIONS': {
-            'context_processors': [
-                'django.template.context_processors.debug',
-                'django.template.context_processors.request',
-                'django.contrib.auth.context_processors.auth',
-                'django.contrib.messages.context_processors.messages',
-            ],
-        },
-    },
-]
-
-WSGI_APPLICATION = 'center_project.wsgi.application'
-
-
-# Database
-# https://docs.djangoproject.com/en/3.2/ref/settings/#databases
-
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
-    }
-}
-
-
-# Password validation
-# https://docs.djangoproject.com/en/3.2/ref/settings/#auth-password-validators
-
-AUTH_PASSWORD_VALIDATORS = [
-    {
-        'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
-    },
-    {
-        'NAME': 'django.contrib.auth.password_validation.MinimumLengthValidator',
-    },
-    {
-        'NAME': 'django.contrib.auth.password_validation.CommonPasswordValidator',
-    },
-    {
-        'NAME': 'django.contrib.auth.password_validation.NumericPasswordValidator',
-    },
-]
-
-
-CORS_ORIGIN_WHITELIST = [
-    "http://localhost:8080",
-]
-
-CORS_ALLOW_METHODS = [
-    'DELETE',
-    'GET',
-    'OPTIONS',
-    'PATCH',
-    'POST',
-    'PUT',
-]
-
-
-REST_FRAMEWORK = {
-    'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework.authentication.TokenAuthentication',
-    ),
-}
-
-
-# Internationalization
-# https://docs.djangoproject.com/en/3.2/topics/i18n/
-
-LANGUAGE_CODE = 'en-us'
-
-TIME_ZONE = 'UTC'
-
-USE_I18N = True
-
-USE_L10N = True
-
-USE_TZ = True
-
-
-# Static files (CSS, JavaScript, Images)
-# https://docs.djangoproject.com/en/3.2/howto/static-files/
-
-STATIC_URL = '/static/'
-
-MEDIA_URL = '/media/'
-MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
-
-# Default primary key field type
-# https://docs.djangoproject.com/en/3.2/ref/settings/#default-auto-field
-
-DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+"""
+Django settings for center_project project.
+
+Generated by 'django-admin startproject' using Django 3.2.2.
+
+For more information on this file, see
+https://docs.djangoproject.com/en/3.2/topics/settings/
+
+For the full list of settings and their values, see
+https://docs.djangoproject.com/en/3.2/ref/settings/
+"""
+import os
+from pathlib import Path
+
+# Build paths inside the project like this: BASE_DIR / 'subdir'.
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+
+# Quick-start development settings - unsuitable for production
+# See https://docs.djangoproject.com/en/3.2/howto/deployment/checklist/
+
+# SECURITY WARNING: keep the secret key used in production secret!
+SECRET_KEY = 'django-insecure-x0c==$m0596rd6fxfh@8alr8ba$zt^9jfg7nippmzu49c&8i1d'
+
+# SECURITY WARNING: don't run with debug turned on in production!
+DEBUG = True
+
+ALLOWED_HOSTS = []
+
+
+# Application definition
+
+INSTALLED_APPS = [
+    'drf_yasg',
+    'django.contrib.admin',
+    'django.contrib.auth',
+    'django.contrib.contenttypes',
+    'django.contrib.sessions',
+    'django.contrib.messages',
+    'django.contrib.staticfiles',
+    'rest_framework',
+    'rest_framework.authtoken',
+    'center_app',
+    'djoser',
+    'corsheaders',
+]
+
+AUTH_USER_MODEL = 'center_app.User'
+
+MIDDLEWARE = [
+    'corsheaders.middleware.CorsMiddleware',
+    'center_app.routers.ReplicaRoutingMiddleware',
+    'django.middleware.common.CommonMiddleware',
+    'django.middleware.security.SecurityMiddleware',
+    'django.contrib.sessions.middleware.SessionMiddleware',
+    'django.middleware.common.CommonMiddleware',
+    'django.middleware.csrf.CsrfViewMiddleware',
+    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'django.contrib.messages.middleware.MessageMiddleware',
+    'django.middleware.clickjacking.XFrameOptionsMiddleware',
+]
+
+CORS_ORIGIN_ALLOW_ALL = True
+
+ROOT_URLCONF = 'center_project.urls'
+
+TEMPLATES = [
+    {
+        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'DIRS': [],
+        'APP_DIRS': True,
+        'OPTIONS': {
+            'context_processors': [
+                'django.template.context_processors.debug',
+                'django.template.context_processors.request',
+                'django.contrib.auth.context_processors.auth',
+                'django.contrib.messages.context_processors.messages',
+            ],
+        },
+    },
+]
+
+WSGI_APPLICATION = 'center_project.wsgi.application'
+
+
+# Database
+# https://docs.djangoproject.com/en/3.2/ref/settings/#databases
+
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'db.sqlite3',
+        # соединение переживает запрос и используется потоком до 60 с
+        'CONN_MAX_AGE': 60,
+    }
+}
+
+# Пул соединений: ENGINE 'center_app.backends.postgresql' (или .sqlite3),
+# 'CONN_MAX_AGE': 0 - соединение возвращается в пул после каждого запроса,
+# и настройки пула на процесс в той же записи DATABASES:
+# 'POOL': {'MAX_SIZE': 10, 'TIMEOUT': 5, 'MAX_LIFETIME': 600, 'HEALTH_CHECK': True}
+
+# PRAGMA для каждого нового соединения с SQLite (center_app.db):
+# WAL позволяет читать во время записи, busy_timeout ждёт блокировку
+# вместо ошибки "database is locked".
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,
+    'cache_size': -64000,
+    'mmap_size': 268435456,
+    'temp_store': 'MEMORY',
+}
+
+# Реплики только для чтения - алиасы из DATABASES. Для локальной проверки
+# добавьте в DATABASES 'replica' со своим файлом SQLite и запустите
+# python manage.py replicate --interval 1
+DATABASE_REPLICAS = []
+DATABASE_ROUTERS = ['center_app.routers.ReplicaRouter']
+
+# Сколько секунд после записи клиент читает с основной базы
+REPLICA_STICKY_SECONDS = 5
+# Кэш, в котором этот срок хранится для клиентов с токеном (без кук);
+# должен быть общим для всех процессов, см. CACHES
+REPLICA_STICKY_CACHE = 'default'
+
+
+# Password validation
+# https://docs.djangoproject.com/en/3.2/ref/settings/#auth-password-validators
+
+AUTH_PASSWORD_VALIDATORS = [
+    {
+        'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
+    },
+    {
+        'NAME': 'django.contrib.auth.password_validation.MinimumLengthValidator',
+    },
+    {
+        'NAME': 'django.contrib.auth.password_validation.CommonPasswordValidator',
+    },
+    {
+        'NAME': 'django.contrib.auth.password_validation.NumericPasswordValidator',
+    },
+]
+
+
+CORS_ORIGIN_WHITELIST = [
+    "http://localhost:8080",
+]
+
+CORS_ALLOW_METHODS = [
+    'DELETE',
+    'GET',
+    'OPTIONS',
+    'PATCH',
+    'POST',
+    'PUT',
+]
+
+
+REST_FRAMEWORK = {
+    'DEFAULT_AUTHENTICATION_CLASSES': (
+        'center_app.authentication.CachedTokenAuthentication',
+    ),
+}
+
+# Размер страницы списков и верхняя граница для ?page_size=
+PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+# Кэш проверенных токенов: размер LRU, время жизни записи (с) и,
+# при необходимости, алиас общего кэша из CACHES
+TOKEN_CACHE = {
+    'MAX_SIZE': 10000,
+    'TIMEOUT': 60,
+    'CACHE_ALIAS': None,
+}
+
+# Максимальный размер пакета для */bulk/
+BULK_MAX_ITEMS = 10000
+
+# /batch/: запросов в пакете и потоков для параллельных чтений в процессе
+BATCH_MAX_REQUESTS = 50
+BATCH_MAX_WORKERS = 4
+
+# Кэш ответов, версия индекса подсказок адресов и токены нужны всем
+# процессам сервера: при нескольких воркерах кэш должен быть общим
+# (CENTER_MEMCACHED=host:11211), иначе каждый процесс видит только свои
+# сбросы. Кэш в памяти процесса - для разработки; manage.py check --deploy
+# предупреждает о нём.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.memcached.PyMemcacheCache',
+        'LOCATION': os.environ['CENTER_MEMCACHED'],
+    } if os.environ.get('CENTER_MEMCACHED') else {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+}
+
+# Кэш ответов каталога квартир и зданий
+RESPONSE_CACHE = {
+    'CACHE_ALIAS': 'default',
+    'TIMEOUT': 300,
+}
+
+# Полнотекстовый поиск /search/: None - индекс FTS5 на SQLite,
+# center_app.search.DatabaseBackend (поиск без индекса) на других базах.
+SEARCH_BACKEND = None
+# Сколько совпадений ранжировать по bm25; запрос с большим числом
+# совпадений получает 400. None - без ограничения
+SEARCH_RANK_WINDOW = 1000
+
+# Списки и карточки квартир, зданий, договоров и пользователей как асинхронные
+# представления (center_app.async_views); включается в center_project/asgi.py
+ASYNC_READ_VIEWS = os.environ.get('CENTER_ASYNC_READ_VIEWS') == '1'
+# Потоков (и соединений с базой) для них в процессе
+ASYNC_READ_THREADS = 16
+
+# Подсказки адресов /addresses/autocomplete/: индекс в памяти каждого процесса.
+# Больше MAX_BUILDINGS зданий - поиск запросом к базе. Изменения зданий
+# (и других процессов) индекс берёт из журнала изменений не чаще раза
+# в REFRESH_INTERVAL секунд.
+ADDRESS_AUTOCOMPLETE = {
+    'MAX_BUILDINGS': 100000,
+    'REFRESH_INTERVAL': 1,
+}
+
+# Лента изменений /changes/: размер страницы, верхняя граница для ?page_size=
+# и сколько дней хранятся метки удаления (сжатие: manage.py compact_changes)
+CHANGE_FEED = {
+    'PAGE_SIZE': 500,
+    'MAX_PAGE_SIZE': 5000,
+    'TOMBSTONE_DAYS': 30,
+}
+
+
+# Internationalization
+# https://docs.djangoproject.com/en/3.2/topics/i18n/
+
+LANGUAGE_CODE = 'en-us'
+
+TIME_ZONE = 'UTC'
+
+USE_I18N = True
+
+USE_L10N = True
+
+USE_TZ = True
+
+
+# Static files (CSS, JavaScript, Images)
+# https://docs.djangoproject.com/en/3.2/howto/static-files/
+
+STATIC_URL = '/static/'
+
+MEDIA_URL = '/media/'
+MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+
+# Загрузки хранятся по хэшу содержимого, одинаковые фото - один файл
+DEFAULT_FILE_STORAGE = 'center_app.storage.ContentAddressedStorage'
+
+# Отдача MEDIA_URL приложением (center_app.media.serve_media).
+# MEDIA_ACCEL_REDIRECT - внутренний location nginx, например '/protected-media/':
+# тогда тело файла отдаёт nginx, а приложение только проверяет запрос.
+MEDIA_SERVE = True
+MEDIA_ACCEL_REDIRECT = None
+MEDIA_MAX_AGE = 3600
+
+# Default primary key field type
+# https://docs.djangoproject.com/en/3.2/ref/settings/#default-auto-field
+
+DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
@@ -8,6 +8,13 @@ django.setup()
 from django.contrib.auth import get_user_model
 from center_app.models import Apartment, Building, Contract
 
+@pytest.fixture(autouse=True)
+def _clear_caches():
+    from django.core.cache import cache
+    from center_app.authentication import token_cache
+    cache.clear()
+    token_cache.clear()
+
 @pytest.fixture
 def User():
     return get_user_model()
@@ -29,3 +36,8 @@ def building(db, apartment):
     b = Building.objects.create(BuildingID=1, City="SPB", Street="Nevsky", Number="1", Type="brick")
     b.Apartments.add(apartment)
     return b
+
+@pytest.fixture
+def api():
+    from rest_framework.test import APIClient
+    return APIClient()
@@ -0,0 +1,69 @@
+import asyncio
+import json
+import threading
+
+from asgiref.sync import async_to_sync, sync_to_async
+from django.test import AsyncClient, RequestFactory
+from django.urls import path
+
+from center_app.async_views import async_read_view
+from center_app.models import Apartment
+from center_app.routers import ReplicaRouter, use_replicas
+from center_app.views import ApartmentDetailView, ApartmentListView
+
+urlpatterns = [
+    path("apartments/", async_read_view(ApartmentListView)),
+    path("apartment/<int:pk>/", async_read_view(ApartmentDetailView)),
+]
+
+
+def test_views_are_coroutines():
+    view = async_read_view(ApartmentListView)
+    assert asyncio.iscoroutinefunction(view)
+    assert view.cls is ApartmentListView and view.csrf_exempt
+
+
+def test_async_views_match_sync_views(client, transactional_db, settings):
+    Apartment.objects.bulk_create(Apartment(ApartmentID=i, Number=i, Square=40, Cost=1000) for i in range(1, 4))
+    expected = [client.get(url).json() for url in ("/apartments/?Cost__lte=1000", "/apartment/2/")]
+    settings.ROOT_URLCONF = __name__
+
+    async def fetch():
+        api = AsyncClient()
+        return [await api.get(url) for url in ("/apartments/?Cost__lte=1000", "/apartment/2/", "/apartment/9/")]
+
+    listing, detail, missing = async_to_sync(fetch)()
+    assert [json.loads(listing.content), json.loads(detail.content)] == expected
+    assert missing.status_code == 404
+
+
+def test_reads_run_concurrently(transactional_db, monkeypatch):
+    # оба запроса должны одновременно оказаться внутри представления
+    barrier = threading.Barrier(2, timeout=5)
+    original = ApartmentDetailView.get
+
+    def get(self, request, *args, **kwargs):
+        barrier.wait()
+        return original(self, request, *args, **kwargs)
+
+    monkeypatch.setattr(ApartmentDetailView, "get", get)
+    Apartment.objects.create(ApartmentID=1, Number=1, Square=40, Cost=1000)
+    view = async_read_view(ApartmentDetailView)
+    factory = RequestFactory()
+
+    async def both():
+        return await asyncio.gather(*(view(factory.get("/apartment/1/"), pk=1) for _ in range(2)))
+
+    assert [response.status_code for response in async_to_sync(both)()] == [200, 200]
+
+
+def test_replica_choice_reaches_pool_threads(settings):
+    settings.DATABASE_REPLICAS = ["replica"]
+    read = sync_to_async(ReplicaRouter().db_for_read, thread_sensitive=False)
+
+    async def alias():
+        return await read(Apartment)
+
+    with use_replicas():
+        assert async_to_sync(alias)() == "replica"
+    assert async_to_sync(alias)() == "default"
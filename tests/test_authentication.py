@@ -0,0 +1,85 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIRequestFactory
+
+from center_app.authentication import CachedTokenAuthentication, TokenCache, token_cache
+from center_app.views import Logout
+
+
+def _token_queries(ctx):
+    return [q for q in ctx.captured_queries if "authtoken_token" in q["sql"]]
+
+
+def test_token_is_resolved_once(api, agent):
+    token = Token.objects.create(user=agent)
+    api.credentials(HTTP_AUTHORIZATION="Token " + token.key)
+    api.get("/apartments/")
+    with CaptureQueriesContext(connection) as ctx:
+        resp = api.get("/apartments/")
+    assert resp.status_code == 200
+    assert _token_queries(ctx) == []
+
+
+def test_logout_evicts_token(api, agent):
+    token = Token.objects.create(user=agent)
+    api.credentials(HTTP_AUTHORIZATION="Token " + token.key)
+    api.get("/apartments/")
+    request = APIRequestFactory().get("/logout/", HTTP_AUTHORIZATION="Token " + token.key)
+    assert Logout.as_view()(request).status_code == 200
+    assert token_cache.get(token.key) is None
+    assert api.get("/apartments/").status_code == 401
+
+
+def test_user_update_and_delete_evict_tokens(api, agent):
+    token = Token.objects.create(user=agent)
+    api.credentials(HTTP_AUTHORIZATION="Token " + token.key)
+    api.get("/apartments/")
+    resp = api.patch("/user/update/%d/" % agent.pk, {"is_active": False}, format="json")
+    assert resp.status_code == 200
+    assert api.get("/apartments/").status_code == 401
+
+    agent.is_active = True
+    agent.save()
+    api.get("/apartments/")
+    assert token_cache.get(token.key) is not None
+    assert api.delete("/user/delete/%d/" % agent.pk).status_code == 204
+    assert token_cache.get(token.key) is None
+
+
+def test_lru_evicts_oldest_and_expires():
+    cache = TokenCache(max_size=2, timeout=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+
+    expired = TokenCache(timeout=-1)
+    expired.set("a", 1)
+    assert expired.get("a") is None
+
+
+def test_revocation_reaches_other_processes():
+    # два процесса с общим кэшем: у каждого своя память
+    first, second = TokenCache(cache_alias="default"), TokenCache(cache_alias="default")
+    first.set("k", 1, first.generation("k"))
+    assert second.get("k") == 1
+    first.delete("k")
+    assert second.get("k") is None
+
+    # отзыв между чтением поколения и записью: старое значение не кэшируется
+    generation = first.generation("k")
+    second.delete("k")
+    first.set("k", 2, generation)
+    assert first.get("k") is None and second.get("k") is None
+
+
+def test_requests_get_their_own_user(agent):
+    token = Token.objects.create(user=agent)
+    authentication = CachedTokenAuthentication()
+    first, _ = authentication.authenticate_credentials(token.key)
+    second, cached_token = authentication.authenticate_credentials(token.key)
+    assert first == second and first is not second
+    assert cached_token.user is second and second.is_staff
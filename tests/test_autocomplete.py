@@ -0,0 +1,104 @@
+import threading
+
+import pytest
+
+from center_app import changes
+from center_app.autocomplete import address_index, normalize
+from center_app.models import Building
+
+
+@pytest.fixture
+def addresses(db):
+    address_index.clear()
+    Building.objects.create(BuildingID=1, City="Санкт-Петербург", Street="Невский проспект", Number="12")
+    Building.objects.create(BuildingID=2, City="Санкт-Петербург", Street="Невский проспект", Number="1")
+    Building.objects.create(BuildingID=3, City="Москва", Street="Арбат", Number="5")
+    yield
+    address_index.clear()
+
+
+def _ids(api, q):
+    resp = api.get("/addresses/autocomplete/", {"q": q})
+    assert resp.status_code == 200, resp.data
+    return [item["BuildingID"] for item in resp.data["results"]]
+
+
+def test_normalize():
+    assert normalize("  Санкт-Петербург, Невский  пр.") == "санкт петербург невский пр"
+    assert normalize("Ёлкино") == "елкино"
+
+
+def test_prefix_lookup(api, addresses):
+    assert _ids(api, "невский пр") == [2, 1]
+    assert _ids(api, "Невский проспект, 1") == [2, 1]
+    assert _ids(api, "санкт-петербург невский проспект 12") == [1]
+    assert _ids(api, "моск") == [3]
+    assert _ids(api, "тверская") == []
+    resp = api.get("/addresses/autocomplete/", {"q": "арбат"})
+    assert resp.data["results"] == [
+        {"BuildingID": 3, "City": "Москва", "Street": "Арбат", "Number": "5", "address": "Москва, Арбат, 5"},
+    ]
+    assert api.get("/addresses/autocomplete/", {"q": "арбат", "limit": "0"}).status_code == 400
+
+
+def test_updates_after_commit(api, agent, addresses, django_capture_on_commit_callbacks):
+    assert _ids(api, "арбат") == [3]
+    api.force_authenticate(agent)
+    with django_capture_on_commit_callbacks(execute=True):
+        assert api.patch("/building/update/3/", {"Street": "Тверская"}, format="json").status_code == 200
+        resp = api.post("/buildings/bulk/", [{"BuildingID": 4, "City": "Москва", "Street": "Арбат",
+                                              "Number": "7"}], format="json")
+        assert resp.status_code == 201
+        Building.objects.get(pk=1).delete()
+    built = address_index.built
+    assert _ids(api, "арбат") == [4]
+    assert _ids(api, "тверская") == [3]
+    assert _ids(api, "невский") == [2]
+    # изменения этого процесса применены из журнала без перестройки
+    assert address_index.built == built
+
+
+def test_applies_foreign_changes_from_log(api, addresses, django_assert_num_queries):
+    assert _ids(api, "арбат") == [3]
+    built = address_index.built
+    # другой процесс: запись в базу и журнал, сигналы сюда не доходят
+    Building.objects.filter(pk=3).update(Street="Тверская")
+    changes.record(Building, [3], "update")
+    # журнал читается не чаще раза в refresh_interval
+    assert _ids(api, "арбат") == [3]
+    address_index.checked -= address_index.refresh_interval
+    assert _ids(api, "арбат") == []
+    assert _ids(api, "тверская") == [3]
+    assert address_index.built == built
+    with django_assert_num_queries(1):
+        address_index.lookup("тверская")
+
+
+def test_lookups_do_not_wait_for_refresh(addresses):
+    address_index.ensure()
+    address_index.checked -= address_index.refresh_interval
+    with address_index._refresh_lock:
+        # индекс обновляет другой поток: поиск не ждёт его и не читает журнал
+        thread = threading.Thread(target=address_index.ensure)
+        thread.start()
+        thread.join(5)
+        assert not thread.is_alive()
+        assert [pk for pk, address in address_index.lookup("арбат")] == [3]
+
+
+def test_falls_back_to_database_when_too_large(api, addresses, monkeypatch):
+    monkeypatch.setattr(address_index, "max_buildings", 2)
+    address_index.clear()
+    assert _ids(api, "Арбат") == [3]
+    assert address_index.overflow
+
+
+def test_rebuilds_after_compaction(api, addresses):
+    assert _ids(api, "арбат") == [3]
+    built = address_index.built
+    Building.objects.filter(pk=3).delete()
+    # метка удаления сжата раньше, чем индекс её прочитал
+    changes.compact(before=changes.timezone.now() + changes.datetime.timedelta(days=1))
+    address_index.checked -= address_index.refresh_interval
+    assert _ids(api, "арбат") == []
+    assert address_index.built != built
@@ -0,0 +1,54 @@
+import datetime
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from center_app.models import Apartment, Contract
+
+
+@pytest.fixture
+def booked(agent, client_user):
+    apartments = Apartment.objects.bulk_create(
+        Apartment(ApartmentID=i, Number=i, Square=40, Cost=1000) for i in range(1, 6)
+    )
+
+    def book(pk, apartment, start, end, status="l"):
+        Contract.objects.create(ContractID=pk, AgentID=agent, ClientID=client_user,
+                                ApartmentID=apartments[apartment - 1], Status=status,
+                                startDate=start, endDate=end)
+    d = datetime.date
+    book(1, 1, d(2024, 1, 1), d(2024, 1, 10))
+    book(2, 2, d(2024, 1, 10), d(2024, 1, 20))           # заезд в день выезда из запроса
+    book(3, 3, d(2023, 12, 1), d(2024, 1, 1))            # выезд в день заезда
+    book(4, 4, d(2024, 1, 5), d(2024, 1, 6), status="f")  # завершённый договор не занимает
+    book(5, 5, d(2024, 1, 8), None, status="v")           # открытая дата окончания
+    return apartments
+
+
+def _available(api, start, end):
+    resp = api.get("/apartments/available/?from=%s&to=%s" % (start, end))
+    assert resp.status_code == 200, resp.data
+    return [a["ApartmentID"] for a in resp.data["results"]]
+
+
+def test_available_excludes_overlapping_bookings(api, booked):
+    assert _available(api, "2024-01-01", "2024-01-10") == [2, 3, 4]
+    assert _available(api, "2024-02-01", "2024-02-05") == [1, 2, 3, 4]
+
+
+def test_available_is_a_single_query(api, booked):
+    with CaptureQueriesContext(connection) as ctx:
+        _available(api, "2024-01-01", "2024-01-10")
+    assert len(ctx.captured_queries) == 1
+
+
+def test_available_uses_booking_index(booked):
+    queryset = Contract.objects.active().overlapping(datetime.date(2024, 1, 1), datetime.date(2024, 1, 2))
+    plan = queryset.filter(ApartmentID=1).explain()
+    assert "contract_booking_idx" in plan
+
+
+@pytest.mark.parametrize("query", ["", "?from=2024-01-01", "?from=x&to=2024-01-02", "?from=2024-01-02&to=2024-01-01"])
+def test_available_validates_period(api, db, query):
+    assert api.get("/apartments/available/" + query).status_code == 400
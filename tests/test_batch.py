@@ -0,0 +1,115 @@
+import threading
+
+import pytest
+from django.urls import path
+from rest_framework.authtoken.models import Token
+
+from center_app.async_views import async_read_view
+from center_app.authentication import CachedTokenAuthentication
+from center_app.batch import BatchView
+from center_app.models import Apartment, Contract
+from center_app.views import ApartmentCreateView, ApartmentDetailView
+
+urlpatterns = [
+    path("batch/", BatchView.as_view()),
+    path("apartment/create/", ApartmentCreateView.as_view()),
+    path("apartment/<int:pk>/", async_read_view(ApartmentDetailView)),
+]
+
+
+@pytest.fixture
+def contract(agent, client_user, building, apartment):
+    return Contract.objects.create(ContractID=1, AgentID=agent, ClientID=client_user, ApartmentID=apartment,
+                                   Status="l")
+
+
+def _batch(api, requests, **options):
+    return api.post("/batch/", dict(options, requests=requests), format="json")
+
+
+def test_contract_screen_in_one_round_trip(api, contract, agent, client_user):
+    paths = ["/contract/1/", "/user/%d/" % agent.pk, "/user/%d/" % client_user.pk, "/apartment/101/",
+             "/building/1/"]
+    resp = _batch(api, [{"path": path} for path in paths])
+    assert resp.status_code == 200
+    assert [result["status"] for result in resp.data["results"]] == [200] * 5
+    assert [result["body"] for result in resp.data["results"]] == [api.get(path).data for path in paths]
+
+
+def test_authentication_is_shared(api, agent, monkeypatch):
+    calls = []
+    original = CachedTokenAuthentication.authenticate
+
+    def authenticate(self, request):
+        calls.append(request.path)
+        return original(self, request)
+
+    monkeypatch.setattr(CachedTokenAuthentication, "authenticate", authenticate)
+    token = Token.objects.create(user=agent)
+    api.credentials(HTTP_AUTHORIZATION="Token " + token.key)
+    resp = _batch(api, [{"path": "/stats/contracts/"}, {"path": "/dashboard/?group=month"}])
+    assert [result["status"] for result in resp.data["results"]] == [200, 200]
+    assert calls == ["/batch/"]
+
+    api.credentials()
+    resp = _batch(api, [{"path": "/stats/contracts/"}])
+    assert resp.data["results"][0]["status"] == 403
+
+
+def _create(pk, **fields):
+    return {"method": "POST", "path": "/apartment/create/",
+            "body": dict({"ApartmentID": pk, "Number": pk, "Square": 40, "Cost": 100}, **fields)}
+
+
+def test_writes_are_ordered_before_later_reads(api, db):
+    resp = _batch(api, [_create(1), {"path": "/apartment/1/"}, _create(1)])
+    assert [result["status"] for result in resp.data["results"]] == [201, 200, 400]
+    assert resp.data["results"][1]["body"]["Cost"] == 100
+
+
+def test_atomic_batch_rolls_back(api, db):
+    resp = _batch(api, [_create(1), _create(2), _create(3, Cost="free")], atomic=True)
+    assert resp.status_code == 400
+    assert resp.data["committed"] is False
+    assert [result["status"] for result in resp.data["results"]] == [201, 201, 400]
+    assert not Apartment.objects.exists()
+
+    resp = _batch(api, [_create(1), _create(2)], atomic=True)
+    assert resp.status_code == 200 and resp.data["committed"]
+    assert Apartment.objects.count() == 2
+
+
+def test_invalid_batches(api, db, settings):
+    assert _batch(api, []).status_code == 400
+    assert _batch(api, [{"path": "apartments/"}]).status_code == 400
+    settings.BATCH_MAX_REQUESTS = 2
+    assert _batch(api, [{"path": "/apartments/"}] * 3).status_code == 400
+    resp = _batch(api, [{"path": "/nowhere/"}, {"method": "POST", "path": "/batch/", "body": {"requests": []}}])
+    assert [result["status"] for result in resp.data["results"]] == [404, 400]
+
+
+def test_reads_run_concurrently(api, transactional_db, monkeypatch):
+    barrier = threading.Barrier(2, timeout=5)
+    original = ApartmentDetailView.get
+
+    def get(self, request, *args, **kwargs):
+        barrier.wait()
+        return original(self, request, *args, **kwargs)
+
+    monkeypatch.setattr(ApartmentDetailView, "get", get)
+    Apartment.objects.create(ApartmentID=1, Number=1, Square=40, Cost=100)
+    resp = _batch(api, [{"path": "/apartment/1/"}, {"path": "/apartment/1/"}])
+    assert [result["status"] for result in resp.data["results"]] == [200, 200]
+
+
+def test_async_read_views(api, transactional_db, settings):
+    Apartment.objects.create(ApartmentID=101, Number=1, Square=40, Cost=3000)
+    settings.ROOT_URLCONF = __name__
+    resp = _batch(api, [{"path": "/apartment/101/"}, {"path": "/apartment/9/"}])
+    assert [result["status"] for result in resp.data["results"]] == [200, 404]
+    assert resp.data["results"][0]["body"]["Cost"] == 3000
+
+    # атомарный пакет читает свои же записи
+    resp = _batch(api, [_create(1), {"path": "/apartment/1/"}], atomic=True)
+    assert resp.status_code == 200
+    assert [result["status"] for result in resp.data["results"]] == [201, 200]
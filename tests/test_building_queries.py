@@ -0,0 +1,30 @@
+import pytest
+
+from center_app.models import Apartment, Building
+
+
+def _portfolio(buildings, apartments_per_building):
+    for b in range(1, buildings + 1):
+        building = Building.objects.create(BuildingID=b, City="SPB", Street="Nevsky", Number=str(b))
+        apartments = Apartment.objects.bulk_create(
+            Apartment(ApartmentID=b * 1000 + i, Number=i, Square=40, Cost=1000)
+            for i in range(apartments_per_building)
+        )
+        building.Apartments.add(*apartments)
+
+
+@pytest.mark.parametrize("buildings,apartments", [(1, 1), (5, 3), (20, 10)])
+def test_building_list_query_count_is_constant(api, db, django_assert_num_queries, buildings, apartments):
+    _portfolio(buildings, apartments)
+    # агрегат для ETag, страница зданий и одна выборка квартир для всей страницы
+    with django_assert_num_queries(3):
+        resp = api.get("/buildings/")
+    assert len(resp.data["results"]) == buildings
+    assert all(len(b["Apartments"]) == apartments for b in resp.data["results"])
+
+
+def test_building_detail_fetches_apartments_in_one_query(api, db, django_assert_num_queries):
+    _portfolio(1, 15)
+    with django_assert_num_queries(3):
+        resp = api.get("/building/1/")
+    assert len(resp.data["Apartments"]) == 15
@@ -0,0 +1,108 @@
+import datetime
+import json
+
+from center_app.models import Apartment, Building, Contract
+
+
+def _apartment(pk, **extra):
+    return dict({"ApartmentID": pk, "Number": pk, "Square": 40, "Cost": 1000}, **extra)
+
+
+def test_bulk_create_apartments(api, db, django_assert_max_num_queries):
+    items = [_apartment(i) for i in range(1, 201)]
+    # 3 из них - запись пакета в журнал изменений в той же транзакции
+    with django_assert_max_num_queries(13):
+        resp = api.post("/apartments/bulk/", items, format="json")
+    assert resp.status_code == 201
+    assert resp.data["count"] == 200
+    assert Apartment.objects.count() == 200
+
+
+def test_bulk_create_reports_per_item_errors(api, apartment):
+    items = [_apartment(1), _apartment(apartment.pk), _apartment(2, Cost="x"), _apartment(1)]
+    resp = api.post("/apartments/bulk/", items, format="json")
+    assert resp.status_code == 400
+    assert resp.data[0] == {}
+    assert "ApartmentID" in resp.data[1]
+    assert "Cost" in resp.data[2]
+    assert "ApartmentID" in resp.data[3]
+    # пакет пишется целиком или не пишется вовсе
+    assert Apartment.objects.count() == 1
+
+
+def test_bulk_create_accepts_ndjson(api, db):
+    body = "\n".join(json.dumps(_apartment(i)) for i in range(1, 4))
+    resp = api.post("/apartments/bulk/", body, content_type="application/x-ndjson")
+    assert resp.status_code == 201
+    assert sorted(resp.data["ids"]) == [1, 2, 3]
+
+
+def test_bulk_contracts_resolve_relations_in_batch(api, agent, client_user, apartment,
+                                                   django_assert_max_num_queries):
+    start = datetime.date(2024, 1, 1)
+    items = [
+        {"ContractID": i, "AgentID": agent.pk, "ClientID": client_user.pk, "ApartmentID": apartment.pk,
+         "startDate": str(start + datetime.timedelta(days=i)),
+         "endDate": str(start + datetime.timedelta(days=i + 1))}
+        for i in range(1, 101)
+    ]
+    items.append({"ContractID": 500, "AgentID": 999, "ClientID": client_user.pk, "ApartmentID": apartment.pk})
+    resp = api.post("/contracts/bulk/", items, format="json")
+    assert resp.status_code == 400
+    assert "AgentID" in resp.data[-1]
+
+    # сводки по месяцам и журнал изменений добавляют постоянное число запросов на пакет
+    with django_assert_max_num_queries(23):
+        resp = api.post("/contracts/bulk/", items[:-1], format="json")
+    assert resp.status_code == 201
+    assert Contract.objects.count() == 100
+
+
+def test_bulk_update_and_m2m(api, building, apartment):
+    api.post("/apartments/bulk/", [_apartment(2), _apartment(3)], format="json")
+    resp = api.patch("/apartments/bulk/", [{"ApartmentID": 2, "Cost": 7}, {"ApartmentID": 3, "Cost": 8}],
+                     format="json")
+    assert resp.status_code == 200
+    assert list(Apartment.objects.filter(pk__in=[2, 3]).order_by("pk").values_list("Cost", flat=True)) == [7, 8]
+
+    resp = api.patch("/buildings/bulk/", [{"BuildingID": 1, "Apartments": [2, 3]}], format="json")
+    assert resp.status_code == 200
+    assert sorted(Building.objects.get(pk=1).Apartments.values_list("pk", flat=True)) == [2, 3]
+
+    resp = api.patch("/apartments/bulk/", [{"ApartmentID": 42, "Cost": 1}], format="json")
+    assert resp.status_code == 400
+
+
+def test_bulk_update_invalidates_cached_reads(api, building, apartment):
+    before = api.get("/building/1/")
+    api.patch("/apartments/bulk/", [{"ApartmentID": apartment.pk, "Cost": 1}], format="json")
+    after = api.get("/building/1/", HTTP_IF_NONE_MATCH=before["ETag"])
+    assert after.status_code == 200
+    assert after.data["Apartments"][0]["Cost"] == 1
+
+
+def test_bulk_delete(api, db):
+    api.post("/apartments/bulk/", [_apartment(i) for i in range(1, 6)], format="json")
+    assert api.delete("/apartments/bulk/", [1, 99], format="json").status_code == 400
+    resp = api.delete("/apartments/bulk/", [1, 2, 3], format="json")
+    assert resp.status_code == 200
+    assert list(Apartment.objects.values_list("pk", flat=True).order_by("pk")) == [4, 5]
+
+
+def test_bulk_contracts_reject_double_booking(api, agent, client_user, apartment):
+    def contract(pk, start, end):
+        return {"ContractID": pk, "AgentID": agent.pk, "ClientID": client_user.pk,
+                "ApartmentID": apartment.pk, "Status": "l", "startDate": start, "endDate": end}
+    Contract.objects.create(ContractID=1, AgentID=agent, ClientID=client_user, ApartmentID=apartment,
+                            Status="l", startDate=datetime.date(2024, 1, 1), endDate=datetime.date(2024, 1, 10))
+    items = [
+        contract(2, "2024-01-10", "2024-01-15"),
+        contract(3, "2024-01-05", "2024-01-12"),   # пересекается с договором 1 из базы
+        contract(4, "2024-01-14", "2024-01-20"),   # пересекается с договором 2 из пакета
+    ]
+    resp = api.post("/contracts/bulk/", items, format="json")
+    assert resp.status_code == 400
+    assert resp.data[0] == {}
+    assert "1" in str(resp.data[1]["ApartmentID"])
+    assert "2" in str(resp.data[2]["ApartmentID"])
+    assert not Contract.objects.filter(pk__in=[2, 3, 4]).exists()
@@ -0,0 +1,111 @@
+import datetime
+import io
+
+import pytest
+from django.core.management import call_command
+from django.db import DatabaseError, transaction
+from django.utils import timezone
+
+from center_app import changes
+from center_app.changes import compact
+from center_app.models import Apartment, ChangeEvent, Contract
+
+
+@pytest.fixture
+def feed(api, transactional_db):
+    # как у клиента: каждый запрос фиксируется отдельно
+    return api
+
+
+def _changes(api, since=0, **params):
+    resp = api.get("/changes/", dict(params, since=since))
+    assert resp.status_code == 200
+    return resp.data
+
+
+def _summary(data):
+    return [(change["type"], change["id"], change["action"]) for change in data["changes"]]
+
+
+def test_feed_keeps_last_change_per_object(feed, agent, client_user, building, apartment):
+    assert _summary(_changes(feed)) == [
+        ("user", agent.pk, "create"), ("user", client_user.pk, "create"), ("apartment", 101, "create"),
+        ("building", 1, "update"),
+    ]
+    since = _changes(feed)["next"]
+    assert feed.patch("/apartment/update/101/", {"Cost": 3500}, format="json").status_code == 200
+    assert feed.post("/apartment/create/", {"ApartmentID": 102, "Number": 13, "Square": 30, "Cost": 2000},
+                     format="json").status_code == 201
+    data = _changes(feed, since)
+    assert _summary(data) == [("apartment", 101, "update"), ("apartment", 102, "create")]
+    assert data["changes"][0]["data"]["Cost"] == 3500 and not data["more"]
+    assert ChangeEvent.objects.filter(kind="apartment", object_id=101).count() == 1
+
+
+def test_delete_views_leave_tombstones(feed, agent, client_user, building, apartment):
+    Contract.objects.create(ContractID=1, AgentID=agent, ClientID=client_user, ApartmentID=apartment)
+    since = _changes(feed)["next"]
+    assert feed.delete("/apartment/delete/101/").status_code == 204
+    data = _changes(feed, since)
+    # договор удалён каскадом, здание потеряло квартиру
+    assert sorted(_summary(data)) == [("apartment", 101, "delete"), ("building", 1, "update"),
+                                      ("contract", 1, "delete")]
+    building_change = next(change for change in data["changes"] if change["type"] == "building")
+    assert building_change["data"]["Apartments"] == []
+    assert "data" not in data["changes"][-1]
+
+
+def test_bulk_changes_and_paging(feed):
+    items = [{"ApartmentID": i, "Number": i, "Square": 40, "Cost": 100} for i in range(1, 6)]
+    assert feed.post("/apartments/bulk/", items, format="json").status_code == 201
+    first = _changes(feed, page_size=3)
+    assert [change["id"] for change in first["changes"]] == [1, 2, 3] and first["more"]
+    second = _changes(feed, first["next"], page_size=3)
+    assert [change["id"] for change in second["changes"]] == [4, 5] and not second["more"]
+    assert _changes(feed, second["next"]) == {"next": second["next"], "more": False, "changes": []}
+
+
+def test_compaction_expires_tombstones(feed):
+    for pk in (1, 2, 3):
+        Apartment.objects.create(ApartmentID=pk, Number=pk, Square=40, Cost=100)
+    Apartment.objects.filter(pk__in=[1, 2]).delete()
+    since = ChangeEvent.objects.get(kind="apartment", object_id=3).seq
+    last_tombstone = ChangeEvent.objects.filter(action="d").latest("seq").seq
+    assert compact(timezone.now() - datetime.timedelta(days=1)) == 0
+    assert compact(timezone.now() + datetime.timedelta(seconds=1)) == 2
+    assert list(ChangeEvent.objects.values_list("object_id", "action")) == [(3, "c")]
+
+    resp = feed.get("/changes/", {"since": since})
+    assert resp.status_code == 410
+    assert resp.data["horizon"] == last_tombstone
+    assert _summary(_changes(feed)) == [("apartment", 3, "create")]
+
+    Apartment.objects.filter(pk=3).delete()
+    out = io.StringIO()
+    call_command("compact_changes", "--days", "0", stdout=out)
+    assert "Удалено меток: 1" in out.getvalue()
+    assert not ChangeEvent.objects.exists()
+
+
+def test_invalid_since(api, db):
+    assert api.get("/changes/", {"since": "-1"}).status_code == 400
+    assert api.get("/changes/").status_code == 200
+
+
+def test_events_share_the_write_transaction(db):
+    with pytest.raises(RuntimeError):
+        with transaction.atomic():
+            Apartment.objects.create(ApartmentID=1, Number=1, Square=40, Cost=100)
+            assert ChangeEvent.objects.filter(kind="apartment", object_id=1).exists()
+            raise RuntimeError
+    assert not ChangeEvent.objects.exists()
+
+
+def test_failed_log_write_rolls_back_the_change(api, db, monkeypatch):
+    def fail(kind, pks, action):
+        raise DatabaseError("журнал недоступен")
+
+    monkeypatch.setattr(changes, "write", fail)
+    with pytest.raises(DatabaseError):
+        api.post("/apartment/create/", {"ApartmentID": 1, "Number": 1, "Square": 40, "Cost": 100}, format="json")
+    assert not Apartment.objects.exists()
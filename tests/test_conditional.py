@@ -0,0 +1,73 @@
+import datetime
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils.http import http_date
+
+from center_app.models import Apartment, Contract
+
+
+def test_detail_answers_304_without_serializing(api, apartment, django_assert_num_queries):
+    resp = api.get("/apartment/101/")
+    etag = resp["ETag"]
+    assert resp["Last-Modified"]
+    with django_assert_num_queries(1):
+        again = api.get("/apartment/101/", HTTP_IF_NONE_MATCH=etag)
+    assert again.status_code == 304
+
+
+def test_etag_changes_after_update(api, apartment):
+    etag = api.get("/apartment/101/")["ETag"]
+    api.patch("/apartment/update/101/", {"Cost": 100}, format="json")
+    resp = api.get("/apartment/101/", HTTP_IF_NONE_MATCH=etag)
+    assert resp.status_code == 200
+    assert resp["ETag"] != etag
+
+
+def test_if_modified_since(api, apartment):
+    future = http_date((apartment.modifiedDate + datetime.timedelta(minutes=1)).timestamp())
+    assert api.get("/apartment/101/", HTTP_IF_MODIFIED_SINCE=future).status_code == 304
+    past = http_date((apartment.modifiedDate - datetime.timedelta(minutes=1)).timestamp())
+    assert api.get("/apartment/101/", HTTP_IF_MODIFIED_SINCE=past).status_code == 200
+
+
+def test_list_etag_tracks_count_and_query(api, apartment):
+    other = Apartment.objects.create(ApartmentID=102, Number=1, Square=1, Cost=1)
+    etag = api.get("/apartments/")["ETag"]
+    assert api.get("/apartments/", HTTP_IF_NONE_MATCH=etag).status_code == 304
+    assert api.get("/apartments/?page_size=1", HTTP_IF_NONE_MATCH=etag).status_code == 200
+    other.delete()
+    assert api.get("/apartments/", HTTP_IF_NONE_MATCH=etag).status_code == 200
+
+
+def test_nested_apartment_change_invalidates_building(api, building, apartment):
+    etags = [api.get(url)["ETag"] for url in ("/building/1/", "/buildings/")]
+    apartment.Cost = 1
+    apartment.save()
+    for url, etag in zip(("/building/1/", "/buildings/"), etags):
+        assert api.get(url, HTTP_IF_NONE_MATCH=etag).status_code == 200
+
+
+def test_expanded_contract_tracks_related_changes(api, agent, client_user, apartment):
+    Contract.objects.create(ContractID=1, AgentID=agent, ClientID=client_user, ApartmentID=apartment)
+    url = "/contract/1/?expand=agent"
+    etag = api.get(url)["ETag"]
+    assert api.get(url, HTTP_IF_NONE_MATCH=etag).status_code == 304
+    agent.first_name = "Changed"
+    agent.save()
+    assert api.get(url, HTTP_IF_NONE_MATCH=etag).status_code == 200
+
+
+def test_missing_object_still_404(api, db):
+    assert api.get("/apartment/999/").status_code == 404
+
+
+def test_list_validators_come_from_change_log(api, apartment):
+    etag = api.get("/apartments/")["ETag"]
+    with CaptureQueriesContext(connection) as queries:
+        assert api.get("/apartments/", HTTP_IF_NONE_MATCH=etag).status_code == 304
+    # один запрос по журналу изменений, выборка квартир не просматривается
+    assert len(queries) == 1 and "center_app_apartment" not in queries[0]["sql"]
+    apartment.Cost = 1
+    apartment.save()
+    assert api.get("/apartments/", HTTP_IF_NONE_MATCH=etag).status_code == 200
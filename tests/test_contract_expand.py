@@ -0,0 +1,43 @@
+import pytest
+
+from center_app.models import Apartment, Contract, User
+
+
+def _contracts(n):
+    agent = User.objects.create_user(username="agent_x", password="pwd", is_staff=True)
+    apartments = Apartment.objects.bulk_create(
+        Apartment(ApartmentID=i, Number=i, Square=40, Cost=1000) for i in range(1, n + 1)
+    )
+    for i, apartment in enumerate(apartments, start=1):
+        client = User.objects.create_user(username="client_%d" % i, password="pwd")
+        Contract.objects.create(ContractID=i, AgentID=agent, ClientID=client, ApartmentID=apartment)
+
+
+def test_contract_keys_are_not_expanded_by_default(api, db):
+    _contracts(1)
+    resp = api.get("/contract/1/")
+    assert isinstance(resp.data["AgentID"], int)
+    assert isinstance(resp.data["ApartmentID"], int)
+
+
+def test_expand_inlines_related_objects(api, db):
+    _contracts(1)
+    resp = api.get("/contract/1/?expand=agent,client,apartment")
+    assert resp.status_code == 200
+    assert resp.data["AgentID"]["username"] == "agent_x"
+    assert resp.data["ClientID"]["username"] == "client_1"
+    assert resp.data["ApartmentID"]["ApartmentID"] == 1
+
+
+@pytest.mark.parametrize("n", [2, 25])
+def test_expanded_list_query_count_is_constant(api, db, django_assert_num_queries, n):
+    _contracts(n)
+    # агрегат для ETag, страница с join'ами, группы и права агента и клиента
+    with django_assert_num_queries(6):
+        resp = api.get("/contracts/?expand=agent,client,apartment")
+    assert len(resp.data["results"]) == n
+
+
+def test_unknown_expand_is_rejected(api, db):
+    resp = api.get("/contracts/?expand=building")
+    assert resp.status_code == 400
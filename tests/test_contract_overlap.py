@@ -0,0 +1,45 @@
+import datetime
+
+import pytest
+
+from center_app.models import Contract
+
+
+@pytest.fixture
+def contract_data(agent, client_user, apartment):
+    def make(pk, start, end, status="l"):
+        return {"ContractID": pk, "AgentID": agent.pk, "ClientID": client_user.pk,
+                "ApartmentID": apartment.pk, "Status": status,
+                "startDate": start, "endDate": end}
+    return make
+
+
+def test_end_before_start_is_rejected(api, contract_data):
+    resp = api.post("/contract/create/", contract_data(1, "2024-01-10", "2024-01-01"), format="json")
+    assert resp.status_code == 400
+    assert "endDate" in resp.data
+
+
+def test_overlapping_booking_is_rejected(api, contract_data):
+    assert api.post("/contract/create/", contract_data(1, "2024-01-01", "2024-01-10"), format="json").status_code == 201
+    resp = api.post("/contract/create/", contract_data(2, "2024-01-09", "2024-01-12"), format="json")
+    assert resp.status_code == 400
+    assert "ApartmentID" in resp.data
+    assert not Contract.objects.filter(pk=2).exists()
+
+
+def test_adjacent_and_finished_bookings_are_allowed(api, contract_data):
+    assert api.post("/contract/create/", contract_data(1, "2024-01-01", "2024-01-10"), format="json").status_code == 201
+    assert api.post("/contract/create/", contract_data(2, "2024-01-10", "2024-01-12"), format="json").status_code == 201
+    assert api.post("/contract/create/", contract_data(3, "2024-01-02", "2024-01-03", status="f"),
+                    format="json").status_code == 201
+
+
+def test_update_checks_other_contracts_only(api, contract_data):
+    api.post("/contract/create/", contract_data(1, "2024-01-01", "2024-01-10"), format="json")
+    api.post("/contract/create/", contract_data(2, "2024-01-10", "2024-01-20"), format="json")
+    # сдвиг внутри собственного интервала не конфликтует сам с собой
+    assert api.patch("/contract/update/1/", {"startDate": "2024-01-02"}, format="json").status_code == 200
+    resp = api.patch("/contract/update/1/", {"endDate": "2024-01-11"}, format="json")
+    assert resp.status_code == 400
+    assert Contract.objects.get(pk=1).endDate == datetime.date(2024, 1, 10)
@@ -0,0 +1,38 @@
+import pytest
+from django.db import connection
+
+from center_app.db import apply_sqlite_pragmas
+
+
+def _pragma(name):
+    with connection.cursor() as cursor:
+        cursor.execute("PRAGMA %s" % name)
+        return cursor.fetchone()[0]
+
+
+def test_pragmas_applied_to_connection(db, settings):
+    settings.SQLITE_PRAGMAS = {"busy_timeout": 1234, "temp_store": "MEMORY", "cache_size": -2000}
+    apply_sqlite_pragmas(sender=None, connection=connection)
+    assert _pragma("busy_timeout") == 1234
+    assert _pragma("temp_store") == 2
+    assert _pragma("cache_size") == -2000
+
+
+def test_wal_on_file_database(db, tmp_path):
+    from django.db.backends.sqlite3.base import DatabaseWrapper
+    wrapper = DatabaseWrapper({**connection.settings_dict, "NAME": str(tmp_path / "wal.sqlite3")})
+    try:
+        wrapper.ensure_connection()
+        with wrapper.cursor() as cursor:
+            cursor.execute("PRAGMA journal_mode")
+            assert cursor.fetchone()[0] == "wal"
+            cursor.execute("PRAGMA synchronous")
+            assert cursor.fetchone()[0] == 1
+    finally:
+        wrapper.close()
+
+
+def test_rejects_unsafe_pragmas(db, settings):
+    settings.SQLITE_PRAGMAS = {"journal_mode": "WAL; DROP TABLE x"}
+    with pytest.raises(ValueError):
+        apply_sqlite_pragmas(sender=None, connection=connection)
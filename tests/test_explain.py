@@ -0,0 +1,42 @@
+from io import StringIO
+
+import pytest
+from django.core.management import CommandError, call_command
+
+from center_app.models import Apartment, Contract, User
+
+
+@pytest.fixture
+def rows(db):
+    Apartment.objects.create(ApartmentID=1, Number=1, Square=40, Cost=1000)
+    User.objects.create(username="agent", is_staff=True)
+
+
+def test_hot_filters_use_indexes(rows):
+    out = StringIO()
+    call_command("explain_queries", "--max-rows", "0", stdout=out)
+    plans = out.getvalue()
+    assert "FAIL" not in plans
+    assert "user_agent_idx" in plans
+    assert "user_client_idx" in plans
+
+
+@pytest.mark.parametrize("queryset, index", [
+    (lambda: Contract.objects.filter(Status="l").order_by("ContractID")[:10], "contract_status_idx"),
+    (lambda: Contract.objects.filter(ClientID=1, Status="l"), "contract_client_status_idx"),
+    (lambda: Contract.objects.filter(AgentID=1, startDate__gte="2024-01-01"), "contract_agent_start_idx"),
+])
+def test_contract_filters_use_indexes(db, queryset, index):
+    assert index in queryset().explain()
+
+
+def test_full_scan_fails(rows):
+    out = StringIO()
+    with pytest.raises(CommandError, match="apartments/available/"):
+        call_command("explain_queries", "--max-rows", "0", "--allow", "none", stdout=out)
+
+
+def test_list_validators_are_checked(rows):
+    out = StringIO()
+    call_command("explain_queries", "--max-rows", "0", stdout=out)
+    assert "change_kind_seq_idx" in out.getvalue()
@@ -0,0 +1,46 @@
+import csv
+import datetime
+import io
+import json
+
+from django.utils import timezone
+
+from center_app.models import Apartment, Contract
+
+
+def _body(resp):
+    return b"".join(resp.streaming_content).decode()
+
+
+def test_csv_export_streams_all_rows(api, db):
+    Apartment.objects.bulk_create(Apartment(ApartmentID=i, Number=i, Square=40, Cost=i * 10) for i in range(1, 6))
+    resp = api.get("/apartments/export.csv")
+    assert resp.status_code == 200
+    assert resp.streaming
+    rows = list(csv.DictReader(io.StringIO(_body(resp))))
+    assert [int(r["ApartmentID"]) for r in rows] == [1, 2, 3, 4, 5]
+    assert rows[2]["Cost"] == "30"
+
+
+def test_ndjson_contract_export(api, agent, client_user, apartment):
+    Contract.objects.create(ContractID=1, AgentID=agent, ClientID=client_user, ApartmentID=apartment,
+                            startDate=datetime.date(2024, 1, 1), endDate=datetime.date(2024, 1, 5))
+    resp = api.get("/contracts/export.ndjson")
+    lines = [json.loads(line) for line in _body(resp).splitlines()]
+    assert lines[0]["ContractID"] == 1
+    assert lines[0]["AgentID"] == agent.pk
+    assert lines[0]["startDate"] == "2024-01-01"
+
+
+def test_since_filters_by_modification(api, db):
+    old = Apartment.objects.create(ApartmentID=1, Number=1, Square=1, Cost=1)
+    Apartment.objects.filter(pk=old.pk).update(modifiedDate=timezone.now() - datetime.timedelta(days=3))
+    Apartment.objects.create(ApartmentID=2, Number=2, Square=2, Cost=2)
+    since = (timezone.now() - datetime.timedelta(days=1)).date().isoformat()
+    lines = _body(api.get("/apartments/export.ndjson?since=" + since)).splitlines()
+    assert [json.loads(line)["ApartmentID"] for line in lines] == [2]
+
+
+def test_bad_format_and_since(api, db):
+    assert api.get("/apartments/export.xml").status_code == 404
+    assert api.get("/apartments/export.csv?since=yesterday").status_code == 400
@@ -0,0 +1,124 @@
+import datetime
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from center_app.models import Apartment, Building, Contract
+
+
+def _apartments():
+    Apartment.objects.bulk_create(
+        Apartment(ApartmentID=i, Number=i, Square=30 + i * 10, Cost=1000 * i) for i in range(1, 7)
+    )
+
+
+def _ids(resp, key="ApartmentID"):
+    assert resp.status_code == 200, resp.data
+    return [item[key] for item in resp.data["results"]]
+
+
+def _select(ctx, table):
+    return [q["sql"] for q in ctx.captured_queries
+            if q["sql"].startswith("SELECT") and 'FROM "%s"' % table in q["sql"] and "COUNT" not in q["sql"]]
+
+
+def test_range_filters(api, db):
+    _apartments()
+    assert _ids(api.get("/apartments/?Cost__lte=4000&Square__gt=50")) == [3, 4]
+    assert _ids(api.get("/apartments/?Number=5")) == [5]
+
+
+def test_invalid_filter_value(api, db):
+    resp = api.get("/apartments/?Cost__lte=cheap")
+    assert resp.status_code == 400
+    assert "Cost__lte" in resp.data
+
+
+def test_unlisted_lookup_is_ignored(api, db):
+    _apartments()
+    assert len(_ids(api.get("/apartments/?Description__icontains=x&Cost__in=1000"))) == 6
+
+
+def test_building_city_filter(api, building):
+    Building.objects.create(BuildingID=2, City="MSK", Street="Tverskaya", Number="2")
+    assert _ids(api.get("/buildings/?City=MSK"), "BuildingID") == [2]
+
+
+def test_contract_status_and_dates(api, agent, client_user, apartment):
+    day = datetime.date(2024, 1, 1)
+    for pk, status, start in [(1, "v", 0), (2, "l", 10), (3, "f", 20)]:
+        Contract.objects.create(ContractID=pk, AgentID=agent, ClientID=client_user, ApartmentID=apartment,
+                                Status=status, startDate=day + datetime.timedelta(days=start))
+    assert _ids(api.get("/contracts/?Status__in=v,l"), "ContractID") == [1, 2]
+    assert _ids(api.get("/contracts/?startDate__gte=2024-01-05&Status=f"), "ContractID") == [3]
+    assert _ids(api.get("/contracts/?ClientID=%d&endDate__isnull=true" % client_user.pk), "ContractID") == [1, 2, 3]
+
+
+def test_user_list_filters(api, agent, client_user):
+    assert _ids(api.get("/users/?last_name=L"), "UserID") == [client_user.pk]
+    assert _ids(api.get("/agents/?last_name=L"), "UserID") == []
+
+
+def test_ordering_is_whitelisted_and_pages_stay_stable(api, db):
+    Apartment.objects.bulk_create(
+        Apartment(ApartmentID=i, Number=i, Square=40, Cost=1000 * (i % 3)) for i in range(1, 10)
+    )
+    ids, url = [], "/apartments/?ordering=-Cost&page_size=2"
+    while url:
+        resp = api.get(url)
+        ids.extend(_ids(resp))
+        url = resp.data["next"]
+    assert ids == [2, 5, 8, 1, 4, 7, 3, 6, 9]
+    assert _ids(api.get("/apartments/?ordering=Description")) == list(range(1, 10))
+
+
+def test_sparse_fields_narrow_payload_and_sql(api, db):
+    _apartments()
+    with CaptureQueriesContext(connection) as ctx:
+        resp = api.get("/apartments/?fields=Number,Cost")
+    assert resp.status_code == 200
+    assert set(resp.data["results"][0]) == {"Number", "Cost"}
+    [sql] = _select(ctx, "center_app_apartment")
+    assert '"Description"' not in sql and '"Photo"' not in sql
+
+
+def test_sparse_fields_skip_unused_prefetch(api, building):
+    with CaptureQueriesContext(connection) as ctx:
+        resp = api.get("/buildings/?fields=City")
+    assert resp.data["results"] == [{"City": "SPB"}]
+    assert not _select(ctx, "center_app_building_Apartments")
+
+
+def test_sparse_fields_with_expand(api, agent, client_user, apartment):
+    Contract.objects.create(ContractID=1, AgentID=agent, ClientID=client_user, ApartmentID=apartment)
+    with CaptureQueriesContext(connection) as ctx:
+        resp = api.get("/contracts/?fields=Status,AgentID&expand=agent")
+    assert resp.status_code == 200
+    row = resp.data["results"][0]
+    assert set(row) == {"Status", "AgentID"} and row["AgentID"]["username"] == "agent"
+    assert len(_select(ctx, "center_app_contract")) == 1
+
+
+def test_unknown_sparse_field(api, db):
+    resp = api.get("/apartments/?fields=Number,Nope")
+    assert resp.status_code == 400
+    assert "fields" in resp.data
+
+
+def test_ordering_by_nullable_dates_keeps_null_rows(api, agent, client_user, apartment):
+    for pk in range(1, 7):
+        start = datetime.date(2024, 1, pk) if pk % 2 else None
+        Contract.objects.create(ContractID=pk, AgentID=agent, ClientID=client_user, ApartmentID=apartment,
+                                Status="f", startDate=start)
+
+    def walk(url):
+        ids = []
+        while url:
+            resp = api.get(url)
+            ids += _ids(resp, "ContractID")
+            url = resp.data["next"]
+        return ids
+
+    assert walk("/contracts/?ordering=-startDate&page_size=2") == [5, 3, 1, 2, 4, 6]
+    assert walk("/contracts/?ordering=startDate&page_size=2") == [2, 4, 6, 1, 3, 5]
+    assert walk("/contracts/?ordering=-endDate&page_size=4") == [1, 2, 3, 4, 5, 6]
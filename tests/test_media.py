@@ -0,0 +1,76 @@
+import pytest
+
+
+@pytest.fixture
+def media(settings, tmp_path):
+    settings.MEDIA_ROOT = str(tmp_path)
+    (tmp_path / "photo.jpg").write_bytes(bytes(range(256)) * 4)
+    return tmp_path
+
+
+def _body(resp):
+    return b"".join(resp.streaming_content)
+
+
+def test_full_file_with_validators(client, media):
+    resp = client.get("/media/photo.jpg")
+    assert resp.status_code == 200
+    assert _body(resp) == bytes(range(256)) * 4
+    assert resp["Accept-Ranges"] == "bytes"
+    assert resp["Content-Type"] == "image/jpeg"
+    assert resp["ETag"] and resp["Last-Modified"]
+    assert client.get("/media/photo.jpg", HTTP_IF_NONE_MATCH=resp["ETag"]).status_code == 304
+
+
+@pytest.mark.parametrize("header,start,end", [
+    ("bytes=0-9", 0, 9),
+    ("bytes=1000-", 1000, 1023),
+    ("bytes=-24", 1000, 1023),
+    ("bytes=1020-5000", 1020, 1023),
+])
+def test_range_requests(client, media, header, start, end):
+    resp = client.get("/media/photo.jpg", HTTP_RANGE=header)
+    assert resp.status_code == 206
+    assert resp["Content-Range"] == "bytes %d-%d/1024" % (start, end)
+    assert _body(resp) == (bytes(range(256)) * 4)[start:end + 1]
+
+
+def test_unsatisfiable_range_and_stale_if_range(client, media):
+    resp = client.get("/media/photo.jpg", HTTP_RANGE="bytes=2000-")
+    assert resp.status_code == 416
+    assert resp["Content-Range"] == "bytes */1024"
+    resp = client.get("/media/photo.jpg", HTTP_RANGE="bytes=0-9", HTTP_IF_RANGE='"stale"')
+    assert resp.status_code == 200
+
+
+def test_content_addressed_names_are_immutable(client, media):
+    digest = "ab" * 32
+    (media / "ab" / "ab").mkdir(parents=True)
+    (media / "ab" / "ab" / ("%s.jpg" % digest)).write_bytes(b"x")
+    resp = client.get("/media/ab/ab/%s.jpg" % digest)
+    assert "immutable" in resp["Cache-Control"]
+    assert resp["ETag"] == '"%s"' % digest
+    assert "immutable" not in client.get("/media/photo.jpg")["Cache-Control"]
+
+    # копии названы по хэшу исходника, но перестраиваются
+    (media / "variants" / "ab" / "ab").mkdir(parents=True)
+    (media / "variants" / "ab" / "ab" / ("%s.thumb.jpg" % digest)).write_bytes(b"y")
+    resp = client.get("/media/variants/ab/ab/%s.thumb.jpg" % digest)
+    assert resp.status_code == 200
+    assert "immutable" not in resp["Cache-Control"] and digest not in resp["ETag"]
+
+
+def test_accel_redirect_offload(client, media, settings):
+    settings.MEDIA_ACCEL_REDIRECT = "/protected-media/"
+    resp = client.get("/media/photo.jpg")
+    assert resp["X-Accel-Redirect"] == "/protected-media/photo.jpg"
+    assert resp.content == b""
+
+
+def test_missing_and_traversal(client, media):
+    assert client.get("/media/missing.jpg").status_code == 404
+    assert client.get("/media/../settings.py").status_code == 404
+    (media / ".incoming").mkdir()
+    (media / ".incoming" / "tmp123").write_bytes(b"partial")
+    assert client.get("/media/.incoming/tmp123").status_code == 404
+    assert client.post("/media/photo.jpg").status_code == 405
@@ -0,0 +1,109 @@
+import base64
+import datetime
+import urllib.parse
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from center_app.models import Apartment, Contract
+from center_app.pagination import KeysetPagination
+
+
+def _apartments(n):
+    Apartment.objects.bulk_create(
+        Apartment(ApartmentID=i, Number=i, Square=40, Cost=1000) for i in range(1, n + 1)
+    )
+
+
+def _collect(api, url):
+    ids = []
+    while url:
+        resp = api.get(url)
+        assert resp.status_code == 200
+        ids.extend(item["ApartmentID"] for item in resp.data["results"])
+        url = resp.data["next"]
+    return ids
+
+
+def test_apartment_list_is_paginated(api, db):
+    _apartments(5)
+    resp = api.get("/apartments/?page_size=2")
+    assert [a["ApartmentID"] for a in resp.data["results"]] == [1, 2]
+    assert resp.data["next"] is not None
+    assert resp.data["previous"] is None
+
+
+def test_cursor_walks_whole_table_in_pk_order(api, db):
+    _apartments(7)
+    assert _collect(api, "/apartments/?page_size=3") == list(range(1, 8))
+
+
+def test_page_size_is_capped(api, db):
+    _apartments(3)
+    KeysetPagination.max_page_size, old = 2, KeysetPagination.max_page_size
+    try:
+        resp = api.get("/apartments/?page_size=50")
+    finally:
+        KeysetPagination.max_page_size = old
+    assert len(resp.data["results"]) == 2
+
+
+def test_deep_page_filters_by_key(api, db):
+    _apartments(10)
+    first = api.get("/apartments/?page_size=8")
+    cursor_url = first.data["next"]
+    with CaptureQueriesContext(connection) as ctx:
+        resp = api.get(cursor_url)
+    assert [a["ApartmentID"] for a in resp.data["results"]] == [9, 10]
+    sql = ctx.captured_queries[-1]["sql"]
+    # следующая страница ищется по ключу, а не смещением
+    assert '"ApartmentID" >' in sql
+    assert "OFFSET" not in sql.upper()
+
+
+def test_contract_and_user_lists_use_cursor(api, agent, client_user, apartment):
+    Contract.objects.create(ContractID=1, AgentID=agent, ClientID=client_user, ApartmentID=apartment)
+    for url in ("/contracts/", "/users/", "/agents/", "/clients/", "/buildings/"):
+        resp = api.get(url)
+        assert resp.status_code == 200
+        assert set(resp.data) == {"next", "previous", "results"}
+
+
+def _walk(api, url, key, link="next"):
+    ids = []
+    while url:
+        resp = api.get(url)
+        assert resp.status_code == 200
+        ids.extend(item[key] for item in resp.data["results"])
+        url = resp.data[link]
+    return ids
+
+
+def test_cursor_pages_through_tied_values(api, agent, client_user, apartment):
+    # больше offset_cutoff CursorPagination строк с одним значением сортировки
+    Contract.objects.bulk_create(
+        Contract(ContractID=i, AgentID=agent, ClientID=client_user, ApartmentID=apartment, Status="l",
+                 startDate=datetime.date(2024, 1, 1) if i % 2 else None)
+        for i in range(1, 1401)
+    )
+    ids = _walk(api, "/contracts/?ordering=Status&page_size=200", "ContractID")
+    assert ids == list(range(1, 1401))
+
+    ids = _walk(api, "/contracts/?ordering=-startDate&page_size=300", "ContractID")
+    assert ids == list(range(1, 1401, 2)) + list(range(2, 1401, 2))
+
+    last = api.get("/contracts/?ordering=-startDate&page_size=300")
+    while last.data["next"]:
+        last = api.get(last.data["next"])
+    back = _walk(api, last.data["previous"], "ContractID", "previous")
+    assert len(back) == len(set(back)) == 1400 - len(last.data["results"])
+    assert not set(back) & {item["ContractID"] for item in last.data["results"]}
+
+
+def test_tampered_cursor_is_rejected(api, db):
+    _apartments(3)
+    resp = api.get("/apartments/?page_size=1&ordering=Cost")
+    cursor = resp.data["next"].split("cursor=")[1].split("&")[0]
+    payload = base64.b64decode(urllib.parse.unquote(cursor)).decode()
+    bad = base64.b64encode(payload.replace("1000", "abc").encode()).decode()
+    assert api.get("/apartments/?page_size=1&ordering=Cost&cursor=" + urllib.parse.quote(bad)).status_code == 404
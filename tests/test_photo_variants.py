@@ -0,0 +1,75 @@
+import io
+import threading
+
+import pytest
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from PIL import Image
+
+from center_app import images
+from center_app.models import Apartment
+
+
+@pytest.fixture
+def media(settings, tmp_path):
+    settings.MEDIA_ROOT = str(tmp_path)
+    return tmp_path
+
+
+def _png(size=(2000, 1500)):
+    buffer = io.BytesIO()
+    Image.new("RGB", size, (200, 30, 30)).save(buffer, "PNG")
+    return SimpleUploadedFile("facade.png", buffer.getvalue(), content_type="image/png")
+
+
+def test_render_variants_limits_size(db, media):
+    name = default_storage.save("facade.png", _png())
+    names = images.render_variants(name)
+    assert set(names) == set(images.VARIANTS)
+    with default_storage.open(names["thumb"]) as f:
+        assert max(Image.open(f).size) <= 320
+    with default_storage.open(names["web"]) as f:
+        assert Image.open(f).format == "JPEG"
+    # повторное построение перезаписывает копии под теми же именами
+    assert images.render_variants(name) == names
+
+
+def test_worker_failures_are_logged(db, media, caplog, monkeypatch):
+    def fail(*args):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(images, "process_photo", fail)
+    with caplog.at_level("ERROR", logger="center_app.images"):
+        future = images.schedule_variants(Apartment, 1, "facade.png")
+        # колбэки вызываются по порядку: этот - после записи в журнал
+        logged = threading.Event()
+        future.add_done_callback(lambda done: logged.set())
+        assert logged.wait(5)
+    assert "facade.png" in caplog.text and "disk full" in caplog.text
+
+
+def test_upload_schedules_variants_after_commit(api, db, media, monkeypatch,
+                                                django_capture_on_commit_callbacks):
+    scheduled = []
+    monkeypatch.setattr(images, "schedule_variants", lambda *args: scheduled.append(args))
+    with django_capture_on_commit_callbacks(execute=True):
+        resp = api.post("/apartment/create/", {"ApartmentID": 1, "Number": 1, "Square": 30, "Cost": 100,
+                                               "Photo": _png()}, format="multipart")
+    assert resp.status_code == 201
+    assert len(scheduled) == 1
+    model, pk, name = scheduled[0]
+    assert pk == 1 and name.endswith(".png")
+
+
+def test_serializer_exposes_variant_urls(api, db, media, settings, django_capture_on_commit_callbacks):
+    settings.PHOTO_VARIANTS_SYNC = True
+    with django_capture_on_commit_callbacks(execute=True):
+        api.post("/apartment/create/", {"ApartmentID": 1, "Number": 1, "Square": 30, "Cost": 100,
+                                        "Photo": _png()}, format="multipart")
+    data = api.get("/apartment/1/").data
+    assert set(data["PhotoVariants"]) == {"thumb", "web"}
+    assert data["PhotoVariants"]["thumb"].startswith("http://testserver/media/variants/")
+
+
+def test_no_photo_means_no_variants(api, apartment):
+    assert api.get("/apartment/101/").data["PhotoVariants"] is None
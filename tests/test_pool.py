@@ -0,0 +1,97 @@
+import threading
+
+import pytest
+from django.db import connection
+
+from center_app.backends.sqlite3.base import DatabaseWrapper
+from center_app.pool import ConnectionPool, PoolTimeout, get_pool
+
+
+class FakeConnection:
+    def __init__(self):
+        self.closed = False
+        self.healthy = True
+
+    def close(self):
+        self.closed = True
+
+
+def test_connection_is_reused():
+    pool = ConnectionPool(FakeConnection, max_size=2)
+    first = pool.acquire()
+    pool.release(first)
+    assert pool.acquire() is first
+    stats = pool.stats()
+    assert stats["created"] == 1 and stats["reused"] == 1 and stats["checked_out"] == 1
+
+
+def test_pool_is_bounded_and_times_out():
+    pool = ConnectionPool(FakeConnection, max_size=1, timeout=0.05)
+    pool.acquire()
+    with pytest.raises(PoolTimeout):
+        pool.acquire()
+    stats = pool.stats()
+    assert stats["waits"] == 1 and stats["timeouts"] == 1 and stats["size"] == 1
+
+
+def test_waiter_gets_released_connection():
+    pool = ConnectionPool(FakeConnection, max_size=1, timeout=2)
+    conn = pool.acquire()
+    got = []
+    waiter = threading.Thread(target=lambda: got.append(pool.acquire()))
+    waiter.start()
+    pool.release(conn)
+    waiter.join()
+    assert got == [conn]
+    assert pool.stats()["waits"] == 1
+
+
+def test_unhealthy_connection_is_replaced():
+    pool = ConnectionPool(FakeConnection, check=lambda conn: conn.healthy)
+    conn = pool.acquire()
+    conn.healthy = False
+    pool.release(conn)
+    fresh = pool.acquire()
+    assert fresh is not conn and conn.closed
+    stats = pool.stats()
+    assert stats["discarded"] == 1 and stats["size"] == 1
+
+
+def test_old_connection_is_recycled():
+    pool = ConnectionPool(FakeConnection, max_lifetime=0)
+    conn = pool.acquire()
+    pool.release(conn)
+    assert conn.closed
+    assert pool.stats()["size"] == 0
+
+
+def test_failed_open_frees_slot():
+    def factory():
+        raise OSError("down")
+
+    pool = ConnectionPool(factory, max_size=1)
+    with pytest.raises(OSError):
+        pool.acquire()
+    assert pool.stats()["size"] == 0 and pool.stats()["checked_out"] == 0
+
+
+def test_pooled_sqlite_backend(db, tmp_path):
+    settings_dict = dict(connection.settings_dict, NAME=str(tmp_path / "pool.sqlite3"),
+                         POOL={"MAX_SIZE": 2})
+    wrapper = DatabaseWrapper(settings_dict, alias="pool-test")
+    wrapper.ensure_connection()
+    raw = wrapper.connection
+    wrapper.close()
+    wrapper.ensure_connection()
+    assert wrapper.connection is raw
+    with wrapper.cursor() as cursor:
+        cursor.execute("SELECT 1")
+    wrapper.close()
+    stats = get_pool(wrapper).stats()
+    assert stats["created"] == 1 and stats["reused"] == 1 and stats["idle"] == 1
+    get_pool(wrapper).close_all()
+
+
+def test_pool_stats_endpoint(api, agent):
+    api.force_authenticate(agent)
+    assert api.get("/db/pool/stats/").status_code == 200
@@ -0,0 +1,76 @@
+import pytest
+
+from center_app.cache import response_cache
+from center_app.checks import check_shared_caches
+from center_app.models import Apartment, Building
+
+
+@pytest.fixture
+def stats():
+    response_cache.reset_stats()
+    return response_cache.stats
+
+
+def test_repeated_get_is_served_from_cache(api, apartment, stats, django_assert_num_queries):
+    assert api.get("/apartment/101/")["X-Cache"] == "MISS"
+    # остаётся только агрегат для ETag
+    with django_assert_num_queries(1):
+        resp = api.get("/apartment/101/")
+    assert resp["X-Cache"] == "HIT"
+    assert resp.data["Cost"] == 3000
+    assert stats() == {"hits": 1, "misses": 1}
+
+
+def test_update_view_invalidates_apartment_and_building(api, building, apartment):
+    api.get("/apartment/101/")
+    api.get("/building/1/")
+    resp = api.patch("/apartment/update/101/", {"Cost": 5000}, format="json")
+    assert resp.status_code == 200
+    detail = api.get("/apartment/101/")
+    assert detail["X-Cache"] == "MISS"
+    assert detail.data["Cost"] == 5000
+    assert api.get("/building/1/").data["Apartments"][0]["Cost"] == 5000
+
+
+def test_building_update_and_m2m_invalidate(api, building):
+    api.get("/buildings/")
+    resp = api.patch("/building/update/1/", {"City": "MSK"}, format="json")
+    assert resp.status_code == 200
+    assert api.get("/buildings/").data["results"][0]["City"] == "MSK"
+
+    extra = Apartment.objects.create(ApartmentID=202, Number=1, Square=30, Cost=100)
+    Building.objects.get(pk=1).Apartments.add(extra)
+    assert len(api.get("/buildings/").data["results"][0]["Apartments"]) == 2
+
+
+def test_delete_invalidates(api, apartment):
+    assert api.get("/apartment/101/").status_code == 200
+    assert api.delete("/apartment/delete/101/").status_code == 204
+    assert api.get("/apartment/101/").status_code == 404
+
+
+def test_stats_endpoint_requires_staff(api, agent, client_user):
+    assert api.get("/cache/stats/").status_code == 401
+    api.force_authenticate(client_user)
+    assert api.get("/cache/stats/").status_code == 403
+    api.force_authenticate(agent)
+    resp = api.get("/cache/stats/")
+    assert resp.status_code == 200
+    assert set(resp.data) == {"hits", "misses"}
+
+
+def test_pages_cached_before_commit_are_dropped(api, apartment, django_capture_on_commit_callbacks):
+    with django_capture_on_commit_callbacks(execute=True):
+        apartment.Cost = 4000
+        apartment.save()
+        # так кэш заполняет параллельный запрос, пока транзакция не зафиксирована
+        key = response_cache.key(("apartment",), "http://testserver/apartment/101/")
+        response_cache.set(key, {"Cost": 3000})
+    assert api.get("/apartment/101/").data["Cost"] == 4000
+
+
+def test_deploy_check_requires_shared_cache(settings, tmp_path):
+    assert [warning.id for warning in check_shared_caches(None)] == ["center_app.W001"] * 2
+    settings.CACHES = {"default": {"BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+                                   "LOCATION": str(tmp_path)}}
+    assert check_shared_caches(None) == []
@@ -0,0 +1,114 @@
+import sqlite3
+import time
+
+from django.http import HttpResponse
+from django.test import RequestFactory
+
+from center_app.models import Apartment
+from center_app.routers import (
+    STICKY_COOKIE, ReplicaRouter, ReplicaRoutingMiddleware, copy_database, reading_replicas, use_replicas,
+)
+from center_app.views import ApartmentDetailView
+
+router = ReplicaRouter()
+
+
+def test_reads_use_primary_without_replicas(settings):
+    settings.DATABASE_REPLICAS = []
+    with use_replicas():
+        assert router.db_for_read(Apartment) == "default"
+
+
+def test_reads_use_replica_only_inside_request(settings):
+    settings.DATABASE_REPLICAS = ["replica"]
+    assert router.db_for_read(Apartment) == "default"
+    with use_replicas():
+        assert router.db_for_read(Apartment) == "replica"
+        assert router.db_for_write(Apartment) == "default"
+    assert not router.allow_migrate("replica", "center_app")
+
+
+def _run(request, status=200):
+    seen = {}
+
+    def view(req):
+        seen["db"] = router.db_for_read(Apartment)
+        return HttpResponse(status=status)
+
+    response = ReplicaRoutingMiddleware(view)(request)
+    return seen["db"], response
+
+
+def test_middleware_routes_by_method_and_sticks_after_write(settings):
+    settings.DATABASE_REPLICAS = ["replica"]
+    factory = RequestFactory()
+
+    db, response = _run(factory.get("/apartments/"))
+    assert db == "replica"
+    assert STICKY_COOKIE not in response.cookies
+
+    db, response = _run(factory.post("/apartment/create/"), status=201)
+    assert db == "default"
+    until = response.cookies[STICKY_COOKIE].value
+    assert float(until) > time.time()
+
+    request = factory.get("/apartments/")
+    request.COOKIES[STICKY_COOKIE] = until
+    assert _run(request)[0] == "default"
+
+    request.COOKIES[STICKY_COOKIE] = str(time.time() - 1)
+    assert _run(request)[0] == "replica"
+
+
+def test_failed_write_does_not_stick(settings):
+    settings.DATABASE_REPLICAS = ["replica"]
+    db, response = _run(RequestFactory().post("/apartment/create/"), status=400)
+    assert STICKY_COOKIE not in response.cookies
+
+
+def test_copy_database(tmp_path):
+    primary, replica = str(tmp_path / "primary.sqlite3"), str(tmp_path / "replica.sqlite3")
+    with sqlite3.connect(primary) as conn:
+        conn.execute("CREATE TABLE t (x INTEGER)")
+        conn.execute("INSERT INTO t VALUES (1)")
+    copy_database(primary, replica)
+    conn = sqlite3.connect(replica)
+    try:
+        assert conn.execute("SELECT x FROM t").fetchall() == [(1,)]
+    finally:
+        conn.close()
+
+
+def test_token_clients_stick_without_cookies(settings):
+    settings.DATABASE_REPLICAS = ["replica"]
+    factory = RequestFactory()
+    auth = {"HTTP_AUTHORIZATION": "Token abc"}
+    assert _run(factory.post("/apartment/create/", **auth), status=201)[0] == "default"
+    assert _run(factory.get("/apartments/", **auth))[0] == "default"
+    assert _run(factory.get("/apartments/", HTTP_AUTHORIZATION="Token other"))[0] == "replica"
+    assert _run(factory.get("/apartments/"))[0] == "replica"
+
+
+def test_issued_token_sticks(api, agent, settings, django_capture_on_commit_callbacks):
+    settings.DATABASE_REPLICAS = ["replica"]
+    with django_capture_on_commit_callbacks(execute=True):
+        resp = api.post("/auth/token/", {"username": "agent", "password": "pwd"}, format="json")
+    assert resp.status_code == 200
+    request = RequestFactory().get("/apartments/", HTTP_AUTHORIZATION="Token " + resp.data["token"])
+    assert _run(request)[0] == "default"
+
+
+def test_cache_is_filled_from_primary(api, apartment, settings, monkeypatch):
+    # реплика - та же база: проверяется только, откуда читает промах кэша
+    settings.DATABASE_REPLICAS = ["default"]
+    seen = []
+    original = ApartmentDetailView.get_object
+
+    def get_object(self):
+        seen.append(reading_replicas())
+        return original(self)
+
+    monkeypatch.setattr(ApartmentDetailView, "get_object", get_object)
+    assert api.get("/apartment/101/")["X-Cache"] == "MISS"
+    assert api.get("/apartment/101/")["X-Cache"] == "HIT"
+    assert seen == [False]
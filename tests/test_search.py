@@ -0,0 +1,115 @@
+import pytest
+from django.core.management import call_command
+from django.db import connection
+from django.test import override_settings
+
+from center_app.models import Apartment, Building
+from center_app.search import DatabaseBackend, SQLiteFTSBackend, get_backend, parse_query
+
+
+@pytest.fixture
+def catalog(db):
+    Apartment.objects.create(ApartmentID=1, Number=1, Square=40, Cost=1000, Description="Вид на Невский, <b>балкон</b>")
+    Apartment.objects.create(ApartmentID=2, Number=2, Square=40, Cost=1000, Description="Тихий двор")
+    Building.objects.create(BuildingID=1, City="Санкт-Петербург", Street="Невский проспект", Number="1", Type="кирпич")
+    Building.objects.create(BuildingID=2, City="Москва", Street="Арбат", Number="2", Description="Рядом Невский пассаж")
+
+
+def _hits(api, query):
+    resp = api.get("/search/", {"q": query} if isinstance(query, str) else query)
+    assert resp.status_code == 200, resp.data
+    return [(item["type"], item["id"]) for item in resp.data["results"]]
+
+
+def test_parse_query():
+    assert parse_query('Невск* "пр-т" OR') == [("Невск", True), ("пр", False), ("т", False), ("OR", False)]
+
+
+def test_ranking_prefix_and_highlights(api, catalog):
+    # совпадение в адресе весит больше, чем в описании
+    assert _hits(api, "невский") == [("building", 1), ("apartment", 1), ("building", 2)]
+    assert _hits(api, "нев") == []
+    assert _hits(api, "нев* проспект") == [("building", 1)]
+    assert _hits(api, {"q": "невский", "type": "apartment"}) == [("apartment", 1)]
+
+    resp = api.get("/search/", {"q": "балкон"})
+    assert resp.data["results"][0]["highlights"] == {
+        "Description": "Вид на Невский, &lt;b&gt;<mark>балкон</mark>&lt;/b&gt;",
+    }
+
+
+def test_pagination(api, catalog):
+    resp = api.get("/search/", {"q": "невский", "page_size": 2})
+    assert len(resp.data["results"]) == 2 and resp.data["previous"] is None
+    resp = api.get(resp.data["next"])
+    assert [item["id"] for item in resp.data["results"]] == [2]
+    assert resp.data["next"] is None and resp.data["previous"] is not None
+
+
+def test_validation(api, db):
+    assert api.get("/search/", {"q": " ,. "}).status_code == 400
+    assert api.get("/search/", {"q": "x", "type": "contract"}).status_code == 400
+    assert api.get("/search/", {"q": "x", "offset": "-1"}).status_code == 400
+
+
+def test_index_follows_writes(api, agent, catalog):
+    api.force_authenticate(agent)
+    assert api.patch("/building/update/2/", {"Street": "Невский"}, format="json").status_code == 200
+    assert ("building", 2) in _hits(api, "невский")[:2]
+    resp = api.patch("/apartments/bulk/", [{"ApartmentID": 2, "Description": "Мансарда"}], format="json")
+    assert resp.status_code == 200
+    assert _hits(api, "мансарда") == [("apartment", 2)]
+    assert _hits(api, "тихий") == []
+    resp = api.post("/apartments/bulk/", [{"ApartmentID": 3, "Number": 3, "Square": 30, "Cost": 1,
+                                           "Description": "Мансарда с окном"}], format="json")
+    assert resp.status_code == 201
+    assert _hits(api, "мансарда окном") == [("apartment", 3)]
+    assert api.delete("/apartments/bulk/", [2, 3], format="json").status_code == 200
+    assert _hits(api, "мансарда") == []
+    Building.objects.get(pk=1).delete()
+    assert _hits(api, "проспект") == []
+
+
+def test_rebuild_command(api, catalog):
+    get_backend().clear()
+    assert _hits(api, "арбат") == []
+    call_command("search_index")
+    assert _hits(api, "арбат") == [("building", 2)]
+
+
+@override_settings(SEARCH_BACKEND="center_app.search.DatabaseBackend")
+def test_database_backend(api, catalog):
+    # LIKE в SQLite не сворачивает регистр кириллицы
+    assert _hits(api, "Невский") == [("apartment", 1), ("building", 1), ("building", 2)]
+    resp = api.get("/search/", {"q": "Арб*", "type": "building"})
+    assert resp.data["results"] == [{"type": "building", "id": 2, "highlights": {"Street": "<mark>Арбат</mark>"}}]
+
+
+def test_large_page(api, db):
+    Apartment.objects.bulk_create(
+        Apartment(ApartmentID=i, Number=i, Square=40, Cost=1000, Description="Студия %d" % i) for i in range(1, 601)
+    )
+    call_command("search_index")
+    resp = api.get("/search/", {"q": "студия", "page_size": 1000})
+    assert len(resp.data["results"]) == 600 and resp.data["next"] is None
+
+
+def test_too_many_matches(api, db, monkeypatch):
+    monkeypatch.setattr(SQLiteFTSBackend, "rank_window", 3)
+    Apartment.objects.bulk_create(
+        Apartment(ApartmentID=i, Number=i, Square=40, Cost=1000, Description="Студия %d" % i) for i in range(1, 6)
+    )
+    Apartment.objects.create(ApartmentID=6, Number=6, Square=40, Cost=1000, Description="Студия с камином")
+    call_command("search_index")
+    resp = api.get("/search/", {"q": "студия"})
+    assert resp.status_code == 400 and "уточните" in resp.data["q"]
+    assert _hits(api, "студия камином") == [("apartment", 6)]
+
+
+def test_default_backend_follows_database(settings, monkeypatch):
+    settings.SEARCH_BACKEND = None
+    assert isinstance(get_backend(), SQLiteFTSBackend)
+    monkeypatch.setattr(connection, "vendor", "postgresql")
+    assert isinstance(get_backend(), DatabaseBackend)
+    settings.SEARCH_BACKEND = "center_app.search.SQLiteFTSBackend"
+    assert isinstance(get_backend(), SQLiteFTSBackend)
@@ -0,0 +1,67 @@
+import datetime
+
+import pytest
+
+from center_app.models import Apartment, Building, Contract
+from center_app.stats import contract_stats
+
+D = datetime.date
+
+
+@pytest.fixture
+def data(agent, client_user, User):
+    other = User.objects.create_user(username="agent2", password="pwd", is_staff=True)
+    a1 = Apartment.objects.create(ApartmentID=1, Number=1, Square=40, Cost=100)
+    a2 = Apartment.objects.create(ApartmentID=2, Number=2, Square=40, Cost=300)
+    b1 = Building.objects.create(BuildingID=1, City="SPB", Street="Nevsky", Number="1")
+    b2 = Building.objects.create(BuildingID=2, City="MSK", Street="Arbat", Number="2")
+    b1.Apartments.add(a1)
+    b2.Apartments.add(a2)
+    rows = [
+        # агент, квартира, статус, начало, конец
+        (agent, a1, "l", D(2024, 1, 1), D(2024, 1, 11)),    # 10 дней
+        (agent, a1, "v", D(2024, 2, 1), D(2024, 2, 5)),     # не оплачен
+        (other, a2, "f", D(2023, 12, 25), D(2024, 1, 3)),  # 2 дня в периоде
+        (other, a2, "l", D(2024, 3, 1), None),              # до конца периода
+        (other, a2, "l", D(2025, 1, 1), D(2025, 1, 5)),     # вне периода
+    ]
+    for pk, (who, apartment, status, start, end) in enumerate(rows, 1):
+        Contract.objects.create(ContractID=pk, AgentID=who, ClientID=client_user, ApartmentID=apartment,
+                                Status=status, startDate=start, endDate=end)
+    return agent, other
+
+
+PERIOD = (D(2024, 1, 1), D(2024, 4, 1))
+
+
+def test_by_agent(data):
+    agent, other = data
+    rows = contract_stats("agent", *PERIOD)
+    # 2 + 31 день (1-31 марта) по 300
+    assert rows == [
+        {"key": other.pk, "contracts": 2, "active_contracts": 1, "booked_days": 33, "revenue": 9900, "rank": 1},
+        {"key": agent.pk, "contracts": 2, "active_contracts": 2, "booked_days": 10, "revenue": 1000, "rank": 2},
+    ]
+
+
+def test_by_building_with_occupancy(data):
+    rows = {row["key"]: row for row in contract_stats("building", *PERIOD)}
+    assert rows[1]["occupancy"] == round(10 / 91, 4)
+    assert rows[2]["occupancy"] == round(33 / 91, 4)
+
+
+def test_by_city_and_month(data):
+    assert [row["key"] for row in contract_stats("city", *PERIOD)] == ["MSK", "SPB"]
+    months = {row["key"]: row["revenue"] for row in contract_stats("month", *PERIOD)}
+    assert months == {"2024-01": 1600, "2024-02": 0, "2024-03": 9300}
+
+
+def test_endpoint(api, data):
+    agent, _ = data
+    api.force_authenticate(agent)
+    resp = api.get("/stats/contracts/?group=city&from=2024-01-01&to=2024-04-01")
+    assert resp.status_code == 200
+    assert resp.data["results"][0]["key"] == "MSK"
+    assert api.get("/stats/contracts/?group=planet").status_code == 400
+    api.force_authenticate(None)
+    assert api.get("/stats/contracts/").status_code in (401, 403)
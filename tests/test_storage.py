@@ -0,0 +1,140 @@
+import hashlib
+import io
+
+import pytest
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import IntegrityError, transaction
+from PIL import Image
+
+from center_app.models import Apartment, Building, StoredPhoto
+from center_app.storage import ContentAddressedStorage, collect_photos, photo_references
+
+
+@pytest.fixture
+def media(settings, tmp_path):
+    settings.MEDIA_ROOT = str(tmp_path / "media")
+    settings.PHOTO_VARIANTS_SYNC = True
+    return tmp_path / "media"
+
+
+def _png(color=(10, 20, 30)):
+    buffer = io.BytesIO()
+    Image.new("RGB", (8, 8), color).save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+def test_same_content_is_stored_once(db, media):
+    assert isinstance(default_storage, ContentAddressedStorage)
+    data = _png()
+    first = default_storage.save("a.png", ContentFile(data))
+    second = default_storage.save("b.PNG", ContentFile(data))
+    digest = hashlib.sha256(data).hexdigest()
+    assert first == second == "%s/%s/%s.png" % (digest[:2], digest[2:4], digest)
+    assert len([p for p in media.rglob("*.png")]) == 1
+    # временные файлы пишутся вне MEDIA_ROOT
+    assert not (media / ".incoming").exists()
+    assert not any((media.parent / "media.incoming").iterdir())
+
+
+def test_blob_removed_only_with_last_reference(api, db, media, django_capture_on_commit_callbacks):
+    data = _png()
+    with django_capture_on_commit_callbacks(execute=True):
+        for pk in (1, 2):
+            api.post("/apartment/create/", {"ApartmentID": pk, "Number": pk, "Square": 30, "Cost": 100,
+                                            "Photo": SimpleUploadedFile("f.png", data)}, format="multipart")
+        building = Building.objects.create(BuildingID=1, City="SPB", Street="Nevsky", Number="1",
+                                           Photo=Apartment.objects.get(pk=1).Photo.name)
+    name = building.Photo.name
+    assert photo_references(name) == StoredPhoto.objects.get(name=name).references == 3
+
+    with django_capture_on_commit_callbacks(execute=True):
+        assert api.delete("/apartment/delete/1/").status_code == 204
+        building.delete()
+    assert default_storage.exists(name)
+
+    with django_capture_on_commit_callbacks(execute=True):
+        assert api.delete("/apartment/delete/2/").status_code == 204
+    assert not default_storage.exists(name)
+    assert not list(media.rglob("*.jpg"))
+
+
+def test_replaced_photo_is_released(db, media, django_capture_on_commit_callbacks):
+    with django_capture_on_commit_callbacks(execute=True):
+        apartment = Apartment.objects.create(ApartmentID=1, Number=1, Square=1, Cost=1)
+        apartment.Photo.save("old.png", ContentFile(_png((1, 1, 1))))
+    old = apartment.Photo.name
+    apartment = Apartment.objects.get(pk=1)
+    with django_capture_on_commit_callbacks(execute=True):
+        apartment.Photo.save("new.png", ContentFile(_png((2, 2, 2))))
+    assert not default_storage.exists(old)
+    assert default_storage.exists(apartment.Photo.name)
+
+
+def test_reused_blob_survives_release(db, media, django_capture_on_commit_callbacks):
+    data = _png((3, 3, 3))
+    with django_capture_on_commit_callbacks(execute=True):
+        first = Apartment.objects.create(ApartmentID=1, Number=1, Square=1, Cost=1)
+        first.Photo.save("a.png", ContentFile(data))
+        second = Apartment.objects.create(ApartmentID=2, Number=2, Square=1, Cost=1)
+        second.Photo.save("b.png", ContentFile(data))
+    name = second.Photo.name
+    assert StoredPhoto.objects.get(name=name).references == 2
+    with django_capture_on_commit_callbacks(execute=True):
+        first.delete()
+    assert default_storage.exists(name)
+    assert StoredPhoto.objects.get(name=name).references == 1
+
+
+def test_failed_save_does_not_count_reference(transactional_db, media):
+    data = _png((4, 4, 4))
+    apartment = Apartment.objects.create(ApartmentID=1, Number=1, Square=1, Cost=1)
+    apartment.Photo.save("a.png", ContentFile(data))
+    name = apartment.Photo.name
+    # файл сохраняется, а запись - нет: площадь обязательна
+    duplicate = Apartment(ApartmentID=2, Number=1, Square=None, Cost=1)
+    with pytest.raises(IntegrityError):
+        duplicate.Photo.save("b.png", ContentFile(data))
+    assert StoredPhoto.objects.get(name=name).references == 1
+    with pytest.raises(IntegrityError), transaction.atomic():
+        duplicate.Photo.save("c.png", ContentFile(data))
+    assert StoredPhoto.objects.get(name=name).references == 1
+    apartment.delete()
+    assert not default_storage.exists(name)
+
+
+def test_collect_photos(db, media, django_capture_on_commit_callbacks):
+    with django_capture_on_commit_callbacks(execute=True):
+        apartment = Apartment.objects.create(ApartmentID=1, Number=1, Square=1, Cost=1)
+        apartment.Photo.save("a.png", ContentFile(_png((5, 5, 5))))
+    kept = apartment.Photo.name
+    # файл из откатившейся транзакции остаётся без строки StoredPhoto
+    with pytest.raises(RuntimeError), transaction.atomic():
+        Apartment.objects.create(ApartmentID=2, Number=2, Square=1, Cost=1,
+                                 Photo=SimpleUploadedFile("b.png", _png((6, 6, 6))))
+        raise RuntimeError
+    orphan = next(name for name in (p.relative_to(media).as_posix() for p in media.rglob("*.png"))
+                  if name != kept)
+    assert not StoredPhoto.objects.filter(name=orphan).exists()
+    # имя присвоено в обход сигналов
+    Building.objects.create(BuildingID=1, City="SPB", Street="Nevsky", Number="1")
+    Building.objects.filter(pk=1).update(Photo=kept)
+
+    # свежий файл может ещё сохранять другая транзакция
+    assert collect_photos(grace=3600) == (1, 0)
+    assert default_storage.exists(orphan)
+    assert StoredPhoto.objects.get(name=kept).references == 2
+    assert collect_photos(grace=0) == (0, 1)
+    assert not default_storage.exists(orphan)
+    assert default_storage.exists(kept)
+    call_command("collect_photos", stdout=io.StringIO())
+
+
+def test_variants_are_overwritten(media):
+    first = default_storage.save("variants/ab/cd/x.thumb.jpg", ContentFile(b"old"))
+    second = default_storage.save("variants/ab/cd/x.thumb.jpg", ContentFile(b"new"))
+    assert first == second
+    with default_storage.open(second) as f:
+        assert f.read() == b"new"